@@ -0,0 +1,434 @@
+"""
+Compact, column-oriented table of chips on a tray.
+
+ChipTable replaces the dict of six parallel Python lists that
+RTSStateMachine used for chip_positions. Every column is a typed
+array.array, so a manifest of thousands of chips costs a few bytes per
+chip instead of a Python object per cell, and bulk loads and validation
+run per column rather than per cell. Labels are stored as small integer
+codes into a shared label vocabulary.
+
+The table still answers the dict-of-lists interface the rest of the code
+uses: table['col'][i], table['col'][i] = 3, len(table['col']), and
+iterating over the position keys.
+
+Classes:
+    ChipTable: Typed column store of chip positions, status and results
+    ChipRow: Lightweight view of one chip in a ChipTable
+"""
+
+import csv
+import json
+import os
+from array import array
+
+POSITION_KEYS = ('tray', 'col', 'row', 'dat', 'dat_socket', 'label')
+_INT_KEYS = ('tray', 'col', 'row', 'dat', 'dat_socket')
+
+# Chip status codes
+PENDING = 0
+IN_SOCKET = 1
+TESTED = 2
+DONE = 3
+BAD = 4
+STATUS_NAMES = {PENDING: 'pending', IN_SOCKET: 'in_socket', TESTED: 'tested', DONE: 'done', BAD: 'bad'}
+
+# Chip result codes
+NO_RESULT = 0
+PASSED = 1
+FAILED = 2
+RESULT_NAMES = {NO_RESULT: 'none', PASSED: 'passed', FAILED: 'failed'}
+
+# Allowed values, as used by the manual entry prompts
+LIMITS = {
+    'tray': (1, 2),
+    'col': (1, 10),
+    'row': (1, 4),
+    'dat': (1, 2),
+    'dat_socket': (21, 22),
+}
+LABELS = ('CD0', 'CD1')
+
+
+class _LabelColumn:
+    """Sequence view of the label column that reads and writes strings."""
+
+    __slots__ = ('_table',)
+
+    def __init__(self, table):
+        self._table = table
+
+    def __len__(self):
+        return len(self._table._label_codes)
+
+    def __getitem__(self, index):
+        labels = self._table.labels
+        if isinstance(index, slice):
+            return [labels[c] for c in self._table._label_codes[index]]
+        return labels[self._table._label_codes[index]]
+
+    def __setitem__(self, index, label):
+        self._table._label_codes[index] = self._table._label_code(label)
+
+    def __iter__(self):
+        labels = self._table.labels
+        return (labels[c] for c in self._table._label_codes)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class ChipRow:
+    """
+    View of one chip in a ChipTable. Reads and writes go straight to the
+    table's columns; no per-chip dict is built.
+    """
+
+    __slots__ = ('_table', 'index')
+
+    def __init__(self, table, index):
+        self._table = table
+        self.index = index
+
+    @property
+    def tray(self):
+        return self._table._columns['tray'][self.index]
+
+    @property
+    def col(self):
+        return self._table._columns['col'][self.index]
+
+    @property
+    def row(self):
+        return self._table._columns['row'][self.index]
+
+    @property
+    def dat(self):
+        return self._table._columns['dat'][self.index]
+
+    @property
+    def dat_socket(self):
+        return self._table._columns['dat_socket'][self.index]
+
+    @property
+    def label(self):
+        return self._table.labels[self._table._label_codes[self.index]]
+
+    @property
+    def status(self):
+        return self._table.status[self.index]
+
+    @status.setter
+    def status(self, code):
+        self._table.status[self.index] = code
+
+    @property
+    def result(self):
+        return self._table.result[self.index]
+
+    @result.setter
+    def result(self, code):
+        self._table.result[self.index] = code
+
+    def as_dict(self):
+        """Return the chip's position data as a dict."""
+        return self._table.as_dict(self.index)
+
+    def __repr__(self):
+        return f"ChipRow({self.index}, {self.as_dict()})"
+
+
+class ChipTable:
+    """
+    Typed column store of chip positions with per-chip status and result.
+
+    Attributes:
+        labels (list): Label vocabulary; the label column stores indices into it
+        status (array): Status code per chip (PENDING, IN_SOCKET, ...)
+        result (array): Result code per chip (NO_RESULT, PASSED, FAILED)
+    """
+
+    def __init__(self):
+        self._columns = {key: array('b') for key in _INT_KEYS}
+        self._label_codes = array('B')
+        self.labels = list(LABELS)
+        self._label_index = {label: i for i, label in enumerate(self.labels)}
+        self.status = array('b')
+        self.result = array('b')
+
+    def _label_code(self, label):
+        code = self._label_index.get(label)
+        if code is None:
+            code = len(self.labels)
+            self.labels.append(label)
+            self._label_index[label] = code
+        return code
+
+    # dict-of-lists interface
+
+    def __len__(self):
+        return len(self._label_codes)
+
+    def __iter__(self):
+        return iter(POSITION_KEYS)
+
+    def keys(self):
+        return POSITION_KEYS
+
+    def __contains__(self, key):
+        return key in POSITION_KEYS
+
+    def __getitem__(self, key):
+        """
+        table['col'] returns the column; table[i:j] returns a new table of
+        those chips.
+        """
+        if isinstance(key, slice):
+            return self.take(range(*key.indices(len(self))))
+        if key == 'label':
+            return _LabelColumn(self)
+        if key in self._columns:
+            return self._columns[key]
+        if key in ('status', 'result'):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    # construction
+
+    @classmethod
+    def from_columns(cls, tray, col, row, dat, dat_socket, label, validate=True):
+        """
+        Build a table from whole columns (any sequences of equal length).
+
+        Raises:
+            ValueError: If the columns differ in length or hold invalid values
+        """
+        table = cls()
+        columns = {'tray': tray, 'col': col, 'row': row, 'dat': dat, 'dat_socket': dat_socket}
+        lengths = {len(values) for values in columns.values()} | {len(label)}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        for key, values in columns.items():
+            try:
+                table._columns[key] = array('b', values)
+            except (TypeError, OverflowError) as e:
+                raise ValueError(f"Invalid {key} column: {e}") from None
+        table._label_codes = array('B', [table._label_code(str(l).strip().upper()) for l in label])
+        n = len(table._label_codes)
+        table.status = array('b', bytes(n))
+        table.result = array('b', bytes(n))
+        if validate:
+            table.validate()
+        return table
+
+    @classmethod
+    def from_records(cls, records, validate=True):
+        """
+        Build a table from a list of chip dicts with the POSITION_KEYS.
+
+        Raises:
+            ValueError: If a chip is missing a key or holds invalid values
+        """
+        records = list(records)
+        columns = {}
+        for key in POSITION_KEYS:
+            try:
+                columns[key] = [chip[key] for chip in records]
+            except KeyError:
+                missing = [i for i, chip in enumerate(records) if key not in chip]
+                raise ValueError(f"Chips {missing[:10]} have no '{key}'") from None
+        return cls.from_columns(validate=validate, **columns)
+
+    @classmethod
+    def full_tray(cls, max_col=10, max_row=4, tray=2, dat=2):
+        """A full tray filled column-major, alternating sockets 21/22 (CD0/CD1)."""
+        n = max_col * max_row
+        return cls.from_columns(
+            tray=[tray] * n,
+            col=[col for col in range(1, max_col + 1) for _ in range(max_row)],
+            row=list(range(1, max_row + 1)) * max_col,
+            dat=[dat] * n,
+            dat_socket=[21, 22] * (n // 2) + [21] * (n % 2),
+            label=['CD0', 'CD1'] * (n // 2) + ['CD0'] * (n % 2),
+        )
+
+    @classmethod
+    def from_csv(cls, path, validate=True):
+        """
+        Build a table from a CSV manifest with a header row naming the
+        POSITION_KEYS columns (any order, any case; other columns are ignored).
+
+        Raises:
+            ValueError: If a column is missing or a value is not a valid integer
+        """
+        with open(path, newline='') as f:
+            reader = csv.reader(f)
+            try:
+                header = [name.strip().lower() for name in next(reader)]
+            except StopIteration:
+                raise ValueError(f"Empty manifest: {path}") from None
+            missing = [key for key in POSITION_KEYS if key not in header]
+            if missing:
+                raise ValueError(f"Manifest {path} has no columns {missing}")
+            positions = {key: header.index(key) for key in POSITION_KEYS}
+            rows = [row for row in reader if any(field.strip() for field in row)]
+        columns = {}
+        for key, position in positions.items():
+            values = [row[position].strip() if position < len(row) else '' for row in rows]
+            if key == 'label':
+                columns[key] = values
+                continue
+            try:
+                columns[key] = [int(v) for v in values]
+            except ValueError:
+                bad = [i + 2 for i, v in enumerate(values) if not v.lstrip('-').isdigit()]
+                raise ValueError(f"Manifest {path}: non-integer {key} on lines {bad[:10]}") from None
+        return cls.from_columns(validate=validate, **columns)
+
+    @classmethod
+    def from_json(cls, path, validate=True):
+        """
+        Build a table from a JSON manifest: a list of chip dicts, an object
+        with a "chips" list, or an object of POSITION_KEYS columns.
+
+        Raises:
+            ValueError: If the manifest has none of these shapes or holds invalid values
+        """
+        with open(path) as f:
+            data = json.load(f)
+        if isinstance(data, dict) and 'chips' in data:
+            data = data['chips']
+        if isinstance(data, list):
+            return cls.from_records(data, validate=validate)
+        if isinstance(data, dict) and all(key in data for key in POSITION_KEYS):
+            return cls.from_columns(validate=validate, **{key: data[key] for key in POSITION_KEYS})
+        raise ValueError(f"Manifest {path} is not a list of chips or a dict of columns")
+
+    @classmethod
+    def load(cls, path, validate=True):
+        """Build a table from a .csv or .json manifest."""
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.csv':
+            return cls.from_csv(path, validate=validate)
+        if extension == '.json':
+            return cls.from_json(path, validate=validate)
+        raise ValueError(f"Unsupported manifest type: {path}")
+
+    def append(self, tray, col, row, dat, dat_socket, label):
+        """Add one chip."""
+        for key, value in zip(_INT_KEYS, (tray, col, row, dat, dat_socket)):
+            self._columns[key].append(value)
+        self._label_codes.append(self._label_code(label))
+        self.status.append(PENDING)
+        self.result.append(NO_RESULT)
+
+    def clear(self):
+        """Remove all chips."""
+        self.__init__()
+
+    # validation
+
+    def validate(self, limits=None, labels=LABELS):
+        """
+        Check every column against its allowed range in one pass per column.
+
+        Raises:
+            ValueError: Listing the offending chip indices per column
+        """
+        limits = limits or LIMITS
+        problems = []
+        for key, (low, high) in limits.items():
+            column = self._columns[key]
+            if column and (min(column) < low or max(column) > high):
+                bad = [i for i, v in enumerate(column) if not low <= v <= high]
+                problems.append(f"{key} outside {low}-{high} at chips {bad[:10]}")
+        if labels is not None:
+            allowed = {self._label_index[l] for l in labels if l in self._label_index}
+            if not set(self._label_codes) <= allowed:
+                bad = [i for i, c in enumerate(self._label_codes) if c not in allowed]
+                problems.append(f"label not in {list(labels)} at chips {bad[:10]}")
+        if problems:
+            raise ValueError("Invalid chip table: " + "; ".join(problems))
+
+    # access
+
+    def row_view(self, index):
+        """Return a ChipRow view of chip index."""
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return ChipRow(self, index % len(self))
+
+    def rows(self):
+        """Iterate over ChipRow views of all chips."""
+        return (ChipRow(self, i) for i in range(len(self)))
+
+    def as_dict(self, index):
+        """Return the position data of one chip as a dict."""
+        data = {key: self._columns[key][index] for key in _INT_KEYS}
+        data['label'] = self.labels[self._label_codes[index]]
+        return {key: data[key] for key in POSITION_KEYS}
+
+    def to_records(self):
+        """Return all chips as a list of dicts."""
+        return [self.as_dict(i) for i in range(len(self))]
+
+    def take(self, indices):
+        """Return a new table with the chips at indices, in that order."""
+        indices = list(indices)
+        table = ChipTable()
+        table.labels = list(self.labels)
+        table._label_index = dict(self._label_index)
+        for key in _INT_KEYS:
+            column = self._columns[key]
+            table._columns[key] = array('b', [column[i] for i in indices])
+        table._label_codes = array('B', [self._label_codes[i] for i in indices])
+        table.status = array('b', [self.status[i] for i in indices])
+        table.result = array('b', [self.result[i] for i in indices])
+        return table
+
+    def reorder(self, order):
+        """Reorder the chips in place; order lists old indices in new order."""
+        reordered = self.take(order)
+        self._columns = reordered._columns
+        self._label_codes = reordered._label_codes
+        self.status = reordered.status
+        self.result = reordered.result
+
+    def where(self, status=None, result=None):
+        """Return the indices of chips with the given status and/or result."""
+        return [i for i in range(len(self))
+                if (status is None or self.status[i] == status)
+                and (result is None or self.result[i] == result)]
+
+    def find(self, col, row, tray=None):
+        """Return the index of the first chip at col/row (and tray, if given), or None."""
+        cols, rows, trays = self._columns['col'], self._columns['row'], self._columns['tray']
+        for i in range(len(self)):
+            if cols[i] == col and rows[i] == row and (tray is None or trays[i] == tray):
+                return i
+        return None
+
+    def set_status(self, index, status, result=None):
+        """Set a chip's status, and its result if given."""
+        self.status[index] = status
+        if result is not None:
+            self.result[index] = result
+
+    def counts(self):
+        """Return the number of chips per status name."""
+        counts = {}
+        for code in self.status:
+            name = STATUS_NAMES.get(code, str(code))
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+
+    def nbytes(self):
+        """Approximate memory held by the columns, in bytes."""
+        arrays = list(self._columns.values()) + [self._label_codes, self.status, self.result]
+        return sum(a.itemsize * len(a) for a in arrays)
+
+    def __repr__(self):
+        return f"ChipTable({len(self)} chips)"
@@ -1,12 +1,8 @@
 #!/usr/bin/env python3
 import sys 
 import os
-import subprocess
+import asyncio
 import time 
-import random
-import pickle
-import multiprocessing as mp
-import pandas as pd
 
 # To send notification email
 ## import smtplib
@@ -37,6 +33,8 @@ import pandas as pd
 
 #start robot
 from RTS_CFG import RTS_CFG
+from RTS_PathPlanner import chips_from_positions, plan_order
+from RTSSession import SessionStore
 ## from rts_ssh import subrun
 #from rts_ssh import DAT_power_off
 #from rts_ssh import Sinkcover
@@ -93,76 +91,185 @@ def send_email(message, subject="ERROR from RTS", sender_email="ningxuyang0202@g
     except Exception as e:
         print(f"Failed to send email: {e}")
 
-def FindChipImage(image_dir, tray_nr, col_nr, row_nr):
+def FindChipImage(image_dir, tray_nr, col_nr, row_nr, session=None, index=None):
     """
     Finds the latest bmp image taken of a chip in the 
     given tray, column, and row, and returns the string
     of the file name. This assumes the files start with
     the date and time the image was taken, followed by
     the chip position information. 
+    With a session, the images recorded for the chip in the session manifest
+    are searched instead of listing the whole image directory. An image only
+    found by listing is recorded in the session for the next lookup.
     
     Inputs:
         image_dir [str]: directory of chip images
         tray_nr [int]: tray/pallet number (1 or 2)
         col_nr [int]: column number
         row_nr [int]: row number
+        session [Session]: session of the tray run (see RTSSession), optional
+        index [int]: index of the chip in the session, needed with session
     """
     # Assumes the naming scheme of the image files
     file_base = f"tr{tray_nr}_col{col_nr}_row{row_nr}_SN.bmp"
 
+    if session is not None:
+        recorded = [os.path.basename(f) for f in session.files(index, 'images')]
+        image_files = sorted(f for f in recorded if file_base in f)
+        if image_files:
+            return image_files[-1]
+
     all_files = os.listdir(image_dir)
     image_files = [f for f in all_files if file_base in f]
 
     # Sory images, latest in time will be last
     image_files.sort()
 
+    if session is not None and image_files:
+        session.add_file(index, 'images', os.path.join(image_dir, image_files[-1]))
     return image_files[-1]
 
-def MoveChipsToSockets(rts, chip_positions):
+def RecordChipFiles(session, index, kind, paths):
+    """
+    Records files of a chip in the session manifest. Does nothing without a session.
+    Inputs:
+        session [Session]: session of the tray run, or None
+        index [int]: index of the chip in the session
+        kind [str]: 'images', 'ocr' or 'logs'
+        paths [str or list]: file path or paths
+    """
+    if session is None or paths is None:
+        return
+    if isinstance(paths, str):
+        paths = [paths]
+    for path in paths:
+        session.add_file(index, kind, path)
+
+def OCRResultsDir(session, index, ocr_results_dir):
+    """
+    Returns the directory the OCR output of a chip goes to: the chip's session
+    folder with a session, so the output can be recorded, else ocr_results_dir.
+    """
+    return session.chip_dir(index) if session is not None else ocr_results_dir
+
+def RecordOCRResults(session, index):
+    """
+    Records the OCR output written to a chip's session folder. Does nothing without a session.
+    """
+    if session is None:
+        return
+    recorded = set(session.files(index, 'ocr'))
+    chip_dir = session.chip_dir(index)
+    for name in sorted(os.listdir(chip_dir)):
+        path = os.path.join(chip_dir, name)
+        if path not in recorded:
+            session.add_file(index, 'ocr', path)
+
+def PlanChipOrder(chip_positions, mode='socket', geometry=None):
+    """
+    Returns the order to visit the chips in that minimizes arm travel.
+    Inputs:
+        chip_positions [dict]: dictionary describing the chip positions in the tray 
+                               and where to put them in the DAT board
+        mode [str]: 'socket' for tray->socket (or socket->tray) moves, 'cycle' when
+                    each chip goes back to its pocket before the next is picked
+        geometry [TrayGeometry]: deck geometry, default uses placeholder positions
+    """
+    return plan_order(chips_from_positions(chip_positions), geometry=geometry, mode=mode)
+
+def MoveChipsToSockets(rts, chip_positions, plan=False):
     """
-    This function turns the robot motor on, moves all chips from a tray to the sockets, 
-    moves the robot back to home, and turns the motor off.
+    This function moves all chips from a tray to the sockets inside a motor session:
+    the motor is turned on if needed and left on, and the robot is parked (moved back
+    to home, motor off) when it has been idle for rts.idle_timeout or rts.park() is called.
     Inputs:
-        queue [Queue]: multiprocessing queue for threading
+        rts [RTS_CFG]: connected client for the rts
         chip_positions [dict]: dictionary describing the chip positions in the tray 
                                and where to put them in the DAT board
+        plan [bool]: visit the chips in travel-minimizing order (PlanChipOrder, 'socket'
+                     mode) instead of listed order
     """
-    rts.MotorOn()
+    order = PlanChipOrder(chip_positions) if plan else range(len(chip_positions['dat']))
+    with rts.motor_session():
+        for i in order:
+            dat = chip_positions['dat'][i]
+            dat_socket = chip_positions['dat_socket'][i]
+            tray = chip_positions['tray'][i]
+            col = chip_positions['col'][i]
+            row = chip_positions['row'][i]
+            rts.MoveChipFromTrayToSocket(dat, dat_socket, tray, col, row)
+
+    return
+
+def MoveChipsToTray(rts, chip_positions, plan=False):
+    """
+    This function moves all chips from the sockets to the tray inside a motor session,
+    like MoveChipsToSockets.
+    Inputs:
+        rts [RTS_CFG]: connected client for the rts
+        chip_positions [dict]: dictionary describing the chip positions in the tray 
+                               and where to put them in the DAT board
+        plan [bool]: visit the chips in the reverse of the MoveChipsToSockets planned
+                     order instead of listed order
+    """
+    # Travel from socket to pocket mirrors pocket to socket, so the reversed
+    # socket-mode tour is the matching return order
+    order = PlanChipOrder(chip_positions)[::-1] if plan else range(len(chip_positions['dat']))
+    with rts.motor_session():
+        for i in order:
+            dat = chip_positions['dat'][i]
+            dat_socket = chip_positions['dat_socket'][i]
+            tray = chip_positions['tray'][i]
+            col = chip_positions['col'][i]
+            row = chip_positions['row'][i]
+            rts.MoveChipFromSocketToTray(dat, dat_socket, tray, col, row)
+
+    return
+
+async def MoveChipsToSocketsAsync(rts, chip_positions):
+    """
+    Same as MoveChipsToSockets, but for an RTS_AsyncCFG client. Other tasks in the
+    event loop keep running while the arm is moving.
+    Inputs:
+        rts [RTS_AsyncCFG]: asyncio client for the rts
+        chip_positions [dict]: dictionary describing the chip positions in the tray 
+                               and where to put them in the DAT board
+    """
+    await rts.MotorOn()
     for i in range(len(chip_positions['dat'])):
         dat = chip_positions['dat'][i]
         dat_socket = chip_positions['dat_socket'][i]
         tray = chip_positions['tray'][i]
         col = chip_positions['col'][i]
         row = chip_positions['row'][i]
-        rts.MoveChipFromTrayToSocket(dat, dat_socket, tray, col, row)
-    rts.JumpToCamera()
-    rts.PumpOff()
-    rts.MotorOff()
+        await rts.MoveChipFromTrayToSocket(dat, dat_socket, tray, col, row)
+    await rts.JumpToCamera()
+    await rts.PumpOff()
+    await rts.MotorOff()
 
     return
 
-def MoveChipsToTray(rts, chip_positions):
+async def MoveChipsToTrayAsync(rts, chip_positions):
     """
-    This function turns the robot motor on, moves all chipsfrom the sockets to the tray, 
-    moves the robot back to home, and turns the motor off.
+    Same as MoveChipsToTray, but for an RTS_AsyncCFG client.
     Inputs:
-        queue [Queue]: multiprocessing queue for threading
+        rts [RTS_AsyncCFG]: asyncio client for the rts
         chip_positions [dict]: dictionary describing the chip positions in the tray 
                                and where to put them in the DAT board
     """
-    rts.MotorOn()
+    await rts.MotorOn()
     for i in range(len(chip_positions['dat'])):
         dat = chip_positions['dat'][i]
         dat_socket = chip_positions['dat_socket'][i]
         tray = chip_positions['tray'][i]
         col = chip_positions['col'][i]
         row = chip_positions['row'][i]
-        rts.MoveChipFromSocketToTray(dat, dat_socket, tray, col, row)
-    rts.JumpToCamera()
+        await rts.MoveChipFromSocketToTray(dat, dat_socket, tray, col, row)
+    await rts.JumpToCamera()
 
     return
 
-def RTS_Cyle(rts, chip_positions, ocr_results_dir, config_file):
+def RTS_Cyle(rts, chip_positions, ocr_results_dir, config_file, session=None):
     """
     Runs an entire cycle of chip testing: move chips from the tray to the sockets,
     performs OCR to get serial numbers, runs the QC tests, burn the SN into the 
@@ -172,11 +279,15 @@ def RTS_Cyle(rts, chip_positions, ocr_results_dir, config_file):
         chip_positions [dict]: dictionary of chip positions and socket labels
         ocr_results_dur [str]: directory of ocr output
         config_file [str]: directory and file name of RTS config file.
+        session [Session]: session of the tray run, optional. The chip pictures,
+                           OCR output (written to the chip folders instead of
+                           ocr_results_dir) and QC logs are recorded in its manifest.
     """
 
     # Move all chips to sockets
     if not BypassRTS:
         MoveChipsToSockets(rts, chip_positions)
+        rts.park() # QC takes longer than the idle timeout, park now
 
     # Check the RobotLog to see if the chip pictures are ready before running OCR
     print('Waiting for chip pictures...')
@@ -187,14 +298,19 @@ def RTS_Cyle(rts, chip_positions, ocr_results_dir, config_file):
     if pictures_ready:
         print('Pictures ready!')
         for i in range(len(pictures)):
-            success = cpm.RunOCR(image_directory, pictures[i], ocr_results_dir,
+            RecordChipFiles(session, i, 'images', os.path.join(image_directory, pictures[i]))
+            success = cpm.RunOCR(image_directory, pictures[i], OCRResultsDir(session, i, ocr_results_dir),
                                  True, chip_positions['label'][i], config_file)
+            RecordOCRResults(session, i)
             sn_ready = sn_ready and success # only True if all RunOCR's are successful
     # Kill Ollama used by OCR (TODO: Why does Ollama not close after OCR is done??)
     subrun("taskkill /F /IM ollama.exe")
 
     print('About to run COLDATA_QC')
     logs = RunCOLDATA_QC(duttype="CD", env="RT", rootdir="C:/Users/RTS/Tested/")
+    # The QC runs on the whole DAT board, so its logs belong to every chip
+    for i in range(len(chip_positions['label'])):
+        RecordChipFiles(session, i, 'logs', logs)
 
     # Burn in the serial number found from the OCR
     if sn_ready:
@@ -206,6 +322,59 @@ def RTS_Cyle(rts, chip_positions, ocr_results_dir, config_file):
     # Move all chips to tray
     if not BypassRTS:
         MoveChipsToTray(rts, chip_positions)
+        rts.park()
+
+    return
+
+async def RTS_CyleAsync(rts, chip_positions, ocr_results_dir, config_file, session=None):
+    """
+    Same cycle as RTS_Cyle, for an RTS_AsyncCFG client. The chip moves run as a
+    task while the RobotLog is watched for pictures and OCR runs on them, so OCR
+    starts as soon as the pictures exist instead of after the arm has parked.
+    The blocking OCR and QC steps run in worker threads.
+    Inputs:
+        rts [RTS_AsyncCFG]: asyncio client for the rts
+        chip_positions [dict]: dictionary of chip positions and socket labels
+        ocr_results_dur [str]: directory of ocr output
+        config_file [str]: directory and file name of RTS config file.
+        session [Session]: session of the tray run, optional, as for RTS_Cyle
+    """
+    move_task = None
+    if not BypassRTS:
+        move_task = asyncio.create_task(MoveChipsToSocketsAsync(rts, chip_positions))
+
+    print('Waiting for chip pictures...')
+    pictures_ready, pictures = await asyncio.to_thread(WaitForPictures, chip_positions, threading=False)
+
+    sn_ready = True
+    if pictures_ready:
+        print('Pictures ready!')
+        for i in range(len(pictures)):
+            RecordChipFiles(session, i, 'images', os.path.join(image_directory, pictures[i]))
+            success = await asyncio.to_thread(cpm.RunOCR, image_directory, pictures[i],
+                                              OCRResultsDir(session, i, ocr_results_dir),
+                                              True, chip_positions['label'][i], config_file)
+            RecordOCRResults(session, i)
+            sn_ready = sn_ready and success
+    await asyncio.to_thread(subrun, "taskkill /F /IM ollama.exe")
+
+    # Chips must be seated before QC can start
+    if move_task is not None:
+        await move_task
+
+    print('About to run COLDATA_QC')
+    logs = await asyncio.to_thread(RunCOLDATA_QC, duttype="CD", env="RT", rootdir="C:/Users/RTS/Tested/")
+    for i in range(len(chip_positions['label'])):
+        RecordChipFiles(session, i, 'logs', logs)
+
+    if sn_ready:
+        print('About to run burning in of SN')
+        await asyncio.to_thread(BurninSN, logs)
+    else:
+        print('OCR failed, skipping burning in  of SN.')
+
+    if not BypassRTS:
+        await MoveChipsToTrayAsync(rts, chip_positions)
 
     return
 
@@ -224,7 +393,11 @@ if __name__ == "__main__":
     # Dictionary to hold chip positions and chip labels 
     chip_positions = {'tray':[2,2], 'col':[1,1], 'row':[2,3], 'dat':[2,2], 'dat_socket':[21,22], 'label':['CD0','CD1']}
 
-    RTS_Cyle(rts, chip_positions, ocr_results_dir, config_file)
+    session = SessionStore().open_session(robot=robot_ip)
+    try:
+        RTS_Cyle(rts, chip_positions, ocr_results_dir, config_file, session=session)
+    finally:
+        session.close()
 
     if not BypassRTS:
         rts.rts_shutdown()
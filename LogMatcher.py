@@ -0,0 +1,190 @@
+"""
+Compiled mapping of RobotLog lines to state machine states.
+
+A pattern table lists, for each state, a regular expression and a
+priority. LogMatcher compiles the whole table once into two regexes:
+
+    prefilter:  the literal keyword every pattern starts with (e.g.
+                "picked up chip from tray"), as one alternation of plain
+                strings; a line that contains none of them (the bulk of a
+                verbose robot log) is rejected in a single search.
+    selector:   one lookahead alternative per pattern, ordered by priority,
+                (?=.*?(?P<p0>...))|(?=.*?(?P<p1>...))|... anchored at the
+                start of the line. The regex engine tries the alternatives
+                in order, so the highest-priority pattern that occurs
+                anywhere in the line wins, and its named groups are captured.
+
+Matching is case-insensitive by default. Within one priority, the pattern
+listed first wins.
+
+Classes:
+    LogPattern: One entry of the pattern table
+    LogMatch: Result of matching one line
+    LogMatcher: Compiled pattern table
+
+Functions:
+    load_patterns: Read a pattern table from a JSON file
+"""
+
+import json
+import re
+from collections import namedtuple
+
+LogPattern = namedtuple("LogPattern", ["pattern", "state", "priority", "keyword"], defaults=(0, None))
+LogMatch = namedtuple("LogMatch", ["state", "pattern", "captures"])
+
+# Higher priority wins when several patterns occur in the same line.
+ERROR_PRIORITY = 30
+MESSAGE_PRIORITY = 20
+STATE_PRIORITY = 10
+
+_ERROR_STATES = (
+    "pause", "no_server_connection", "chip_in_socket", "vision_sequence_failed",
+    "no_pressure", "lost_vacuum", "bad_contact", "no_chip", "safe_guard",
+    "bad_pins", "no_serial_number", "failed_init", "no_wib_connection",
+    "failed_upload",
+)
+_NORMAL_STATES = (
+    "ground", "surveying_sockets", "moving_chip_to_socket", "testing",
+    "writing_to_hwdb", "moving_chip_to_tray", "reseat", "moving_chip_to_bad_tray",
+)
+
+# Default table: error and pause states first, then the robot's own
+# messages, then plain state names. Literal keys match as substrings, as
+# the original state_map did.
+DEFAULT_PATTERNS = (
+    [LogPattern(re.escape(name), name, ERROR_PRIORITY) for name in _ERROR_STATES]
+    + [
+        LogPattern(r"picked up chip from tray"
+                   r"(?:\D*(?P<tray>\d+)(?:\D+(?P<col>\d+)\D+(?P<row>\d+))?)?",
+                   "moving_chip_to_socket", MESSAGE_PRIORITY),
+        LogPattern(r"jumped to dat(?:\D*(?P<dat>\d+))?", "testing", MESSAGE_PRIORITY),
+        LogPattern(re.escape("MoveChipFromTrayToSocket"), "moving_chip_to_socket", MESSAGE_PRIORITY),
+    ]
+    + [LogPattern(re.escape(name), name, STATE_PRIORITY) for name in _NORMAL_STATES]
+)
+
+_NAMED_GROUP = re.compile(r"\(\?P([<=])([A-Za-z_]\w*)")
+_METACHARS = ".^$*+?{}[]()|"
+
+
+def _leading_literal(pattern):
+    """
+    Literal text every match of pattern must start with, or "" if there is
+    none (or the pattern has alternatives).
+    """
+    chars = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            if i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+                chars.append(pattern[i + 1])
+                i += 2
+                continue
+            break
+        if c in _METACHARS:
+            break
+        chars.append(c)
+        i += 1
+    if re.search(r"(?<!\\)\|", pattern):
+        return ""
+    # A quantifier right after the literal makes its last character optional
+    if chars and i < len(pattern) and pattern[i] in "*?{":
+        chars.pop()
+    return "".join(chars)
+
+
+class LogMatcher:
+    """
+    Pattern table compiled for one-pass matching of log lines.
+
+    Attributes:
+        patterns (list): LogPattern entries in match order (priority, then table order)
+    """
+
+    def __init__(self, patterns=DEFAULT_PATTERNS, ignore_case=True):
+        entries = [p if isinstance(p, LogPattern) else LogPattern(*p) for p in patterns]
+        order = sorted(range(len(entries)), key=lambda i: (-entries[i].priority, i))
+        self.patterns = [entries[i] for i in order]
+        flags = re.IGNORECASE if ignore_case else 0
+
+        alternatives = []
+        self._groups = []
+        for index, entry in enumerate(self.patterns):
+            # Validate each pattern on its own so a bad entry is reported by name
+            try:
+                names = list(re.compile(entry.pattern, flags).groupindex)
+            except re.error as e:
+                raise ValueError(f"Invalid pattern for state '{entry.state}': {e}") from None
+            # Group names must be unique across the combined regex
+            prefixed = _NAMED_GROUP.sub(lambda m, i=index: f"(?P{m.group(1)}p{i}_{m.group(2)}", entry.pattern)
+            alternatives.append(f"(?=.*?(?P<p{index}>{prefixed}))")
+            self._groups.append([(f"p{index}_{name}", name) for name in names])
+
+        # Keywords are searched as plain strings in the (lowercased) line
+        self._lower = ignore_case
+        keywords = [p.keyword if p.keyword is not None else _leading_literal(p.pattern) for p in self.patterns]
+        if all(keywords):
+            keywords = sorted({k.lower() if ignore_case else k for k in keywords}, key=len, reverse=True)
+            self._prefilter = re.compile("|".join(re.escape(k) for k in keywords))
+        else:
+            self._prefilter = None
+        self._selector = re.compile("|".join(alternatives), flags)
+        self._outer = {self._selector.groupindex[f"p{i}"]: i for i in range(len(self.patterns))}
+
+    def match(self, line):
+        """
+        Find the highest-priority pattern in a log line.
+
+        Args:
+            line (str): One log line
+
+        Returns:
+            LogMatch or None: Matched state name, the LogPattern, and a dict of
+            captured groups (digit-only values converted to int); None if no
+            pattern occurs in the line
+        """
+        if self._prefilter is not None:
+            if self._prefilter.search(line.lower() if self._lower else line) is None:
+                return None
+        m = self._selector.match(line)
+        if m is None:
+            return None
+        index = self._outer.get(m.lastindex)
+        if index is None:
+            index = next(i for i in range(len(self.patterns)) if m.group(f"p{i}") is not None)
+        entry = self.patterns[index]
+        captures = {}
+        for group, name in self._groups[index]:
+            value = m.group(group)
+            if value is not None:
+                captures[name] = int(value) if value.isdigit() else value
+        return LogMatch(entry.state, entry, captures)
+
+    def states(self):
+        """Return the set of state names the table can produce."""
+        return {p.state for p in self.patterns}
+
+
+def load_patterns(path):
+    """
+    Read a pattern table from a JSON file.
+
+    The file holds a list of objects with "pattern", "state" and optional
+    "priority" (default 0) and "keyword" (literal text every match contains;
+    derived from the pattern if omitted). Set "literal": true to match the
+    pattern text as a plain substring.
+
+    Raises:
+        ValueError: If an entry has no pattern or state
+    """
+    with open(path) as f:
+        entries = json.load(f)
+    patterns = []
+    for i, entry in enumerate(entries):
+        if "pattern" not in entry or "state" not in entry:
+            raise ValueError(f"Pattern entry {i} needs 'pattern' and 'state'")
+        text = re.escape(entry["pattern"]) if entry.get("literal") else entry["pattern"]
+        patterns.append(LogPattern(text, entry["state"], entry.get("priority", 0), entry.get("keyword")))
+    return patterns
@@ -0,0 +1,202 @@
+"""
+Offline replay of finished RobotLog files into a state timeline.
+
+Runs each log through the same LogMatcher pattern table that
+read_log_and_transition uses, as fast as the file can be read: no live
+state machine, no polling, no side effects. Each change of state (or of
+the chip being handled) becomes one row of a columnar timeline:
+
+    file        log file the row came from
+    line        line number of the log line that caused the change
+    timestamp   time parsed from that line (None if the line has none)
+    state       state id entered (e.g. "testing")
+    chip_index  chip being handled, 0-based
+    dwell_s     seconds until the next row (or the last
+                timestamped line of the file)
+
+The timeline is written with pandas (imported only when writing) to
+Parquet or CSV, chosen by the output file extension.
+
+Chip index: a line that names a chip position ("Picked up chip from
+tray 2 col 3 row 4") selects that chip in the tray layout; otherwise every
+new entry into moving_chip_to_socket moves on to the next chip.
+
+Usage:
+    python LogReplay.py RobotLog*.txt -o timeline.parquet --summary
+    python LogReplay.py logs/2025-*/RobotLog.txt -o timeline.csv --jobs 8
+"""
+
+import argparse
+import re
+from datetime import datetime
+
+from ChipTable import ChipTable
+from LogMatcher import LogMatcher, load_patterns
+
+COLUMNS = ("file", "line", "timestamp", "state", "chip_index", "dwell_s")
+
+# ISO-like date and time at the start of the line, optionally in brackets
+DEFAULT_TIME_PATTERN = r"^\s*\[?(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?)"
+
+
+class TimestampParser:
+    """
+    Extracts the timestamp of a log line.
+
+    Attributes:
+        pattern (re.Pattern): Regex whose first group is the timestamp text
+        time_format (str): strptime format, or None for ISO 8601
+    """
+
+    def __init__(self, pattern=DEFAULT_TIME_PATTERN, time_format=None):
+        self.pattern = re.compile(pattern)
+        self.time_format = time_format
+
+    def __call__(self, line):
+        """Return the line's timestamp as a datetime, or None."""
+        m = self.pattern.search(line)
+        if m is None:
+            return None
+        text = m.group(1)
+        try:
+            if self.time_format:
+                return datetime.strptime(text, self.time_format)
+            return datetime.fromisoformat(text.replace(",", "."))
+        except ValueError:
+            return None
+
+
+def replay_file(path, matcher=None, parse_time=None, chips=None):
+    """
+    Replay one log file into timeline columns.
+
+    Args:
+        path (str): RobotLog file
+        matcher (LogMatcher, optional): Pattern table (default: LogMatcher())
+        parse_time (callable, optional): line -> datetime or None (default: TimestampParser())
+        chips (ChipTable, optional): Tray layout for logged chip positions (default: full tray)
+
+    Returns:
+        dict: Column name -> list, with the COLUMNS keys
+    """
+    matcher = matcher or LogMatcher()
+    parse_time = parse_time or TimestampParser()
+    chips = chips if chips is not None else ChipTable.full_tray()
+    timeline = {key: [] for key in COLUMNS}
+
+    state = None
+    chip_index = -1
+    end = None      # time of the last timestamped line
+    with open(path, "r", errors="replace") as f:
+        for number, line in enumerate(f, 1):
+            timestamp = parse_time(line)
+            if timestamp is not None:
+                end = timestamp
+            match = matcher.match(line)
+            if match is None:
+                continue
+            captures = match.captures
+            if 'col' in captures and 'row' in captures:
+                found = chips.find(captures['col'], captures['row'], captures.get('tray'))
+                if found is not None:
+                    chip_index = found
+            elif match.state == "moving_chip_to_socket" and state != "moving_chip_to_socket":
+                chip_index += 1
+            chip = max(chip_index, 0)
+            if match.state == state and timeline["chip_index"] and timeline["chip_index"][-1] == chip:
+                continue
+            state = match.state
+            timeline["file"].append(path)
+            timeline["line"].append(number)
+            timeline["timestamp"].append(timestamp)
+            timeline["state"].append(state)
+            timeline["chip_index"].append(chip)
+
+    # Dwell: time from each change to the next one, and from the last change
+    # to the end of the log
+    times = timeline["timestamp"]
+    for i, start in enumerate(times):
+        stop = times[i + 1] if i + 1 < len(times) else end
+        timeline["dwell_s"].append((stop - start).total_seconds() if start and stop else None)
+    return timeline
+
+
+def _replay_job(args):
+    path, patterns, time_pattern, time_format = args
+    matcher = LogMatcher(patterns) if patterns else LogMatcher()
+    return replay_file(path, matcher, TimestampParser(time_pattern, time_format))
+
+
+def replay_files(paths, patterns=None, time_pattern=DEFAULT_TIME_PATTERN, time_format=None, jobs=1):
+    """
+    Replay several log files, optionally in parallel worker processes.
+
+    Returns:
+        dict: Column name -> list, files concatenated in the given order
+    """
+    jobs_args = [(path, patterns, time_pattern, time_format) for path in paths]
+    if jobs > 1 and len(paths) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            parts = list(pool.map(_replay_job, jobs_args))
+    else:
+        parts = [_replay_job(args) for args in jobs_args]
+    timeline = {key: [] for key in COLUMNS}
+    for part in parts:
+        for key in COLUMNS:
+            timeline[key].extend(part[key])
+    return timeline
+
+
+def to_dataframe(timeline):
+    """Return the timeline as a pandas DataFrame."""
+    import pandas as pd
+    df = pd.DataFrame(timeline, columns=list(COLUMNS))
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    return df
+
+
+def write_timeline(timeline, path):
+    """
+    Write the timeline to path: Parquet for .parquet/.pq (needs pyarrow or
+    fastparquet), CSV otherwise.
+
+    Returns:
+        pandas.DataFrame: The written table
+    """
+    df = to_dataframe(timeline)
+    if path.endswith((".parquet", ".pq")):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return df
+
+
+def dwell_summary(df):
+    """Return count, total and mean dwell per state, longest total first."""
+    summary = df.groupby("state")["dwell_s"].agg(["count", "sum", "mean"])
+    return summary.sort_values("sum", ascending=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay RobotLog files into a state timeline")
+    parser.add_argument("logs", nargs="+", help="RobotLog files")
+    parser.add_argument("-o", "--output", default="timeline.csv", help=".parquet or .csv")
+    parser.add_argument("--patterns", help="JSON pattern table (see LogMatcher.load_patterns)")
+    parser.add_argument("--time-regex", default=DEFAULT_TIME_PATTERN,
+                        help="Regex whose first group is the line timestamp")
+    parser.add_argument("--time-format", help="strptime format of the timestamp (default: ISO 8601)")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes")
+    parser.add_argument("--summary", action="store_true", help="Print dwell time per state")
+    args = parser.parse_args(argv)
+
+    patterns = load_patterns(args.patterns) if args.patterns else None
+    timeline = replay_files(args.logs, patterns, args.time_regex, args.time_format, args.jobs)
+    df = write_timeline(timeline, args.output)
+    print(f"Wrote {len(df)} state changes from {len(args.logs)} log(s) to {args.output}")
+    if args.summary:
+        print(dwell_summary(df).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Incremental, rotation-aware tailing of the RobotLog.
+
+LogTailer remembers the byte offset it has read up to and only reads
+bytes appended since, so the cost of a poll does not grow with the size
+of the log. A partial last line is held back until its newline arrives.
+If the file is truncated or replaced (rotation: the inode changes), reading
+restarts from the beginning of the new file.
+
+On Linux the tailer sleeps on inotify (through ctypes, no extra
+dependency) and wakes as soon as the log's directory reports a change to
+the file; elsewhere, or if inotify is unavailable, it polls at a short
+interval.
+
+Classes:
+    LogTailer: Incremental reader for a growing log file
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_WATCH_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM
+               | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Minimal inotify watch on the directory of one file."""
+
+    def __init__(self, path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        directory = os.path.dirname(os.path.abspath(path))
+        self.name = os.path.basename(path).encode()
+        if libc.inotify_add_watch(self.fd, directory.encode(), _WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, "inotify_add_watch failed")
+
+    def wait(self, timeout):
+        """Block until the watched file changes or timeout seconds pass."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            ready, _, _ = select.select([self.fd], [], [], remaining)
+            if not ready:
+                return False
+            if self._drain():
+                return True
+
+    def _drain(self):
+        relevant = False
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return relevant
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if name == self.name:
+                    relevant = True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class LogTailer:
+    """
+    Incremental reader of a growing log file.
+
+    Attributes:
+        path (str): Log file
+        offset (int): Byte offset read up to
+        poll_interval (float): Sleep between polls when inotify is not used
+        rotations (int): Number of truncations/replacements detected
+    """
+
+    def __init__(self, path, poll_interval=0.05, from_start=True, use_inotify=True, encoding="utf-8"):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.encoding = encoding
+        self.offset = 0
+        self.rotations = 0
+        self._inode = None
+        self._partial = b""
+        self._notifier = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._notifier = _Inotify(path)
+            except (OSError, AttributeError):
+                self._notifier = None
+        if not from_start:
+            try:
+                stat = os.stat(path)
+                self.offset, self._inode = stat.st_size, stat.st_ino
+            except FileNotFoundError:
+                pass
+
+    @property
+    def uses_inotify(self):
+        """True if change notification is active, False if polling."""
+        return self._notifier is not None
+
+    def read_lines(self):
+        """
+        Return the complete lines appended since the last call, without
+        their line endings. Returns [] if the file does not exist (yet).
+        """
+        try:
+            with open(self.path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                if (self._inode is not None and stat.st_ino != self._inode) or stat.st_size < self.offset:
+                    # Rotated or truncated: start over on the new contents
+                    self.rotations += 1
+                    self.offset = 0
+                    self._partial = b""
+                self._inode = stat.st_ino
+                if stat.st_size == self.offset:
+                    return []
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        self.offset += len(data)
+
+        data = self._partial + data
+        end = data.rfind(b"\n")
+        if end < 0:
+            self._partial = data
+            return []
+        self._partial = data[end + 1:]
+        return [line.decode(self.encoding, errors="replace").rstrip("\r")
+                for line in data[:end].split(b"\n")]
+
+    def wait(self, timeout=1.0):
+        """
+        Block until the file may have changed: an inotify event, or one poll
+        interval when polling. Returns early at timeout either way.
+        """
+        if self._notifier is not None:
+            return self._notifier.wait(timeout)
+        time.sleep(min(self.poll_interval, timeout))
+        return True
+
+    def follow(self, timeout=1.0):
+        """Yield lines as they are appended, forever."""
+        while True:
+            for line in self.read_lines():
+                yield line
+            self.wait(timeout)
+
+    def close(self):
+        """Release the change notification watch."""
+        if self._notifier is not None:
+            self._notifier.close()
+            self._notifier = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,178 @@
+"""
+Non-blocking event bus for state machine transitions.
+
+RTSStateMachine publishes one TransitionEvent per transition. publish()
+only puts the event on a bounded queue and never waits: if the queue is
+full the event is dropped and counted, so a slow subscriber can never
+delay a robot move. A background thread takes events off the queue and
+hands each one to every subscriber (or schedules it on an asyncio loop,
+see subscribe_async); an exception in one subscriber is counted and
+printed and does not affect the others.
+
+Classes:
+    TransitionEvent: One state transition
+    EventBus: Bounded queue, dispatch thread and subscribers
+
+Example:
+    sm.event_bus.subscribe(lambda e: print(e.target, e.chip_index))
+"""
+
+import queue
+import threading
+import time
+from collections import namedtuple
+
+TransitionEvent = namedtuple(
+    "TransitionEvent", ["event", "source", "target", "chip_index", "timestamp", "payload"])
+TransitionEvent.__doc__ = """
+One state transition.
+
+Attributes:
+    event (str): Event that caused it (e.g. "cycle")
+    source (str): State id left
+    target (str): State id entered
+    chip_index (int): Current chip when the transition completed
+    timestamp (float): time.time() of the transition
+    payload (dict): Extra data (e.g. the chip position)
+"""
+
+_STOP = object()
+
+
+class EventBus:
+    """
+    Bounded, non-blocking publish/subscribe queue with one dispatch thread.
+
+    Attributes:
+        maxsize (int): Queue capacity; events published while it is full are dropped
+        published (int): Events accepted into the queue
+        dropped (int): Events dropped because the queue was full
+        delivered (int): Subscriber calls completed
+        errors (int): Subscriber calls that raised
+    """
+
+    def __init__(self, maxsize=1024, name="rts-events"):
+        self.maxsize = maxsize
+        self.name = name
+        self.published = 0
+        self.dropped = 0
+        self.delivered = 0
+        self.errors = 0
+        self._queue = queue.Queue(maxsize)
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, callback, kinds=None):
+        """
+        Call callback(event) on the dispatch thread for every event.
+
+        Args:
+            callback (callable): Subscriber
+            kinds (iterable, optional): Only events whose target state id is in kinds
+
+        Returns:
+            callable: callback, so subscribe can be used as a decorator
+        """
+        with self._lock:
+            self._subscribers.append((callback, frozenset(kinds) if kinds else None))
+        self.start()
+        return callback
+
+    def subscribe_async(self, loop, coroutine_function, kinds=None):
+        """
+        Run coroutine_function(event) as a task on a running asyncio loop
+        (e.g. the RTS_MultiStand loop) for every event.
+        """
+        import asyncio
+
+        def forward(event):
+            asyncio.run_coroutine_threadsafe(coroutine_function(event), loop)
+        forward.__name__ = getattr(coroutine_function, '__name__', 'forward')
+        return self.subscribe(forward, kinds)
+
+    def unsubscribe(self, callback):
+        """Stop delivering events to callback."""
+        with self._lock:
+            self._subscribers = [(c, k) for c, k in self._subscribers if c is not callback]
+
+    def publish(self, event):
+        """
+        Queue an event without blocking.
+
+        Returns:
+            bool: False if the event was dropped because the queue is full
+        """
+        if not self._subscribers:
+            return True
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.published += 1
+        return True
+
+    def start(self):
+        """Start the dispatch thread if it is not running."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._dispatch, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _dispatch(self):
+        while True:
+            event = self._queue.get()
+            try:
+                if event is _STOP:
+                    return
+                with self._lock:
+                    subscribers = list(self._subscribers)
+                for callback, kinds in subscribers:
+                    if kinds is not None and event.target not in kinds:
+                        continue
+                    try:
+                        callback(event)
+                        self.delivered += 1
+                    except Exception as e:
+                        self.errors += 1
+                        print(f"Event subscriber {getattr(callback, '__name__', callback)} failed: {e!r}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout=None):
+        """
+        Wait until every queued event has been delivered.
+
+        Returns:
+            bool: False if timeout seconds passed first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def stop(self, timeout=1.0):
+        """Deliver the queued events, then stop the dispatch thread."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+
+    def stats(self):
+        """Return the published, dropped, delivered, error and queued counts."""
+        return {
+            "published": self.published,
+            "dropped": self.dropped,
+            "delivered": self.delivered,
+            "errors": self.errors,
+            "queued": self._queue.qsize(),
+        }
@@ -0,0 +1,156 @@
+"""
+Crash-safe journal of tray progress.
+
+The journal is an append-only file of JSON lines. Every record is flushed
+and fsync'd before write() returns, so after a crash or power loss the
+file holds every record written before it (a torn last line is ignored
+when the journal is read back).
+
+Records:
+    {"type": "tray_start", "chips": [...], "session": id}   tray run begins
+    {"type": "transition", "event": e, "source": s, "target": t, "chip": i}
+    {"type": "chip", "chip": i, "status": code, "result": code}
+    {"type": "tray_end"}                                     tray run finished
+
+replay() folds the records of the last tray run into the information
+RTSStateMachine needs to continue it: the chips, their status and result,
+the current chip and the last state.
+
+Classes:
+    Journal: Append-only, fsync'd record writer
+    ResumePoint: Progress of an unfinished tray run
+
+Functions:
+    load_journal: Read the records of a journal file
+    replay: Progress of the last tray run in a list of records
+"""
+
+import json
+import os
+import threading
+import time
+
+
+class Journal:
+    """
+    Append-only journal file.
+
+    Attributes:
+        path (str): Journal file
+        fsync (bool): fsync every record (disable only for tests and benchmarks)
+    """
+
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self._file = open(path, "a")
+        self._lock = threading.Lock()
+
+    def write(self, record_type, **fields):
+        """Append one record and make it durable."""
+        record = {"t": time.time(), "type": record_type}
+        record.update(fields)
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    def tray_start(self, chip_positions, session=None):
+        """Record the start of a tray run and its chips (a ChipTable)."""
+        self.write("tray_start", chips=chip_positions.to_records(), session=session)
+
+    def transition(self, event, source, target, chip):
+        """Record a completed state transition."""
+        self.write("transition", event=event, source=source, target=target, chip=chip)
+
+    def chip(self, index, status, result=None):
+        """Record a chip's new status and result."""
+        self.write("chip", chip=index, status=status, result=result)
+
+    def tray_end(self):
+        """Record that the tray run finished."""
+        self.write("tray_end")
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def load_journal(path):
+    """
+    Read a journal file.
+
+    Returns:
+        list: Records in file order; [] if the file does not exist. A last
+        line cut short by a crash is skipped.
+    """
+    records = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return records
+
+
+class ResumePoint:
+    """
+    Progress of an unfinished tray run, rebuilt from the journal.
+
+    Attributes:
+        chips (list): Chip records of the tray, in processing order
+        status (dict): Chip index -> (status, result) codes
+        chip_index (int): Chip being processed at the last transition
+        state (str): State id entered by the last transition, or None
+        last_normal_state (str): Last state id of the normal cycle entered, or None
+        session (str): Session ID of the run, or None
+    """
+
+    def __init__(self, chips, session=None):
+        self.chips = chips
+        self.session = session
+        self.status = {}
+        self.chip_index = 0
+        self.state = None
+        self.last_normal_state = None
+
+
+def replay(records, normal_states=()):
+    """
+    Rebuild the progress of the last tray run.
+
+    Args:
+        records (list): Journal records
+        normal_states (iterable): State ids of the normal cycle, used to
+            find the state to resume to after an error or pause state
+
+    Returns:
+        ResumePoint or None: None if there is no tray run, or the last one
+        finished
+    """
+    point = None
+    for record in records:
+        kind = record.get("type")
+        if kind == "tray_start":
+            point = ResumePoint(record.get("chips", []), record.get("session"))
+        elif point is None:
+            continue
+        elif kind == "transition":
+            point.state = record["target"]
+            point.chip_index = record["chip"]
+            if point.state in normal_states:
+                point.last_normal_state = point.state
+        elif kind == "chip":
+            previous = point.status.get(record["chip"], (0, 0))
+            result = record["result"] if record.get("result") is not None else previous[1]
+            point.status[record["chip"]] = (record["status"], result)
+        elif kind == "tray_end":
+            point = None
+    return point
@@ -0,0 +1,201 @@
+"""
+Throughput and dwell-time metrics for the state machine.
+
+RTSMetrics is updated directly on every transition: one monotonic clock
+read and a few dictionary updates under a lock. It keeps
+
+    rts_state_entries_total{lane,state}         times each state was entered
+    rts_state_dwell_seconds_total{lane,state}   time spent in each state
+    rts_state_dwell_seconds_max{lane,state}     longest single stay
+    rts_transitions_total{lane,source,target}   transitions between states
+    rts_current_state_seconds{lane,state}       time in the current state so far
+    rts_chips_completed_total                   chips returned to the tray
+    rts_chips_per_hour{window}                  rolling throughput (5 min, 1 h)
+
+The lane is "main" for the state machine itself and the lane name (e.g.
+"DAT2-21") for handle_tray_pipelined(). Error states (lost_vacuum,
+bad_contact, ...) are states like any other, so their counts and
+durations appear under their own state label.
+
+The metrics are rendered in the Prometheus text format, written to a file
+for the node_exporter textfile collector, or served over HTTP.
+
+Classes:
+    RTSMetrics: Dwell timers, transition counters and throughput windows
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+MAIN_LANE = "main"
+THROUGHPUT_WINDOWS = (300, 3600)
+
+
+class RTSMetrics:
+    """
+    Metrics of one state machine.
+
+    Attributes:
+        started (float): time.monotonic() at creation
+        chips_completed (int): Chips returned to the tray
+    """
+
+    def __init__(self, initial_state=None, windows=THROUGHPUT_WINDOWS):
+        self.started = time.monotonic()
+        self.windows = tuple(windows)
+        self.chips_completed = 0
+        self._lock = threading.Lock()
+        self._current = {}          # lane -> (state, entered at)
+        self._entries = {}          # (lane, state) -> count
+        self._dwell = {}            # (lane, state) -> seconds
+        self._dwell_max = {}        # (lane, state) -> seconds
+        self._transitions = {}      # (lane, source, target) -> count
+        self._completions = deque()
+        self._http = None
+        self._writer = None
+        if initial_state is not None:
+            self.observe(None, initial_state)
+
+    def observe(self, source, target, lane=MAIN_LANE, now=None):
+        """
+        Record a transition into target: closes the dwell timer of the
+        lane's current state and starts one for target.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            current = self._current.get(lane)
+            if current is not None:
+                state, entered = current
+                dwell = now - entered
+                key = (lane, state)
+                self._dwell[key] = self._dwell.get(key, 0.0) + dwell
+                if dwell > self._dwell_max.get(key, 0.0):
+                    self._dwell_max[key] = dwell
+            if source is not None:
+                key = (lane, source, target)
+                self._transitions[key] = self._transitions.get(key, 0) + 1
+            key = (lane, target)
+            self._entries[key] = self._entries.get(key, 0) + 1
+            self._current[lane] = (target, now)
+
+    def chip_done(self, now=None):
+        """Count a chip returned to the tray."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.chips_completed += 1
+            self._completions.append(now)
+            horizon = now - max(self.windows)
+            while self._completions and self._completions[0] < horizon:
+                self._completions.popleft()
+
+    def chips_per_hour(self, window, now=None):
+        """Chips completed in the last window seconds, scaled to one hour."""
+        now = time.monotonic() if now is None else now
+        # Until a full window has passed, rate over the time since start
+        span = min(window, now - self.started)
+        if span <= 0:
+            return 0.0
+        with self._lock:
+            count = sum(1 for t in self._completions if t >= now - window)
+        return count * 3600.0 / span
+
+    def dwell(self, state, lane=MAIN_LANE):
+        """Total seconds spent in a state, excluding the current stay."""
+        with self._lock:
+            return self._dwell.get((lane, state), 0.0)
+
+    def render(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        now = time.monotonic()
+        with self._lock:
+            entries = dict(self._entries)
+            dwell = dict(self._dwell)
+            dwell_max = dict(self._dwell_max)
+            transitions = dict(self._transitions)
+            current = dict(self._current)
+            chips = self.chips_completed
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        family("rts_state_entries_total", "counter", "Times each state was entered",
+               [((("lane", l), ("state", s)), n) for (l, s), n in sorted(entries.items())])
+        family("rts_state_dwell_seconds_total", "counter", "Seconds spent in each state (completed stays)",
+               [((("lane", l), ("state", s)), f"{v:.6f}") for (l, s), v in sorted(dwell.items())])
+        family("rts_state_dwell_seconds_max", "gauge", "Longest single stay in each state",
+               [((("lane", l), ("state", s)), f"{v:.6f}") for (l, s), v in sorted(dwell_max.items())])
+        family("rts_transitions_total", "counter", "Transitions between states",
+               [((("lane", l), ("source", a), ("target", b)), n) for (l, a, b), n in sorted(transitions.items())])
+        family("rts_current_state_seconds", "gauge", "Seconds in the current state so far",
+               [((("lane", l), ("state", s)), f"{now - t:.6f}") for l, (s, t) in sorted(current.items())])
+        family("rts_chips_completed_total", "counter", "Chips returned to the tray", [((), chips)])
+        family("rts_chips_per_hour", "gauge", "Chips completed per hour over a rolling window",
+               [((("window", f"{w}s"),), f"{self.chips_per_hour(w, now):.3f}") for w in self.windows])
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Write the metrics to path atomically (node_exporter textfile collector)."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def export_textfile(self, path, interval=15.0):
+        """Rewrite the metrics file every interval seconds on a daemon thread."""
+        def run():
+            while not stop.wait(interval):
+                try:
+                    self.write_textfile(path)
+                except OSError as e:
+                    print(f"Error writing metrics to {path}: {e}")
+        stop = threading.Event()
+        self.write_textfile(path)
+        self._writer = (stop, threading.Thread(target=run, name="rts-metrics-writer", daemon=True))
+        self._writer[1].start()
+
+    def serve(self, port=9108, host="127.0.0.1"):
+        """
+        Serve the metrics at http://host:port/metrics on a daemon thread.
+
+        Returns:
+            tuple: (host, port) actually bound (port 0 picks a free port)
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._http = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._http.serve_forever, name="rts-metrics-http", daemon=True).start()
+        return self._http.server_address[:2]
+
+    def stop(self):
+        """Stop the HTTP server and the textfile writer."""
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+            self._http = None
+        if self._writer is not None:
+            self._writer[0].set()
+            self._writer = None
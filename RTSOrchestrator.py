@@ -0,0 +1,353 @@
+"""
+Run trays on several stands, one worker process per stand.
+
+RTS_MultiStand drives several robots from one asyncio loop; the
+orchestrator instead gives every stand its own process with its own
+RTSStateMachine and robot connection, so a stand that crashes, hangs in a
+blocking call or leaks memory cannot take the others down.
+
+    parent:   work queue of tray manifests ----> worker "stand1" -> RTSStateMachine
+                                          \\---> worker "stand2" -> RTSStateMachine
+              message queue <---- progress, chip results, tray summaries
+
+Each worker takes the next manifest from the shared work queue, builds a
+machine for it (RTSStateMachine with manifest= and journal=) and runs the
+tray. State transitions and chip status changes are sent back to the
+parent as they happen. The parent watches the workers: a worker that dies
+is reported as crashed, and a worker that sends nothing for hang_timeout
+seconds while processing a tray is terminated and reported as hung. In
+both cases only that stand's tray fails; the other stands keep taking
+trays.
+
+Every tray has its own journal in journal_dir, named after the manifest.
+Running a failed manifest again resumes it: chips already returned to
+the tray are skipped.
+
+Workers run unattended: an error that the recovery policy escalates to an
+operator pause fails the tray (OperatorRequired) instead of waiting on
+input(). Their console output goes to one log file per stand.
+
+Classes:
+    OperatorRequired: Raised in a worker when the machine would pause
+    TrayOrchestrator: Work queue, stand workers and result gathering
+
+Usage:
+    python RTSOrchestrator.py trays/*.csv --stand stand1=192.168.121.1:201 --stand stand2=192.168.122.1:201
+    python RTSOrchestrator.py trays/*.csv --sim 4 --json results.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+from ChipTable import STATUS_NAMES, RESULT_NAMES
+
+
+class OperatorRequired(RuntimeError):
+    """An unattended stand reached the operator pause."""
+
+
+def _chip_records(chip_positions):
+    records = chip_positions.to_records()
+    for index, record in enumerate(records):
+        record['status'] = STATUS_NAMES.get(chip_positions.status[index])
+        record['result'] = RESULT_NAMES.get(chip_positions.result[index])
+    return records
+
+
+def _journal_path(journal_dir, manifest):
+    stem = os.path.splitext(os.path.basename(manifest))[0]
+    return os.path.join(journal_dir, f"{stem}.journal")
+
+
+def _machine_class():
+    from RTSStateMachine import RTSStateMachine
+
+    class UnattendedMachine(RTSStateMachine):
+        """RTSStateMachine that reports progress to the parent and never prompts."""
+
+        def pause_with_user_input(self):
+            raise OperatorRequired(f"Operator needed at chip {self.current_chip_index + 1}")
+
+        def record_chip_status(self, index, status, result=None):
+            super().record_chip_status(index, status, result)
+            report = getattr(self, 'report', None)
+            if report is not None:
+                report('chip', index, STATUS_NAMES.get(status), RESULT_NAMES.get(result))
+
+    return UnattendedMachine
+
+
+def _run_tray(machine_class, name, manifest, messages, rts, options):
+    """Process one tray in a worker and report its outcome."""
+    def report(kind, *fields):
+        messages.put((kind, name, manifest) + fields)
+
+    start = time.perf_counter()
+    journal = _journal_path(options['journal_dir'], manifest) if options['journal_dir'] else None
+    try:
+        sm = machine_class(interactive=False, manifest=manifest, journal=journal)
+    except Exception as e:
+        report('tray_failed', repr(e), [], time.perf_counter() - start)
+        return
+    sm.report = report
+    sm.BypassRTS = rts is None
+    sm.rts = rts
+    sm.event_bus.subscribe(lambda event: report('state', event.target, event.chip_index))
+    report('tray_start', len(sm.chip_positions), sm.resume_point is not None)
+    try:
+        if options['pipelined']:
+            sm.handle_tray_pipelined(plan=options['plan'], sim_seconds=options['sim_seconds'])
+        else:
+            sm.handle_tray(plan=options['plan'])
+    except Exception as e:
+        sm.event_bus.stop()
+        report('tray_failed', repr(e), _chip_records(sm.chip_positions), time.perf_counter() - start)
+    else:
+        sm.event_bus.stop()
+        recovery = sm.recovery.stats() if sm.recovery is not None else None
+        report('tray_done', _chip_records(sm.chip_positions), time.perf_counter() - start, recovery)
+    finally:
+        if sm.journal is not None:
+            sm.journal.close()
+
+
+def _stand_worker(stand, work, messages, options):
+    """Worker process: take manifests from the work queue until a None arrives."""
+    name = stand['name']
+    if options['log_dir']:
+        log = open(os.path.join(options['log_dir'], f"{name}.log"), "a", buffering=1)
+        sys.stdout = sys.stderr = log
+    rts = None
+    try:
+        if stand.get('host_ip'):
+            from RTS_CFG import RTS_CFG
+            rts = RTS_CFG()
+            rts.rts_init(port=stand.get('port', 201), host_ip=stand['host_ip'])
+        machine_class = _machine_class()
+        messages.put(('ready', name, os.getpid()))
+        while True:
+            manifest = work.get()
+            if manifest is None:
+                break
+            _run_tray(machine_class, name, manifest, messages, rts, options)
+    except Exception as e:
+        messages.put(('stand_error', name, repr(e)))
+    finally:
+        if rts is not None:
+            try:
+                rts.rts_shutdown()
+            except Exception as e:
+                print(f"Error during shutdown: {e!r}")
+        messages.put(('exit', name))
+
+
+def print_progress(message):
+    """Default progress callback: one line per tray event and finished chip."""
+    kind, name = message[0], message[1]
+    if kind == 'tray_start':
+        resumed = " (resumed)" if message[4] else ""
+        print(f"[{name}] {message[2]}: {message[3]} chips{resumed}")
+    elif kind == 'chip' and message[4] in ('done', 'bad'):
+        print(f"[{name}] {message[2]}: chip {message[3] + 1} {message[4]}")
+    elif kind == 'tray_done':
+        print(f"[{name}] {message[2]}: done in {message[4]:.1f} s")
+    elif kind == 'tray_failed':
+        print(f"[{name}] {message[2]}: FAILED {message[3]}")
+    elif kind in ('stand_error', 'crashed', 'hung'):
+        print(f"[{name}] stand {kind}: {message[2]}")
+
+
+class TrayOrchestrator:
+    """
+    Hands tray manifests to one worker process per stand and gathers the results.
+
+    Args:
+        stands (list): One dict per stand with 'name' and, for hardware,
+            'host_ip' and 'port'; a stand without host_ip runs in simulation
+        journal_dir (str, optional): Folder for the per-tray journals (None: no journal)
+        log_dir (str, optional): Folder for the per-stand console logs (None: inherit stdout)
+        hang_timeout (float): Seconds without any message from a stand that is
+            processing a tray before it is terminated
+        pipelined (bool): Use handle_tray_pipelined() instead of handle_tray()
+        plan (bool): Reorder each tray to minimize arm travel
+        sim_seconds (dict, optional): Simulated durations for pipelined simulation stands
+        progress (callable, optional): Called in the parent with every worker
+            message; default print_progress
+        start_method (str, optional): multiprocessing start method (default: platform default)
+    """
+
+    def __init__(self, stands, journal_dir="journals", log_dir="stand_logs", hang_timeout=1800.0,
+                 pipelined=False, plan=False, sim_seconds=None, progress=print_progress,
+                 start_method=None):
+        names = [stand['name'] for stand in stands]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Stand names must be unique: {names}")
+        self.stands = list(stands)
+        self.hang_timeout = hang_timeout
+        self.progress = progress
+        self.poll_interval = 0.5
+        self.options = {
+            'journal_dir': journal_dir,
+            'log_dir': log_dir,
+            'pipelined': pipelined,
+            'plan': plan,
+            'sim_seconds': sim_seconds,
+        }
+        self._context = multiprocessing.get_context(start_method)
+
+    def run(self, manifests):
+        """
+        Process every manifest on the first free stand.
+
+        Returns:
+            dict: 'trays' (manifest -> stand, status, chips, seconds, error,
+            recovery), 'stands' (name -> trays, chips, error, exitcode),
+            'seconds', 'chips' and 'chips_per_hour'
+        """
+        for folder in (self.options['journal_dir'], self.options['log_dir']):
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+        manifests = list(manifests)
+        work = self._context.Queue()
+        messages = self._context.Queue()
+        for manifest in manifests:
+            work.put(manifest)
+        for _ in self.stands:
+            work.put(None)
+
+        trays = {m: {'stand': None, 'status': 'not_run', 'chips': [], 'seconds': 0.0,
+                     'error': None, 'recovery': None} for m in manifests}
+        stands = {s['name']: {'trays': 0, 'chips': 0, 'error': None, 'exitcode': None}
+                  for s in self.stands}
+        processes = {}
+        for stand in self.stands:
+            process = self._context.Process(target=_stand_worker, name=f"rts-{stand['name']}",
+                                            args=(stand, work, messages, self.options), daemon=True)
+            process.start()
+            processes[stand['name']] = process
+
+        start = time.perf_counter()
+        current = {}                                      # stand -> manifest in progress
+        last_seen = {name: time.monotonic() for name in processes}
+        live = set(processes)
+        while live:
+            try:
+                message = messages.get(timeout=self.poll_interval)
+            except queue.Empty:
+                message = None
+            if message is not None:
+                self._handle(message, trays, stands, current, live)
+                last_seen[message[1]] = time.monotonic()
+                continue
+            # The queue was empty for a whole poll interval, so every message
+            # of a dead worker has been handled
+            now = time.monotonic()
+            for name in list(live):
+                process = processes[name]
+                if not process.is_alive():
+                    self._lost(name, 'crashed', f"exit code {process.exitcode}", trays, stands, current, live)
+                elif name in current and now - last_seen[name] > self.hang_timeout:
+                    # Terminating a worker that is writing to the message queue
+                    # can corrupt it; a hung worker is not writing
+                    process.terminate()
+                    process.join(5)
+                    if process.is_alive():
+                        process.kill()
+                    self._lost(name, 'hung', f"no progress for {self.hang_timeout:.0f} s",
+                               trays, stands, current, live)
+
+        for name, process in processes.items():
+            process.join(5)
+            stands[name]['exitcode'] = process.exitcode
+        seconds = time.perf_counter() - start
+        chips = sum(s['chips'] for s in stands.values())
+        return {
+            'trays': trays,
+            'stands': stands,
+            'seconds': seconds,
+            'chips': chips,
+            'chips_per_hour': chips / seconds * 3600 if seconds > 0 else 0.0,
+        }
+
+    def _handle(self, message, trays, stands, current, live):
+        kind, name = message[0], message[1]
+        if kind == 'tray_start':
+            manifest = message[2]
+            current[name] = manifest
+            trays[manifest].update(stand=name, status='running')
+        elif kind == 'chip' and message[4] == 'done':
+            stands[name]['chips'] += 1
+        elif kind in ('tray_done', 'tray_failed'):
+            manifest = message[2]
+            tray = trays[manifest]
+            tray['stand'] = name
+            if kind == 'tray_done':
+                tray.update(status='done', chips=message[3], seconds=message[4], recovery=message[5])
+            else:
+                tray.update(status='failed', error=message[3], chips=message[4], seconds=message[5])
+            stands[name]['trays'] += 1
+            current.pop(name, None)
+        elif kind == 'stand_error':
+            stands[name]['error'] = message[2]
+        elif kind == 'exit':
+            live.discard(name)
+        if self.progress is not None:
+            self.progress(message)
+
+    def _lost(self, name, status, error, trays, stands, current, live):
+        """Record a worker that died or was terminated."""
+        live.discard(name)
+        stands[name]['error'] = f"{status}: {error}"
+        manifest = current.pop(name, None)
+        if manifest is not None:
+            trays[manifest].update(status=status, error=error)
+        if self.progress is not None:
+            self.progress((status, name, error))
+
+
+def _parse_stand(text):
+    """Parse 'name=host:port' from the command line."""
+    name, _, address = text.partition("=")
+    host, _, port = address.partition(":")
+    return {'name': name, 'host_ip': host, 'port': int(port) if port else 201}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run tray manifests on several stands in parallel")
+    parser.add_argument("manifests", nargs="+", help="CSV or JSON tray manifests")
+    parser.add_argument("--stand", action="append", default=[], type=_parse_stand,
+                        help="name=host:port of a hardware stand")
+    parser.add_argument("--sim", type=int, default=0, help="Add this many simulated stands")
+    parser.add_argument("--journal-dir", default="journals")
+    parser.add_argument("--log-dir", default="stand_logs")
+    parser.add_argument("--hang-timeout", type=float, default=1800.0)
+    parser.add_argument("--pipelined", action="store_true", help="Use both DAT sockets concurrently")
+    parser.add_argument("--plan", action="store_true", help="Reorder each tray to minimize arm travel")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args(argv)
+
+    stands = args.stand + [{'name': f"sim{i + 1}"} for i in range(args.sim)]
+    if not stands:
+        parser.error("give at least one --stand or --sim")
+    orchestrator = TrayOrchestrator(stands, args.journal_dir, args.log_dir, args.hang_timeout,
+                                    pipelined=args.pipelined, plan=args.plan)
+    results = orchestrator.run(args.manifests)
+    failed = [m for m, tray in results['trays'].items() if tray['status'] != 'done']
+    print(f"\n{results['chips']} chips in {results['seconds']:.1f} s "
+          f"({results['chips_per_hour']:.0f} chips/h), {len(failed)} tray(s) not done")
+    for manifest in failed:
+        tray = results['trays'][manifest]
+        print(f"  {manifest}: {tray['status']} on {tray['stand']}: {tray['error']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
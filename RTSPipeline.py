@@ -0,0 +1,261 @@
+"""
+Two-socket pipelined tray processing.
+
+The DAT board has two sockets (21/22, CD0/CD1). run_full_cycle() takes one
+chip at a time through all six states, so the robot is idle while a chip is
+testing and while its results are written to the HWDB. The pipeline runs
+each socket as an independent lane:
+
+    lane DAT2-21:  load A1 | test A1 ............ | upload A1 | unload A1 | load A2 ...
+    lane DAT2-22:            | load B1 | test B1 ............ | upload B1 | unload B1 ...
+    robot:         A1 in     B1 in                  A1 out      B1 out
+
+Each lane is a thread that takes its chips through moving_chip_to_socket,
+testing, writing_to_hwdb and moving_chip_to_tray. Moves go through one
+shared robot lock, so the arm does one move at a time; testing and upload
+run without the lock, overlapping with the other lane's moves. When test
+plus upload take longer than a load and an unload, two lanes roughly
+double the chips per hour.
+
+The state of each lane is kept in the state machine's lane_states dict
+(lane name -> State); the machine's own current_state is not changed.
+
+A failed test or upload only fails its chip. A failed load or unload, a
+robot fault or an interrupted move stops the lane in the matching error
+state and halts the pipeline: the chip may be in the socket, in the
+gripper or in the tray, so loading another chip could hit it. The other
+lanes unload the chips they hold and load no more, and
+RTSStateMachine.handle_tray_pipelined() pauses for the operator.
+
+A resumed run leaves out chips that are DONE or BAD. A chip left TESTED
+is still in its socket and is unloaded before its lane loads anything; a
+chip left IN_SOCKET stops its lane, since the load may not have finished.
+
+Classes:
+    Lane: One DAT socket and the chips assigned to it
+    PipelineScheduler: Runs the lanes of a tray concurrently
+"""
+
+import contextlib
+import threading
+import time
+
+from ChipTable import IN_SOCKET, TESTED, DONE, BAD, PASSED, FAILED
+from RTSEvents import TransitionEvent
+from RTS_Connection import RTSCommandInterrupted
+from RTS_StatusCodes import RobotFault
+
+
+class Lane:
+    """
+    One DAT socket and the chips that are tested in it.
+
+    Attributes:
+        name (str): Lane name, e.g. "DAT2-21"
+        dat (int): DAT board
+        dat_socket (int): Socket on the DAT board
+        chips (list): Indices into chip_positions, in processing order
+        done (int): Chips returned to the tray
+        errors (list): (chip index, step, error) for every failed step
+        stopped (tuple): (chip index, step, error) that stopped the lane, or None
+    """
+
+    def __init__(self, dat, dat_socket):
+        self.dat = dat
+        self.dat_socket = dat_socket
+        self.name = f"DAT{dat}-{dat_socket}"
+        self.chips = []
+        self.done = 0
+        self.errors = []
+        self.stopped = None
+
+
+class PipelineScheduler:
+    """
+    Runs the chips of a tray through one lane per DAT socket.
+
+    Args:
+        sm (RTSStateMachine): State machine holding chip_positions, rts and BypassRTS
+        test (callable, optional): test(sm, index) -> bool or None; runs the chip's
+            test. Returns False (or raises) for a failed chip.
+        upload (callable, optional): upload(sm, index); writes the results to the HWDB
+        sim_seconds (dict, optional): Simulated durations of 'move', 'test' and
+            'upload' when running without the robot or without test/upload callables
+        skip_done (bool): Resume a run: leave out chips already returned to the
+            tray or rejected, unload chips left TESTED in their socket first,
+            and stop the lane of a chip left IN_SOCKET, which may be in the
+            socket, in the gripper or in its pocket
+
+    Attributes:
+        lanes (list): Lane per DAT socket used by the tray
+        robot_lock (threading.Lock): Held for every robot move
+        robot_busy (float): Seconds the robot lock was held
+        halted (threading.Event): Set when a lane stopped; no more chips are loaded
+    """
+
+    def __init__(self, sm, test=None, upload=None, sim_seconds=None, skip_done=False):
+        self.sm = sm
+        self.test = test
+        self.upload = upload
+        self.sim_seconds = {'move': 0.0, 'test': 0.0, 'upload': 0.0}
+        self.sim_seconds.update(sim_seconds or {})
+        self.robot_lock = threading.Lock()
+        self.robot_busy = 0.0
+        self.halted = threading.Event()
+        self.resuming = skip_done
+        self.lanes = self._assign_lanes(skip_done)
+
+    def _assign_lanes(self, skip_done):
+        chips = self.sm.chip_positions
+        lanes = {}
+        for index in range(len(chips)):
+            if skip_done and chips.status[index] in (DONE, BAD):
+                continue
+            key = (chips['dat'][index], chips['dat_socket'][index])
+            if key not in lanes:
+                lanes[key] = Lane(*key)
+            lanes[key].chips.append(index)
+        return list(lanes.values())
+
+    def _set_state(self, lane, state, index=None):
+        previous = self.sm.lane_states.get(lane.name)
+        self.sm.lane_states[lane.name] = state
+        self.sm.metrics.observe(previous.id if previous is not None else None, state.id, lane=lane.name)
+        print(f"[{lane.name}] {state.name}")
+        self.sm.event_bus.publish(TransitionEvent(
+            "lane", previous.id if previous is not None else None, state.id,
+            index, time.time(), {'lane': lane.name}))
+
+    def _move(self, lane, index, to_socket):
+        """Move one chip with the robot lock held."""
+        sm = self.sm
+        with self.robot_lock:
+            start = time.perf_counter()
+            try:
+                if sm.BypassRTS:
+                    chip = sm.chip_positions.row_view(index)
+                    where = "socket" if to_socket else "tray"
+                    print(f"[SIMULATION] [{lane.name}] Moving chip {chip.label} at ({chip.col}, {chip.row}) to {where}")
+                    time.sleep(self.sim_seconds['move'])
+                elif to_socket:
+                    from FNAL_RTS_integration import MoveChipsToSockets
+                    MoveChipsToSockets(sm.rts, sm.chip_positions[index:index + 1])
+                else:
+                    from FNAL_RTS_integration import MoveChipsToTray
+                    MoveChipsToTray(sm.rts, sm.chip_positions[index:index + 1])
+            finally:
+                self.robot_busy += time.perf_counter() - start
+
+    def _step(self, lane, index, step, func, robot=False):
+        """
+        Run one step of a chip, recording a failure instead of raising.
+        A failed robot step, a robot fault or an interrupted move also
+        stops the lane (see _stop).
+        """
+        try:
+            return func()
+        except Exception as e:
+            print(f"[{lane.name}] Error in {step} of chip {index + 1}: {e}")
+            lane.errors.append((index, step, repr(e)))
+            if robot or isinstance(e, (RobotFault, RTSCommandInterrupted)):
+                self._stop(lane, index, step, e)
+            return False
+
+    def _stop(self, lane, index, step, error):
+        """Stop a lane in the error state of a failure and halt the pipeline."""
+        sm = self.sm
+        if isinstance(error, RobotFault):
+            state = {state.id: state for state in sm.states}.get(error.state, sm.pause)
+        elif isinstance(error, RTSCommandInterrupted):
+            state = sm.no_server_connection
+        else:
+            state = sm.pause
+        lane.stopped = (index, step, repr(error))
+        self.halted.set()
+        self._set_state(lane, state, index)
+
+    def _run_test(self, index):
+        if self.test is None:
+            time.sleep(self.sim_seconds['test'])
+            return True
+        return self.test(self.sm, index)
+
+    def _run_upload(self, index):
+        if self.upload is None:
+            time.sleep(self.sim_seconds['upload'])
+            return True
+        self.upload(self.sm, index)
+        return True
+
+    def _run_lane(self, lane):
+        sm = self.sm
+        for index in lane.chips:
+            status = sm.chip_positions.status[index] if self.resuming else None
+            if status == IN_SOCKET:
+                # The run stopped while this chip was loaded or tested
+                self._stop(lane, index, "resume", RuntimeError(f"chip {index + 1} may still be in the socket"))
+                return
+            # A chip left TESTED is in its socket: unload it, even when halted
+            if status != TESTED:
+                if self.halted.is_set():
+                    print(f"[{lane.name}] Pipeline halted, not loading chip {index + 1}")
+                    break
+                self._set_state(lane, sm.moving_chip_to_socket, index)
+                sm.record_chip_status(index, IN_SOCKET)
+                self._step(lane, index, "load", lambda: self._move(lane, index, True), robot=True)
+                if lane.stopped:
+                    return
+
+                self._set_state(lane, sm.testing, index)
+                passed = self._step(lane, index, "test", lambda: self._run_test(index))
+                if lane.stopped:
+                    return
+                sm.record_chip_status(index, TESTED, FAILED if passed is False else PASSED)
+
+                self._set_state(lane, sm.writing_to_hwdb, index)
+                self._step(lane, index, "upload", lambda: self._run_upload(index))
+                if lane.stopped:
+                    return
+
+            self._set_state(lane, sm.moving_chip_to_tray, index)
+            self._step(lane, index, "unload", lambda: self._move(lane, index, False), robot=True)
+            if lane.stopped:
+                return
+            sm.record_chip_status(index, DONE)
+            lane.done += 1
+        self._set_state(lane, sm.ground)
+
+    def run(self):
+        """
+        Process every chip of the tray, one lane thread per DAT socket.
+
+        Returns:
+            dict: chips, seconds, chips_per_hour, robot_busy_s, halted, and
+            per-lane {'chips', 'done', 'errors', 'stopped'}
+        """
+        sm = self.sm
+        sm.lane_states = {lane.name: sm.ground for lane in self.lanes}
+        hardware = not sm.BypassRTS
+        session = sm.rts.motor_session() if hardware else contextlib.nullcontext()
+        start = time.perf_counter()
+        with session:
+            threads = [threading.Thread(target=self._run_lane, args=(lane,), name=lane.name)
+                       for lane in self.lanes]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        if hardware:
+            sm.rts.park()
+        seconds = time.perf_counter() - start
+        chips = sum(len(lane.chips) for lane in self.lanes)
+        return {
+            'chips': chips,
+            'seconds': seconds,
+            'chips_per_hour': chips / seconds * 3600 if seconds > 0 else 0.0,
+            'robot_busy_s': self.robot_busy,
+            'halted': self.halted.is_set(),
+            'lanes': {lane.name: {'chips': len(lane.chips), 'done': lane.done, 'errors': lane.errors,
+                                  'stopped': lane.stopped}
+                      for lane in self.lanes},
+        }
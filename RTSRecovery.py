@@ -0,0 +1,155 @@
+"""
+Automatic recovery from error states, with retry budgets.
+
+The policy maps each error state to a recovery action:
+
+    retry     take the error_cycle recovery transition out of the error
+              (bad_contact -> moving_chip_to_socket, no_wib_connection ->
+              testing, failed_init -> reseat -> ground, ...)
+    restart   reset_cycle to ground and run the chip's cycle again
+    reject    reject_cycle to moving_chip_to_bad_tray; the chip is marked
+              BAD and the tray continues with the next chip
+    pause     pause_cycle to the operator pause menu
+
+Each rule allows a number of retries (or restarts) of its error for one
+chip. Retries are also limited per chip over all errors (chip_budget) and
+per tray (tray_budget). When a rule's retries or the chip budget are used
+up the rule escalates, to reject or pause; when the tray budget is used up
+the policy pauses, since many errors on one tray point at the stand rather
+than a chip.
+
+RecoveryPolicy only decides and counts; RTSStateMachine.recover() carries
+out the decision.
+
+Classes:
+    RecoveryRule: Action, retries and escalation for one error state
+    RecoveryPolicy: Rules, budgets and statistics
+
+Functions:
+    load_policy: Read recovery rules from a JSON file
+"""
+
+import json
+from collections import namedtuple
+
+RETRY = "retry"
+RESTART = "restart"
+REJECT = "reject"
+PAUSE = "pause"
+ACTIONS = (RETRY, RESTART, REJECT, PAUSE)
+
+RecoveryRule = namedtuple("RecoveryRule", ["action", "retries", "escalate"], defaults=(0, PAUSE))
+
+# Chip-related errors are retried, then the chip goes to the bad tray.
+# Errors of the stand itself (air, vacuum, safety guard) wait for an operator.
+DEFAULT_RULES = {
+    "bad_contact": RecoveryRule(RETRY, 2, REJECT),
+    "vision_sequence_failed": RecoveryRule(RETRY, 2, REJECT),
+    "chip_in_socket": RecoveryRule(RETRY, 1, PAUSE),
+    "no_chip": RecoveryRule(RETRY, 1, PAUSE),
+    "failed_init": RecoveryRule(RETRY, 1, REJECT),
+    "no_wib_connection": RecoveryRule(RETRY, 3, REJECT),
+    "failed_upload": RecoveryRule(RETRY, 3, PAUSE),
+    "no_server_connection": RecoveryRule(RESTART, 3, PAUSE),
+    "bad_pins": RecoveryRule(REJECT),
+    "no_serial_number": RecoveryRule(REJECT),
+    "no_pressure": RecoveryRule(PAUSE),
+    "lost_vacuum": RecoveryRule(PAUSE),
+    "safe_guard": RecoveryRule(PAUSE),
+}
+
+
+class RecoveryPolicy:
+    """
+    Decides the recovery action for each error and keeps the retry budgets.
+
+    Args:
+        rules (dict, optional): Error state id -> RecoveryRule, merged over
+            DEFAULT_RULES. Errors without a rule pause.
+        chip_budget (int): Retries and restarts allowed per chip, over all errors
+        tray_budget (int): Retries and restarts allowed per tray
+
+    Attributes:
+        counts (dict): Error state id -> {'seen', action...: count}
+        escalations (int): Decisions that escalated because a budget ran out
+        tray_retries (int): Retries and restarts used on the current tray
+
+    Raises:
+        ValueError: If a rule names an unknown action
+    """
+
+    def __init__(self, rules=None, chip_budget=5, tray_budget=20):
+        self.rules = dict(DEFAULT_RULES)
+        self.rules.update(rules or {})
+        for error, rule in self.rules.items():
+            if rule.action not in ACTIONS or rule.escalate not in (REJECT, PAUSE):
+                raise ValueError(f"Invalid recovery rule for {error}: {rule}")
+        self.chip_budget = chip_budget
+        self.tray_budget = tray_budget
+        self.counts = {}
+        self.escalations = 0
+        self.start_tray()
+
+    def start_tray(self):
+        """Reset the per-chip and per-tray budgets."""
+        self.tray_retries = 0
+        self._chip_retries = {}     # chip index -> retries
+        self._error_retries = {}    # (chip index, error) -> retries
+
+    def decide(self, error, chip_index):
+        """
+        Choose the action for an error of a chip and charge the budgets.
+
+        Returns:
+            str: RETRY, RESTART, REJECT or PAUSE
+        """
+        rule = self.rules.get(error, RecoveryRule(PAUSE))
+        action = rule.action
+        if action in (RETRY, RESTART):
+            used = self._error_retries.get((chip_index, error), 0)
+            if self.tray_retries >= self.tray_budget:
+                action = PAUSE
+            elif used >= rule.retries or self._chip_retries.get(chip_index, 0) >= self.chip_budget:
+                action = rule.escalate
+            else:
+                self._error_retries[(chip_index, error)] = used + 1
+                self._chip_retries[chip_index] = self._chip_retries.get(chip_index, 0) + 1
+                self.tray_retries += 1
+            if action != rule.action:
+                self.escalations += 1
+        count = self.counts.setdefault(error, {"seen": 0})
+        count["seen"] += 1
+        count[action] = count.get(action, 0) + 1
+        return action
+
+    def stats(self):
+        """Return the per-error counts, escalations and retries used on the tray."""
+        return {
+            "errors": {error: dict(count) for error, count in sorted(self.counts.items())},
+            "escalations": self.escalations,
+            "tray_retries": self.tray_retries,
+        }
+
+
+def load_policy(path, **budgets):
+    """
+    Read recovery rules from a JSON file.
+
+    The file holds an object mapping error state ids to objects with
+    "action" and optional "retries" (default 0) and "escalate" (default
+    "pause"). It may also set "chip_budget" and "tray_budget".
+
+    Raises:
+        ValueError: If a rule has no action or an invalid one
+    """
+    with open(path) as f:
+        entries = json.load(f)
+    for key in ("chip_budget", "tray_budget"):
+        if key in entries:
+            budgets.setdefault(key, entries.pop(key))
+    rules = {}
+    for error, entry in entries.items():
+        if "action" not in entry:
+            raise ValueError(f"Recovery rule for {error} needs an 'action'")
+        rules[error] = RecoveryRule(entry["action"], entry.get("retries", 0), entry.get("escalate", PAUSE))
+    return RecoveryPolicy(rules, **budgets)
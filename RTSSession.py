@@ -0,0 +1,205 @@
+"""
+Per-tray session store for images, OCR output and test logs.
+
+One session is opened per tray run. Each session gets a unique ID and its
+own folder with one sub-folder per chip, created only when the chip has
+files, and a manifest.json mapping each chip index to its position, status
+and the files recorded for it:
+
+    images/
+        sessions.jsonl                  one line per closed session
+        session_20250301_080000_3fa2c1/
+            manifest.json
+            chip_00/  chip_01/  ...
+
+A chip's files are found by reading one manifest instead of listing the
+whole archive (FNAL_RTS_integration.FindChipImage, RTS_Cyle), and
+sessions.jsonl finds a session without listing the images folder.
+
+Classes:
+    Session: One tray run and its manifest
+    SessionStore: Creates sessions and keeps the session index
+"""
+
+import json
+import os
+import secrets
+import time
+from datetime import datetime
+
+from ChipTable import STATUS_NAMES, RESULT_NAMES
+
+MANIFEST = "manifest.json"
+INDEX = "sessions.jsonl"
+FILE_KINDS = ("images", "ocr", "logs")
+
+
+def _write_json(path, data):
+    """Write JSON atomically: a reader never sees a half-written file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class Session:
+    """
+    One tray run: its folder and manifest.
+
+    Attributes:
+        id (str): Unique session ID, e.g. "20250301_080000_3fa2c1"
+        path (str): Session folder
+        manifest (dict): Session data, saved to manifest.json
+    """
+
+    def __init__(self, store, session_id, path, manifest):
+        self.store = store
+        self.id = session_id
+        self.path = path
+        self.manifest = manifest
+
+    @property
+    def closed(self):
+        return self.manifest.get("ended") is not None
+
+    def _chip(self, index):
+        return self.manifest["chips"].setdefault(str(index), {kind: [] for kind in FILE_KINDS})
+
+    def chip_dir(self, index):
+        """Return the chip's folder, creating it on first use."""
+        path = os.path.join(self.path, f"chip_{index:02d}")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def set_chips(self, chip_positions):
+        """Record the position of every chip on the tray (a ChipTable)."""
+        for index, record in enumerate(chip_positions.to_records()):
+            self._chip(index)["position"] = record
+        self.save()
+
+    def add_file(self, index, kind, path):
+        """
+        Record a file (image, OCR output or test log) for a chip.
+
+        Paths inside the session folder are stored relative to it, other
+        paths as absolute paths.
+
+        Raises:
+            ValueError: If kind is not one of FILE_KINDS
+        """
+        if kind not in FILE_KINDS:
+            raise ValueError(f"Unknown file kind '{kind}', expected one of {FILE_KINDS}")
+        relative = os.path.relpath(path, self.path)
+        path = os.path.abspath(path) if relative.startswith(os.pardir) else relative
+        self._chip(index)[kind].append(path)
+        self.save()
+
+    def files(self, index, kind=None):
+        """
+        Return the files recorded for a chip as absolute paths.
+
+        Args:
+            index (int): Chip index
+            kind (str, optional): Only this kind; otherwise a dict of kind -> list
+        """
+        chip = self.manifest["chips"].get(str(index), {})
+        absolute = {k: [os.path.join(self.path, p) for p in chip.get(k, [])] for k in FILE_KINDS}
+        return absolute[kind] if kind else absolute
+
+    def save(self):
+        """Write the manifest."""
+        _write_json(os.path.join(self.path, MANIFEST), self.manifest)
+
+    def close(self, chip_positions=None):
+        """
+        Record the final chip status and results, save the manifest and add
+        the session to the store's index. Closing twice does nothing.
+        """
+        if self.closed:
+            return
+        if chip_positions is not None:
+            for index in range(len(chip_positions)):
+                chip = self._chip(index)
+                chip["status"] = STATUS_NAMES.get(chip_positions.status[index])
+                chip["result"] = RESULT_NAMES.get(chip_positions.result[index])
+        self.manifest["ended"] = time.time()
+        self.save()
+        self.store._append_index(self)
+
+
+class SessionStore:
+    """
+    Creates sessions under a root folder and keeps their index.
+
+    Attributes:
+        root (str): Archive folder (default 'images')
+    """
+
+    def __init__(self, root="images"):
+        self.root = root
+
+    def _new_id(self):
+        return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{secrets.token_hex(3)}"
+
+    def open_session(self, chip_positions=None, **info):
+        """
+        Create a new session folder and manifest.
+
+        Args:
+            chip_positions (ChipTable, optional): Chips of the tray, recorded in the manifest
+            **info: Extra manifest entries (e.g. stand name, operator)
+
+        Returns:
+            Session: The open session
+        """
+        os.makedirs(self.root, exist_ok=True)
+        while True:
+            session_id = self._new_id()
+            path = os.path.join(self.root, f"session_{session_id}")
+            try:
+                os.mkdir(path)
+                break
+            except FileExistsError:
+                continue
+        manifest = {"id": session_id, "started": time.time(), "ended": None, "chips": {}}
+        manifest.update(info)
+        session = Session(self, session_id, path, manifest)
+        if chip_positions is not None:
+            session.set_chips(chip_positions)
+        else:
+            session.save()
+        return session
+
+    def _append_index(self, session):
+        entry = {
+            "id": session.id,
+            "path": os.path.relpath(session.path, self.root),
+            "started": session.manifest["started"],
+            "ended": session.manifest["ended"],
+            "chips": len(session.manifest["chips"]),
+        }
+        with open(os.path.join(self.root, INDEX), "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def sessions(self):
+        """Return the index entries of all closed sessions, oldest first."""
+        try:
+            with open(os.path.join(self.root, INDEX)) as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def load(self, session_id):
+        """
+        Open an existing session by ID.
+
+        Raises:
+            KeyError: If there is no session with that ID
+        """
+        path = os.path.join(self.root, f"session_{session_id}")
+        try:
+            with open(os.path.join(path, MANIFEST)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise KeyError(session_id) from None
+        return Session(self, session_id, path, manifest)
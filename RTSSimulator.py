@@ -0,0 +1,458 @@
+"""
+Discrete-event simulation of tray throughput.
+
+BypassRTS=True runs the real state machine in real time, so it cannot
+answer "how many chips per hour with two stands?" or "what does a second
+DAT board buy us?". TraySimulator runs the same state graph on a virtual
+clock instead: events sit in a heap ordered by virtual time and the clock
+jumps from one to the next, so a thousand trays take seconds.
+
+The graph comes from RTSStateMachine itself:
+
+    cycle          the six normal states, in order
+    error_cycle    the errors each normal state can raise, and the recovery
+                   path out of each error state (first transition wins)
+    reset_cycle    errors with no error_cycle recovery return to ground and
+                   the chip starts its cycle again
+
+Each stand has one robot (a FIFO resource held through every robot state
+and any error raised in one) and one lane per DAT socket. In 'pipelined'
+mode the lanes run concurrently like handle_tray_pipelined(); in 'serial'
+mode one chip at a time goes through the stand like handle_tray(). Stands
+take trays from a shared queue; a stand swaps its tray once every lane has
+finished the last one.
+
+Durations are samplers as accepted by RTS_MockServer.make_distribution,
+per state id plus 'tray_swap'. Error rates are the probability that a
+visit to a state that can raise the error ends in it. The defaults below
+are placeholders: replace them with measured dwell times (LogReplay
+dwell_summary) before sizing decisions.
+
+Classes:
+    Resource: FIFO resource with wait and utilisation statistics
+    TraySimulator: Stands, lanes and trays on a virtual clock
+
+Usage:
+    python RTSSimulator.py --trays 1000 --stands 1 2 3 --dat-boards 1 2
+    python RTSSimulator.py --trays 500 --mode serial --error lost_vacuum=0.002 \\
+        --duration testing=normal:420:40
+"""
+
+import argparse
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+
+from RTSStateMachine import RTSStateMachine
+from RTS_MockServer import make_distribution, parse_latency
+
+# States that use the robot arm (or its camera)
+ROBOT_STATES = frozenset({'surveying_sockets', 'moving_chip_to_socket', 'moving_chip_to_tray',
+                          'moving_chip_to_bad_tray', 'reseat'})
+
+DEFAULT_DURATIONS = {
+    'ground': 0.0,
+    'surveying_sockets': ('uniform', 5, 10),
+    'moving_chip_to_socket': ('uniform', 25, 35),
+    'testing': ('normal', 420, 40),
+    'writing_to_hwdb': ('uniform', 5, 15),
+    'moving_chip_to_tray': ('uniform', 25, 35),
+    'moving_chip_to_bad_tray': ('uniform', 25, 35),
+    'reseat': ('uniform', 40, 60),
+    # Errors that need an operator before the chip is restarted
+    'no_server_connection': 300.0,
+    'no_pressure': 300.0,
+    'lost_vacuum': 300.0,
+    'safe_guard': 300.0,
+    'tray_swap': 120.0,
+}
+# Any other error state
+DEFAULT_ERROR_DURATION = 30.0
+
+
+def _transitions(event):
+    """(source id, target id) of every transition of an event, in definition order."""
+    pairs = []
+    for state in RTSStateMachine.states:
+        for transition in state.transitions:
+            if event in transition.events and transition.source is state:
+                pairs.append((transition.source.id, transition.target.id))
+    return pairs
+
+
+def state_graph():
+    """
+    Read the simulated graph from RTSStateMachine.
+
+    Returns:
+        tuple: (next_state, errors) where next_state maps every state id to
+        the state that follows it without an error, and errors maps each
+        normal state id to the error state ids it can raise
+    """
+    cycle_states = RTSStateMachine.CYCLE_STATES
+    next_state = dict(_transitions('cycle'))
+    errors = {state: [] for state in cycle_states}
+    for source, target in _transitions('error_cycle'):
+        if source in cycle_states:
+            errors[source].append(target)
+        else:
+            # Recovery path: the first error_cycle transition wins
+            next_state.setdefault(source, target)
+    for source, target in _transitions('reset_cycle'):
+        next_state.setdefault(source, target)
+    for state in RTSStateMachine.states:
+        next_state.setdefault(state.id, 'ground')
+    return next_state, errors
+
+
+class Resource:
+    """
+    Resource with a FIFO wait queue, used by simulation processes with
+    `yield resource` and released with release(sim).
+
+    Attributes:
+        name (str): Resource name
+        capacity (int): Processes that can hold it at once
+        requests (int): Acquisitions
+        waited (int): Acquisitions that had to queue
+        wait_total (float): Seconds spent queueing, summed
+        wait_max (float): Longest single wait
+    """
+
+    def __init__(self, name, capacity=1):
+        self.name = name
+        self.capacity = capacity
+        self.users = 0
+        self.queue = deque()
+        self.requests = 0
+        self.waited = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._busy_area = 0.0
+        self._queue_area = 0.0
+        self._last = 0.0
+
+    def _update(self, now):
+        elapsed = now - self._last
+        self._busy_area += self.users * elapsed
+        self._queue_area += len(self.queue) * elapsed
+        self._last = now
+
+    def _request(self, sim, process):
+        self._update(sim.now)
+        self.requests += 1
+        if self.users < self.capacity:
+            self.users += 1
+            return True
+        self.queue.append((process, sim.now))
+        return False
+
+    def release(self, sim):
+        """Release one unit; the longest-waiting process gets it."""
+        self._update(sim.now)
+        if self.queue:
+            process, requested = self.queue.popleft()
+            wait = sim.now - requested
+            self.waited += 1
+            self.wait_total += wait
+            if wait > self.wait_max:
+                self.wait_max = wait
+            sim._schedule(process, sim.now)
+        else:
+            self.users -= 1
+
+    def stats(self, elapsed):
+        """Utilisation, mean queue length and wait statistics over elapsed seconds."""
+        return {
+            'utilisation': self._busy_area / (self.capacity * elapsed) if elapsed > 0 else 0.0,
+            'mean_queue': self._queue_area / elapsed if elapsed > 0 else 0.0,
+            'requests': self.requests,
+            'waited': self.waited,
+            'mean_wait_s': self.wait_total / self.requests if self.requests else 0.0,
+            'max_wait_s': self.wait_max,
+        }
+
+
+class _TrayBarrier:
+    """Holds a stand's lanes until all have finished the tray, then swaps it."""
+
+    def __init__(self, stand):
+        self.stand = stand
+        self.arrived = []
+
+    def _request(self, sim, process):
+        self.arrived.append(process)
+        if len(self.arrived) == len(self.stand.lanes):
+            if sim._load_tray(self.stand):
+                resume_at = sim.now + sim._sample('tray_swap')
+                for waiting in self.arrived:
+                    sim._schedule(waiting, resume_at)
+            self.arrived = []
+        return False
+
+
+class _Stand:
+    def __init__(self, number, dat_boards, sockets_per_board, mode):
+        self.name = f"S{number}"
+        self.robot = Resource(f"{self.name}-robot")
+        self.sockets = dat_boards * sockets_per_board
+        lanes = [f"{self.name}-DAT{board + 1}-{21 + socket}"
+                 for board in range(dat_boards) for socket in range(sockets_per_board)]
+        self.lanes = lanes if mode == 'pipelined' else lanes[:1]
+        self.barrier = _TrayBarrier(self)
+        self.chips = deque()
+        self.trays = 0
+        self.socket_busy = 0.0
+
+
+class TraySimulator:
+    """
+    Stands, DAT sockets and trays on a virtual clock.
+
+    Args:
+        stands (int): Test stands, each with its own robot
+        dat_boards (int): DAT boards per stand
+        sockets_per_board (int): Sockets per DAT board
+        chips_per_tray (int): Chips on each tray
+        mode (str): 'pipelined' (one lane per socket) or 'serial' (one chip at a time)
+        durations (dict, optional): State id or 'tray_swap' -> duration spec,
+            merged over DEFAULT_DURATIONS
+        error_rates (dict, optional): Error state id -> probability per visit
+            of a state that can raise it
+        max_errors_per_chip (int): Errors after which a chip is abandoned
+        seed (int, optional): Random seed
+
+    Raises:
+        ValueError: If mode is unknown or an error rate names a state that
+            is not an error_cycle target of a normal state
+    """
+
+    def __init__(self, stands=1, dat_boards=1, sockets_per_board=2, chips_per_tray=40,
+                 mode='pipelined', durations=None, error_rates=None,
+                 max_errors_per_chip=10, seed=None):
+        if mode not in ('pipelined', 'serial'):
+            raise ValueError(f"Unknown mode '{mode}', expected 'pipelined' or 'serial'")
+        self.rng = random.Random(seed)
+        self.stands = [_Stand(n + 1, dat_boards, sockets_per_board, mode) for n in range(stands)]
+        self.chips_per_tray = chips_per_tray
+        self.mode = mode
+        self.max_errors_per_chip = max_errors_per_chip
+        self.now = 0.0
+        self._heap = []
+        self._seq = itertools.count()
+
+        self.next_state, raised = state_graph()
+        specs = dict(DEFAULT_DURATIONS)
+        specs.update(durations or {})
+        self._samplers = {state.id: make_distribution(specs.get(state.id, DEFAULT_ERROR_DURATION))
+                          for state in RTSStateMachine.states}
+        self._samplers['tray_swap'] = make_distribution(specs['tray_swap'])
+
+        error_rates = dict(error_rates or {})
+        known = {error for errors in raised.values() for error in errors}
+        unknown = set(error_rates) - known
+        if unknown:
+            raise ValueError(f"Unknown error state(s) {sorted(unknown)}, expected some of {sorted(known)}")
+        self._errors = {state: [(error, error_rates[error]) for error in errors
+                                if error_rates.get(error, 0) > 0]
+                        for state, errors in raised.items()}
+
+    def _sample(self, key):
+        return self._samplers[key](self.rng)
+
+    def _schedule(self, process, at):
+        heapq.heappush(self._heap, (at, next(self._seq), process))
+
+    def _load_tray(self, stand):
+        if self._trays_left <= 0:
+            return False
+        self._trays_left -= 1
+        stand.trays += 1
+        stand.chips.extend(range(self.chips_per_tray))
+        return True
+
+    def _lane(self, stand):
+        while True:
+            if not stand.chips:
+                yield stand.barrier
+                continue
+            stand.chips.popleft()
+            yield from self._chip(stand)
+
+    def _chip(self, stand):
+        """Take one chip from ground through the cycle, errors and recovery."""
+        next_state = self.next_state
+        cycle_states = RTSStateMachine.CYCLE_STATES
+        dwell = self.dwell
+        robot = stand.robot
+        holding = False
+        in_socket_since = None
+        errors = 0
+        state = 'ground'
+        while True:
+            if state in ROBOT_STATES:
+                if not holding:
+                    yield robot
+                    holding = True
+            elif holding and state in cycle_states:
+                robot.release(self)
+                holding = False
+
+            duration = self._samplers[state](self.rng)
+            if duration > 0:
+                yield duration
+            dwell[state] = dwell.get(state, 0.0) + duration
+            self.visits[state] = self.visits.get(state, 0) + 1
+
+            error = None
+            for candidate, rate in self._errors.get(state, ()):
+                if self.rng.random() < rate:
+                    error = candidate
+                    break
+            if error is not None:
+                errors += 1
+                self.error_counts[error] = self.error_counts.get(error, 0) + 1
+                if errors > self.max_errors_per_chip:
+                    self.abandoned += 1
+                    break
+                state = error
+                continue
+
+            if state == 'moving_chip_to_socket':
+                in_socket_since = self.now
+            elif state in ('moving_chip_to_tray', 'moving_chip_to_bad_tray'):
+                if state == 'moving_chip_to_tray':
+                    self.chips_done += 1
+                else:
+                    self.chips_bad += 1
+                break
+
+            state = next_state[state]
+            if state == 'ground':
+                # Reset by an operator: the chip starts again
+                self.restarts += 1
+                if in_socket_since is not None:
+                    stand.socket_busy += self.now - in_socket_since
+                    in_socket_since = None
+        if in_socket_since is not None:
+            stand.socket_busy += self.now - in_socket_since
+        if holding:
+            robot.release(self)
+
+    def _step(self, process):
+        """Run a process until it waits on the clock or a resource."""
+        try:
+            while True:
+                command = next(process)
+                if command.__class__ is float:
+                    self._schedule(process, self.now + command)
+                    return
+                if not command._request(self, process):
+                    return
+        except StopIteration:
+            pass
+
+    def run(self, trays):
+        """
+        Simulate trays until all are processed.
+
+        Returns:
+            dict: Totals (trays, chips, chips_bad, chips_abandoned, restarts,
+            sim_hours, chips_per_hour, trays_per_hour), per-stand robot and
+            socket statistics, error counts, total dwell per state and the
+            wall-clock seconds of the run
+        """
+        wall_start = time.perf_counter()
+        self._trays_left = trays
+        self.dwell = {}
+        self.visits = {}
+        self.error_counts = {}
+        self.chips_done = self.chips_bad = self.abandoned = self.restarts = 0
+        for stand in self.stands:
+            if self._load_tray(stand):
+                for _ in stand.lanes:
+                    self._schedule(self._lane(stand), 0.0)
+
+        heap = self._heap
+        while heap:
+            self.now, _, process = heapq.heappop(heap)
+            self._step(process)
+
+        elapsed = self.now
+        hours = elapsed / 3600.0
+        chips = self.chips_done + self.chips_bad + self.abandoned
+        stands = {}
+        for stand in self.stands:
+            stand.robot._update(elapsed)
+            stands[stand.name] = {
+                'trays': stand.trays,
+                'lanes': len(stand.lanes),
+                'robot': stand.robot.stats(elapsed),
+                'socket_utilisation': stand.socket_busy / (stand.sockets * elapsed) if elapsed > 0 else 0.0,
+            }
+        return {
+            'mode': self.mode,
+            'stands': len(self.stands),
+            'trays': trays,
+            'chips': chips,
+            'chips_bad': self.chips_bad,
+            'chips_abandoned': self.abandoned,
+            'restarts': self.restarts,
+            'sim_hours': hours,
+            'chips_per_hour': chips / hours if hours > 0 else 0.0,
+            'trays_per_hour': trays / hours if hours > 0 else 0.0,
+            'per_stand': stands,
+            'errors': dict(sorted(self.error_counts.items())),
+            'dwell_s': dict(sorted(self.dwell.items(), key=lambda item: -item[1])),
+            'wall_s': time.perf_counter() - wall_start,
+        }
+
+
+def _parse_rate(text):
+    """Parse 'error_state=probability' from the command line."""
+    name, _, rate = text.partition("=")
+    return name, float(rate)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate tray throughput on a virtual clock")
+    parser.add_argument("--trays", type=int, default=100, help="Trays to process")
+    parser.add_argument("--chips", type=int, default=40, help="Chips per tray")
+    parser.add_argument("--stands", type=int, nargs="+", default=[1], help="Stand counts to compare")
+    parser.add_argument("--dat-boards", type=int, nargs="+", default=[1],
+                        help="DAT boards per stand to compare")
+    parser.add_argument("--sockets", type=int, default=2, help="Sockets per DAT board")
+    parser.add_argument("--mode", choices=("pipelined", "serial"), default="pipelined")
+    parser.add_argument("--duration", action="append", default=[], type=parse_latency,
+                        help="state=seconds or state=kind:p1:p2 (e.g. testing=normal:420:40)")
+    parser.add_argument("--error", action="append", default=[], type=_parse_rate,
+                        help="error_state=probability (e.g. lost_vacuum=0.002)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print errors and dwell per state")
+    args = parser.parse_args(argv)
+
+    print(f"{'stands':>6} {'DATs':>4} {'chips/h':>8} {'trays/h':>8} {'robot util':>10} "
+          f"{'socket util':>11} {'robot wait':>10} {'queue':>6} {'wall s':>7}")
+    for stands in args.stands:
+        for dat_boards in args.dat_boards:
+            sim = TraySimulator(stands, dat_boards, args.sockets, args.chips, args.mode,
+                                dict(args.duration), dict(args.error), seed=args.seed)
+            result = sim.run(args.trays)
+            per_stand = list(result['per_stand'].values())
+            robot = sum(s['robot']['utilisation'] for s in per_stand) / len(per_stand)
+            socket = sum(s['socket_utilisation'] for s in per_stand) / len(per_stand)
+            wait = sum(s['robot']['mean_wait_s'] for s in per_stand) / len(per_stand)
+            queue = sum(s['robot']['mean_queue'] for s in per_stand) / len(per_stand)
+            print(f"{stands:>6} {dat_boards:>4} {result['chips_per_hour']:>8.1f} "
+                  f"{result['trays_per_hour']:>8.2f} {robot:>10.1%} {socket:>11.1%} "
+                  f"{wait:>9.1f}s {queue:>6.2f} {result['wall_s']:>7.2f}")
+            if args.verbose:
+                print(f"  bad {result['chips_bad']}, abandoned {result['chips_abandoned']}, "
+                      f"restarts {result['restarts']}, errors {result['errors']}")
+                print(f"  dwell {({k: round(v / 3600, 2) for k, v in result['dwell_s'].items()})} h")
+
+
+if __name__ == "__main__":
+    main()
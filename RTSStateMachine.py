@@ -10,11 +10,21 @@ Classes:
 """
 
 from statemachine import StateMachine, State
-from FNAL_RTS_integration import MoveChipsToSockets, MoveChipsToTray
-from RTS_CFG import RTS_CFG
+from RTS_PathPlanner import plan_order
+from ChipTable import ChipTable, PENDING, IN_SOCKET, TESTED, DONE, BAD
+from LogTailer import LogTailer
+from LogMatcher import LogMatcher
+from RTSPipeline import PipelineScheduler
+from RTSSession import SessionStore
+from RTSJournal import Journal, load_journal, replay
+from RTSEvents import EventBus, TransitionEvent
+from RTSMetrics import RTSMetrics
+from RTSRecovery import RecoveryPolicy, RETRY, RESTART, REJECT, PAUSE
+from RTS_StatusCodes import RobotFault
+from RTS_Connection import RTSCommandInterrupted
 import sys
 import os
-from datetime import datetime
+import contextlib
 import time
 
 
@@ -27,41 +37,91 @@ class RTSStateMachine(StateMachine):
     
     Attributes:
         BypassRTS (bool): When True, runs in simulation mode
-        chip_positions (dict): Dictionary containing chip position data
+        external_motion (bool): When True, the move states do not drive the robot;
+            the caller moves the chips (e.g. RTS_MultiStand) and records DONE
+            once a chip is back in the tray, or BAD once a rejected chip is
+            out of its socket
+        chip_positions (ChipTable): Chip position, status and result columns
         current_chip_index (int): Index of current chip being processed
         last_normal_state (State): Last normal state for resume functionality
+        lane_states (dict): Lane name -> State of each DAT socket lane during
+            handle_tray_pipelined()
+        session_store (SessionStore): Archive of per-tray sessions
+        session (Session): Session of the tray being processed, or None
+        journal (Journal): Crash-safe progress journal, or None
+        resume_point (ResumePoint): Unfinished tray run restored from the journal, or None
+        event_bus (EventBus): Publishes a TransitionEvent for every transition
+        metrics (RTSMetrics): Dwell times, transition counts and throughput
+        recovery (RecoveryPolicy): Recovery action for each error state during
+            handle_tray(); None to pause on every error
+        motion_unknown (bool): A move was cut off by a lost connection, or a
+            reject move failed, so the chip cannot be moved automatically;
+            recover() pauses for the operator
     """
 
-    def __init__(self):
-        """Initialize the state machine and prompt for chip population method."""
+    # States of the normal six-step cycle, in order
+    CYCLE_STATES = ('ground', 'surveying_sockets', 'moving_chip_to_socket',
+                    'testing', 'writing_to_hwdb', 'moving_chip_to_tray')
+
+    def __init__(self, interactive=True, manifest=None, journal=None):
+        """
+        Initialize the state machine and populate the chip positions.
+
+        Args:
+            interactive (bool): Prompt for manual entry or a full tray when no
+                manifest is given; if False, a full tray is used
+            manifest (str, optional): CSV or JSON tray manifest to load instead
+                of prompting (see ChipTable.load)
+            journal (str, optional): Progress journal file. If it holds an
+                unfinished tray run, its chips, results, current chip and state
+                are restored and the next handle_tray() continues that run.
+
+        Raises:
+            ValueError: If the manifest is missing columns or holds invalid values
+        """
+        resume_point = None
+        if journal is not None:
+            resume_point = replay(load_journal(journal), self.CYCLE_STATES)
+        # Validate the manifest before the machine enters its initial state
+        manifest_chips = None
+        if manifest is not None and resume_point is None:
+            manifest_chips = ChipTable.load(manifest)
         super().__init__()
 
         self.BypassRTS = True
+        self.external_motion = False
+        self.rts = None
         self.last_normal_state = None
+        self.lane_states = {}
+        self.session_store = SessionStore()
+        self.session = None
+        self.current_session_folder = None
+        self.journal = None
+        self.resume_point = None
+        self.event_bus = EventBus()
+        self.metrics = RTSMetrics(initial_state=self.current_state.id)
+        self.recovery = RecoveryPolicy()
+        self.motion_unknown = False
 
-        self.chip_positions = {
-            'tray': [],
-            'col': [],
-            'row': [],
-            'dat': [],
-            'dat_socket': [],
-            'label': []
-        }
+        self.chip_positions = ChipTable()
         
         self.max_col = 10
         self.max_row = 4
         self.current_chip_index = 0
-        
-        while True:
-            choice = input("Populate chip positions manually (m) or use full tray (f)? ").strip().lower()
-            if choice in ['m', 'manual']:
-                self.populate_manually()
-                break
-            elif choice in ['f', 'full']:
-                self.populate_full_tray()
-                break
-            else:
-                print("Please enter 'm' for manual or 'f' for full tray.")
+
+        if resume_point is not None:
+            self.chip_positions = ChipTable.from_records(resume_point.chips)
+            self.restore_progress(resume_point)
+        elif manifest_chips is not None:
+            self.chip_positions = manifest_chips
+            print(f"Loaded {len(manifest_chips)} chips from {manifest}")
+        elif interactive:
+            self.prompt_chip_population()
+        else:
+            self.populate_full_tray()
+
+        if journal is not None:
+            self.journal = Journal(journal)
 
         # self.rts = RTS_CFG()
         # self.rts.rts_init(port=201, host_ip='192.168.121.1')
@@ -156,6 +216,7 @@ class RTSStateMachine(StateMachine):
         | moving_chip_to_socket.to(safe_guard)
         | moving_chip_to_socket.to(bad_pins)
         | moving_chip_to_socket.to(no_serial_number)
+        | moving_chip_to_socket.to(no_server_connection)
         | testing.to(failed_init)
         | testing.to(no_wib_connection)
         | failed_init.to(reseat)
@@ -166,7 +227,15 @@ class RTSStateMachine(StateMachine):
         | moving_chip_to_tray.to(no_chip)
         | moving_chip_to_tray.to(vision_sequence_failed)
         | moving_chip_to_tray.to(safe_guard)
+        | moving_chip_to_tray.to(no_server_connection)
         | moving_chip_to_bad_tray.to(moving_chip_to_socket)
+        | moving_chip_to_bad_tray.to(no_pressure)
+        | moving_chip_to_bad_tray.to(lost_vacuum)
+        | moving_chip_to_bad_tray.to(bad_contact)
+        | moving_chip_to_bad_tray.to(no_chip)
+        | moving_chip_to_bad_tray.to(vision_sequence_failed)
+        | moving_chip_to_bad_tray.to(safe_guard)
+        | moving_chip_to_bad_tray.to(no_server_connection)
         | bad_pins.to(moving_chip_to_bad_tray)
         | no_serial_number.to(moving_chip_to_bad_tray)
         | failed_upload.to(moving_chip_to_tray)
@@ -177,6 +246,12 @@ class RTSStateMachine(StateMachine):
         | no_wib_connection.to(testing)
     )
 
+    @error_cycle.cond
+    def _error_requested(self, target, requested=None):
+        # error_cycle(requested='lost_vacuum') enters that error; without
+        # requested the first allowed transition is taken
+        return requested is None or target.id == requested
+
     reset_cycle = (
         pause.to(ground)
         | reseat.to(ground)
@@ -187,10 +262,37 @@ class RTSStateMachine(StateMachine):
         | no_server_connection.to(ground)
     )
 
+    reject_cycle = (
+        bad_contact.to(moving_chip_to_bad_tray)
+        | vision_sequence_failed.to(moving_chip_to_bad_tray)
+        | bad_pins.to(moving_chip_to_bad_tray)
+        | no_serial_number.to(moving_chip_to_bad_tray)
+        | failed_init.to(moving_chip_to_bad_tray)
+        | reseat.to(moving_chip_to_bad_tray)
+        | no_wib_connection.to(moving_chip_to_bad_tray)
+    )
+
+    def after_transition(self, event, source, target):
+        event = str(event)
+        metrics = getattr(self, 'metrics', None)
+        if metrics is not None:
+            metrics.observe(source.id, target.id)
+        journal = getattr(self, 'journal', None)
+        if journal is not None:
+            journal.transition(event, source.id, target.id, self.current_chip_index)
+        if getattr(self, 'event_bus', None) is not None:
+            self.publish_transition(event, source.id, target.id)
+
+    def publish_transition(self, event, source, target, **payload):
+        """Publish a TransitionEvent on the event bus without blocking."""
+        index = self.current_chip_index
+        if 0 <= index < len(self.chip_positions):
+            payload.setdefault('chip', self.chip_positions.as_dict(index))
+        self.event_bus.publish(TransitionEvent(event, source, target, index, time.time(), payload))
+
     def on_enter_ground(self):
         print("Entering ground state - system ready")
         self.last_normal_state = self.current_state
-        self.create_session_folder()
 
     def on_enter_surveying_sockets(self):
         print("Starting to survey sockets")
@@ -204,14 +306,30 @@ class RTSStateMachine(StateMachine):
             print("Error: No more chips to process")
             return
 
-        chip_data = {key: self.chip_positions[key][self.current_chip_index] for key in self.chip_positions}
+        if self.session is None:
+            self.start_session()
+        self.record_chip_status(self.current_chip_index, IN_SOCKET)
+
+        if self.external_motion:
+            return
+
+        chip = self.chip_positions.row_view(self.current_chip_index)
         
         if self.BypassRTS:
             print("[SIMULATION] Moving chip to socket")
-            print(f"Would have moved chip to socket: {chip_data['label']} from tray {chip_data['tray']}, position ({chip_data['col']}, {chip_data['row']}) to DAT {chip_data['dat']} socket {chip_data['dat_socket']}")
+            print(f"Would have moved chip to socket: {chip.label} from tray {chip.tray}, position ({chip.col}, {chip.row}) to DAT {chip.dat} socket {chip.dat_socket}")
         else:
             try:
-                MoveChipsToSockets(self.rts, chip_data)
+                from FNAL_RTS_integration import MoveChipsToSockets
+                index = self.current_chip_index
+                MoveChipsToSockets(self.rts, self.chip_positions[index:index + 1])
+            except RobotFault as e:
+                if e.restored:
+                    # The robot put the chip back in its pocket
+                    self.record_chip_status(self.current_chip_index, PENDING)
+                self.enter_fault(e)
+            except RTSCommandInterrupted as e:
+                self.enter_interrupted(e)
             except Exception as e:
                 print(f"Error calling MoveChipsToSockets: {e}")
                 return
@@ -228,16 +346,36 @@ class RTSStateMachine(StateMachine):
         print("Moving chip to tray")
         self.last_normal_state = self.current_state
 
+        index = self.current_chip_index
+        if index >= len(self.chip_positions):
+            return
+        # The chip is DONE only once it is back in the tray: a crash or fault
+        # during the move leaves it TESTED, and resume unloads it again
+        self.record_chip_status(index, TESTED)
+
+        if self.external_motion:
+            return
+
         if self.BypassRTS:
             print("[SIMULATION] Moving chip to tray")
-            chip_data = {key: self.chip_positions[key][self.current_chip_index] for key in self.chip_positions}
-            print(f"Would have moved chip to tray: {chip_data['label']} from DAT {chip_data['dat']} socket {chip_data['dat_socket']} to tray {chip_data['tray']}, position ({chip_data['col']}, {chip_data['row']})")
+            chip = self.chip_positions.row_view(index)
+            print(f"Would have moved chip to tray: {chip.label} from DAT {chip.dat} socket {chip.dat_socket} to tray {chip.tray}, position ({chip.col}, {chip.row})")
         else:
             try:
-                chip_data = {key: self.chip_positions[key][self.current_chip_index] for key in self.chip_positions}
-                MoveChipsToTray(self.rts, chip_data)
+                from FNAL_RTS_integration import MoveChipsToTray
+                MoveChipsToTray(self.rts, self.chip_positions[index:index + 1])
+            except RobotFault as e:
+                self.enter_fault(e)
+                return
+            except RTSCommandInterrupted as e:
+                self.enter_interrupted(e)
+                return
             except Exception as e:
                 print(f"Error calling MoveChipsToTray: {e}")
+                # The chip may still be in the socket
+                self.pause_cycle()
+                return
+        self.record_chip_status(index, DONE)
 
     def on_enter_pause(self):
         print("System paused - awaiting resume command")
@@ -248,6 +386,35 @@ class RTSStateMachine(StateMachine):
 
     def on_enter_moving_chip_to_bad_tray(self):
         print("Moved defective chip to bad tray")
+        index = self.current_chip_index
+        if index >= len(self.chip_positions):
+            return
+        # A load fault that restored the chip leaves it in its pocket: only
+        # a chip that reached the socket is moved
+        in_socket = self.chip_positions.status[index] in (IN_SOCKET, TESTED)
+        if in_socket and self.external_motion:
+            # The caller moves the chip out of the socket and records BAD
+            return
+        if in_socket and not self.BypassRTS:
+            # No bad-tray location is configured: the chip goes back to its
+            # pocket, marked BAD in the chip table and session manifest
+            try:
+                from FNAL_RTS_integration import MoveChipsToTray
+                MoveChipsToTray(self.rts, self.chip_positions[index:index + 1])
+            except RobotFault as e:
+                # The chip is still in the socket: recovery leaves it to the
+                # operator instead of retrying along error_cycle
+                self.motion_unknown = True
+                self.enter_fault(e)
+                return
+            except RTSCommandInterrupted as e:
+                self.enter_interrupted(e)
+                return
+            except Exception as e:
+                print(f"Error calling MoveChipsToTray: {e}")
+                self.pause_cycle()
+                return
+        self.record_chip_status(index, BAD)
 
     def on_enter_no_server_connection(self):
         print("Error: No server connection detected")
@@ -349,7 +516,7 @@ class RTSStateMachine(StateMachine):
 
     def get_position(self):
         """Get the current chip position on the tray."""
-        if not self.chip_positions['col'] or self.current_chip_index >= len(self.chip_positions['col']):
+        if self.current_chip_index >= len(self.chip_positions):
             return (0, 0)
         return (self.chip_positions['col'][self.current_chip_index], 
                 self.chip_positions['row'][self.current_chip_index])
@@ -375,22 +542,292 @@ class RTSStateMachine(StateMachine):
     def run_full_cycle(self):
         """Run a complete test cycle for one chip and advance position."""
         print(f"Starting full cycle at position {self.get_position()}")
-        for i in range(6):
-            self.cycle()
+        self.run_chip_cycle()
         print("Full cycle complete, advancing chip position")
         self.advance_chip_position()
+
+    def run_chip_cycle(self):
+        """
+        Cycle the current chip from ground back to ground. An error entered
+        on the way is handled by recover(); the chip is finished when it is
+        returned to the tray or rejected.
+        """
+        while True:
+            if self.current_state.id not in self.CYCLE_STATES:
+                if self.recover() == REJECT and self.current_state == self.ground:
+                    return
+                continue
+            unloading = self.current_state == self.moving_chip_to_tray
+            self.cycle()
+            if unloading and self.current_state == self.ground:
+                return
+
+    def raise_error(self, error):
+        """
+        Enter an error state from the current state through error_cycle.
+        Called from a state callback, the transition runs as soon as the
+        callback returns.
+
+        Args:
+            error (str): Error state id, e.g. 'bad_contact'
+
+        Raises:
+            ValueError: If error is not a state, or error_cycle cannot reach
+                it from the current state
+        """
+        if not isinstance(getattr(self, error, None), State):
+            raise ValueError(f"Unknown error state: {error}")
+        # Checked here: inside a callback the transition is only queued, and
+        # would fail later in the caller's cycle()
+        if not any('error_cycle' in transition.events and transition.target.id == error
+                   for transition in self.current_state.transitions):
+            raise ValueError(f"error_cycle cannot reach {error} from {self.current_state.name}")
+        self.error_cycle(requested=error)
+
+    def enter_fault(self, fault):
+        """
+        Go straight to the error state of a robot fault (RobotFault from a
+        move). Faults that error_cycle cannot reach from the current state
+        are only printed.
+        """
+        print(f"Robot fault {fault.code} in {fault.command}: {fault.state}")
+        try:
+            self.raise_error(fault.state)
+        except ValueError as e:
+            print(f"Cannot enter {fault.state}: {e}")
+
+    def enter_interrupted(self, error):
+        """
+        Go to no_server_connection after a move was cut off by a lost
+        connection (RTSCommandInterrupted). The move is not resent: whether
+        the robot ran it is unknown, so recovery waits for the operator.
+        """
+        print(f"Move interrupted: {error}")
+        self.motion_unknown = True
+        self.raise_error('no_server_connection')
+
+    def _can(self, event):
+        """Whether event has a transition out of the current state."""
+        return any(event in transition.events for transition in self.current_state.transitions)
+
+    def recover(self):
+        """
+        Leave the current error state as the recovery policy decides: retry
+        along error_cycle, restart the chip from ground, reject it to the
+        bad tray, or pause for the operator.
+
+        Returns:
+            str: The action taken (RETRY, RESTART, REJECT or PAUSE)
+        """
+        error = self.current_state
+        index = self.current_chip_index
+        if self.motion_unknown:
+            # The chip may be in the socket, in the gripper or in the tray
+            action = PAUSE
+            self.motion_unknown = False
+        elif self.recovery is not None:
+            action = self.recovery.decide(error.id, index)
+        else:
+            action = PAUSE
+        # Fall back when the graph has no transition for the chosen action
+        if action == RETRY and not self._can('error_cycle'):
+            action = RESTART
+        if action == RESTART and not self._can('reset_cycle'):
+            action = PAUSE
+        if action == REJECT and not self._can('reject_cycle'):
+            action = PAUSE
+        print(f"Recovery: {error.name} on chip {index + 1} -> {action}")
+
+        if action == RETRY:
+            self.error_cycle()
+            # e.g. failed_init -> reseat: the chip starts again from ground
+            if self.current_state.id not in self.CYCLE_STATES and self._can('reset_cycle'):
+                self.reset_cycle()
+        elif action == RESTART:
+            self.reset_cycle()
+        elif action == REJECT:
+            self.reject_cycle()
+            # A fault on the reject move leaves the machine in its error state
+            if self.current_state == self.moving_chip_to_bad_tray:
+                self.reset_cycle()
+        else:
+            self.pause_cycle()
+        return action
     
-    def handle_tray(self):
-        """Process all chips on the tray with full test cycles."""
+    def handle_tray(self, plan=False, resume=None):
+        """
+        Process all chips on the tray with full test cycles.
+
+        Args:
+            plan (bool): Reorder the chips to minimize arm travel first
+            resume (bool, optional): Continue an interrupted run: finish the
+                current chip from its state, then process only the chips not
+                yet returned to the tray or rejected. Default: resume if a run was
+                restored from the journal.
+        """
+        if resume is None:
+            resume = self.resume_point is not None
+        if plan and not resume:
+            self.plan_chip_order()
         num_chips = len(self.chip_positions['col'])
-        for i in range(num_chips):
-            print(f"\n--- Processing chip {i+1}/{num_chips} ---")
-            self.run_full_cycle()
+        self._begin_tray(resume)
+        # One motor session for the whole tray: the motor stays powered between
+        # chips and the arm is parked once, at the end
+        hardware = not (self.BypassRTS or self.external_motion)
+        motor = self.rts.motor_session() if hardware else contextlib.nullcontext()
+        try:
+            with motor:
+                if resume:
+                    self.finish_current_chip()
+                    for i in range(num_chips):
+                        if self.chip_positions.status[i] in (DONE, BAD):
+                            continue
+                        self.current_chip_index = i
+                        print(f"\n--- Processing chip {i+1}/{num_chips} ---")
+                        self.run_full_cycle()
+                else:
+                    for i in range(num_chips):
+                        print(f"\n--- Processing chip {i+1}/{num_chips} ---")
+                        self.run_full_cycle()
+            if hardware:
+                self.rts.park()
+            self._end_tray()
+        finally:
+            self.end_session()
         print(f"\nTray processing complete! Processed {num_chips} chips.")
+        if self.recovery is not None and self.recovery.counts:
+            print(f"Recovery: {self.recovery.stats()}")
+
+    def handle_tray_pipelined(self, test=None, upload=None, plan=False, sim_seconds=None, resume=None):
+        """
+        Process all chips on the tray with the two DAT sockets as pipelined
+        lanes: the robot loads or unloads one socket while the other socket's
+        chip is testing or being written to the HWDB.
+
+        Args:
+            test (callable, optional): test(sm, index) -> bool or None
+            upload (callable, optional): upload(sm, index)
+            plan (bool): Reorder the chips to minimize arm travel first
+            sim_seconds (dict, optional): Simulated 'move', 'test' and 'upload' durations
+            resume (bool, optional): Skip the chips already returned to the tray
+                or rejected, and unload chips left tested in their socket
+                (see PipelineScheduler). Default: resume if a run was
+                restored from the journal.
+
+        If a lane stops on a failed move, the run is left unfinished in the
+        journal and the machine pauses for the operator.
+
+        Returns:
+            dict: Run summary from PipelineScheduler.run()
+        """
+        if resume is None:
+            resume = self.resume_point is not None
+        if plan and not resume:
+            self.plan_chip_order()
+        scheduler = PipelineScheduler(self, test=test, upload=upload, sim_seconds=sim_seconds,
+                                      skip_done=resume)
+        print(f"Pipelining {len(self.chip_positions)} chips over lanes: {[lane.name for lane in scheduler.lanes]}")
+        self._begin_tray(resume)
+        try:
+            summary = scheduler.run()
+            if summary['halted']:
+                for name, lane in summary['lanes'].items():
+                    if lane['stopped'] is not None:
+                        index, step, error = lane['stopped']
+                        print(f"Lane {name} stopped in {step} of chip {index + 1}: {error}")
+                self.pause_cycle()
+                return summary
+            self._end_tray()
+        finally:
+            self.end_session()
+        print(f"\nTray processing complete! Processed {summary['chips']} chips "
+              f"in {summary['seconds']:.1f} s ({summary['chips_per_hour']:.0f} chips/h).")
+        return summary
+
+    def _begin_tray(self, resume):
+        """Open the tray's session and journal the start of a new run."""
+        if resume and self.session is not None:
+            print(f"Continuing session {self.session.id}")
+            return
+        self.start_session()
+        if self.recovery is not None:
+            self.recovery.start_tray()
+        if self.journal is not None and not resume:
+            self.journal.tray_start(self.chip_positions, self.session.id)
+
+    def _end_tray(self):
+        if self.journal is not None:
+            self.journal.tray_end()
+        self.resume_point = None
+
+    def record_chip_status(self, index, status, result=None):
+        """Set a chip's status (and result) and journal it."""
+        self.chip_positions.set_status(index, status, result)
+        if status == DONE:
+            self.metrics.chip_done()
+        if self.journal is not None:
+            self.journal.chip(index, status, result)
+
+    def restore_progress(self, point):
+        """
+        Restore an unfinished tray run from a journal ResumePoint: chip
+        status and results, current chip, state and session.
+        """
+        for index, (status, result) in point.status.items():
+            self.chip_positions.set_status(index, status, result)
+        self.current_chip_index = point.chip_index
+        if point.last_normal_state is not None:
+            self.last_normal_state = getattr(self, point.last_normal_state)
+        if point.state is not None:
+            self.current_state = getattr(self, point.state)
+            self.metrics.observe(None, point.state)
+        if point.session is not None:
+            try:
+                session = self.session_store.load(point.session)
+                self.session = None if session.closed else session
+            except KeyError:
+                self.session = None
+        self.resume_point = point
+        done = len(self.chip_positions.where(status=DONE))
+        print(f"Resuming tray from journal: chip {self.current_chip_index + 1}/{len(self.chip_positions)} "
+              f"in state {self.current_state.name}, {done} chips done")
+
+    def finish_current_chip(self):
+        """
+        Complete the cycle of the chip that was in progress: from an error or
+        pause state go back to the last normal state, then cycle to ground.
+        A chip whose unload did not finish is unloaded again.
+        """
+        if self.current_state.id not in self.CYCLE_STATES:
+            self.resume_to_previous()
+        if self.current_state == self.ground:
+            return
+        index = self.current_chip_index
+        print(f"Finishing chip {index + 1} from state {self.current_state.name}")
+        if self.current_state == self.moving_chip_to_tray and self.chip_positions.status[index] != DONE:
+            # The unload did not finish: the chip is still in the socket
+            self.on_enter_moving_chip_to_tray()
+        self.run_chip_cycle()
+
+    def plan_chip_order(self, geometry=None):
+        """
+        Reorder chip_positions so chips are processed in the order that
+        minimizes arm travel from one chip's pocket to the next.
+
+        Args:
+            geometry (TrayGeometry, optional): Deck geometry, default uses placeholder positions
+
+        Returns:
+            list: The new order as indices into the old chip_positions
+        """
+        order = plan_order(self.chip_positions.to_records(), geometry=geometry, mode='cycle')
+        self.chip_positions.reorder(order)
+        self.current_chip_index = 0
+        return order
 
     def get_current_chip_data(self):
         """Get all data for the current chip as a dictionary."""
-        return {key: self.chip_positions[key][self.current_chip_index] for key in self.chip_positions}
+        return self.chip_positions.as_dict(self.current_chip_index)
     
     def set_chip_data(self, index, col=None, row=None):
         """
@@ -415,93 +852,120 @@ class RTSStateMachine(StateMachine):
         if row is not None:
             self.chip_positions['row'][index] = row
 
+    def start_session(self, **info):
+        """
+        Open a new session for the tray, closing the current one if any.
+
+        Args:
+            **info: Extra entries for the session manifest
+
+        Returns:
+            Session: The new session
+        """
+        self.end_session()
+        self.session = self.session_store.open_session(self.chip_positions, **info)
+        self.current_session_folder = self.session.path
+        print(f"Started session {self.session.id}")
+        return self.session
+
+    def end_session(self):
+        """Record the chip results in the session manifest and close it."""
+        if self.session is None:
+            return
+        self.session.close(self.chip_positions)
+        print(f"Closed session {self.session.id}")
+        self.session = None
+
     def create_session_folder(self):
-        """Create a timestamped session folder for storing test data."""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        folder_name = f'session_{timestamp}'
-        folder_path = os.path.join('images', folder_name)
-        os.makedirs(folder_path, exist_ok=True)
-        self.current_session_folder = folder_path
+        """Create a session folder for storing test data (opens a new session)."""
+        return self.start_session().path
 
-    def read_log_and_transition(self, log_path):
+    def read_log_and_transition(self, log_path, matcher=None):
         """
         Monitor a log file and automatically transition states based on log entries.
-        
+
+        Lines are mapped to states by a LogMatcher pattern table; when
+        several patterns occur in one line the highest priority wins. A
+        "Picked up chip from tray" line that names a tray/col/row also
+        selects that chip as the current chip.
+
         Args:
             log_path (str): Path to the log file to monitor
+            matcher (LogMatcher, optional): Pattern table (default: LogMatcher())
         """
-        state_map = {
-            "ground": self.ground,
-            "surveying_sockets": self.surveying_sockets,
-            "moving_chip_to_socket": self.moving_chip_to_socket,
-            "MoveChipFromTrayToSocket": self.moving_chip_to_socket,
-            "Jumped to DAT": self.testing,
-            "testing": self.testing,
-            "writing_to_hwdb": self.writing_to_hwdb,
-            "moving_chip_to_tray": self.moving_chip_to_tray,
-            "Picked up chip from tray": self.moving_chip_to_socket,
-            "reseat": self.reseat,
-            "moving_chip_to_bad_tray": self.moving_chip_to_bad_tray,
-            "pause": self.pause,
-            "no_server_connection": self.no_server_connection,
-            "chip_in_socket": self.chip_in_socket,
-            "vision_sequence_failed": self.vision_sequence_failed,
-            "no_pressure": self.no_pressure,
-            "lost_vacuum": self.lost_vacuum,
-            "bad_contact": self.bad_contact,
-            "no_chip": self.no_chip,
-            "safe_guard": self.safe_guard,
-            "bad_pins": self.bad_pins,
-            "no_serial_number": self.no_serial_number,
-            "failed_init": self.failed_init,
-            "no_wib_connection": self.no_wib_connection,
-            "failed_upload": self.failed_upload,
-        }
-        last_line = 0
+        matcher = matcher or LogMatcher()
+        unknown = [name for name in matcher.states() if not isinstance(getattr(self, name, None), State)]
+        if unknown:
+            raise ValueError(f"Log patterns name unknown states: {sorted(unknown)}")
+        if not os.path.exists(log_path):
+            print(f"Log file does not exist: {log_path}")
+            return
+        tailer = LogTailer(log_path)
         print(f"Monitoring log file: {log_path}")
-        while True:
-            try:
-                if not os.path.exists(log_path):
-                    print(f"Log file does not exist: {log_path}")
+        try:
+            while True:
+                try:
+                    for line in tailer.read_lines():
+                        match = matcher.match(line)
+                        if match is None:
+                            continue
+                        self._select_logged_chip(match.captures)
+                        state = getattr(self, match.state)
+                        if self.current_state != state:
+                            self.metrics.observe(self.current_state.id, state.id)
+                            self.current_state = state
+                            print(f"'{line.strip().lower()}' -> {self.current_state}")
+                    tailer.wait()
+                except KeyboardInterrupt:
+                    print("\nStopped log monitoring.")
                     break
-                with open(log_path, 'r') as f:
-                    lines = f.readlines()
-                new_lines = lines[last_line:]
-                for line in new_lines:
-                    state_str = line.strip().lower()
-                    for key, state in state_map.items():
-                        if key.lower() in state_str:
-                            if self.current_state != state:
-                                self.current_state = state
-                                print(f"'{state_str}' -> {self.current_state}")
-                            break
-                last_line = len(lines)
-                time.sleep(1)
-            except KeyboardInterrupt:
-                print("\nStopped log monitoring.")
-                break
-            except Exception as e:
-                print(f"Error reading log file: {e}")
-                time.sleep(1)
+                except Exception as e:
+                    print(f"Error reading log file: {e}")
+                    time.sleep(1)
+        finally:
+            tailer.close()
+
+    def _select_logged_chip(self, captures):
+        """Make the chip at a logged tray/col/row the current chip."""
+        if 'col' not in captures or 'row' not in captures:
+            return
+        index = self.chip_positions.find(captures['col'], captures['row'], captures.get('tray'))
+        if index is not None and index != self.current_chip_index:
+            self.current_chip_index = index
+            print(f"Log reports chip {index + 1} (col {captures['col']}, row {captures['row']})")
     
+    @classmethod
+    def from_manifest(cls, path):
+        """Create a machine, without prompts, for the chips in a tray manifest."""
+        return cls(interactive=False, manifest=path)
+
+    def prompt_chip_population(self):
+        """Ask the operator for manual chip entry or a full tray."""
+        while True:
+            choice = input("Populate chip positions manually (m) or use full tray (f)? ").strip().lower()
+            if choice in ['m', 'manual']:
+                self.populate_manually()
+                break
+            elif choice in ['f', 'full']:
+                self.populate_full_tray()
+                break
+            else:
+                print("Please enter 'm' for manual or 'f' for full tray.")
+
+    def populate_from_manifest(self, path):
+        """
+        Populate chip_positions from a CSV or JSON tray manifest.
+
+        Raises:
+            ValueError: If the manifest is missing columns or holds invalid values
+        """
+        self.chip_positions = ChipTable.load(path)
+        self.current_chip_index = 0
+        print(f"Loaded {len(self.chip_positions)} chips from {path}")
+
     def populate_full_tray(self):
         """Populate chip_positions with a complete 10x4 tray configuration."""
-        for key in self.chip_positions:
-            self.chip_positions[key] = []
-        chip_counter = 0
-        for col in range(1, self.max_col + 1):
-            for row in range(1, self.max_row + 1):
-                self.chip_positions['col'].append(col)
-                self.chip_positions['row'].append(row)
-                self.chip_positions['tray'].append(2)
-                self.chip_positions['dat'].append(2)
-                if chip_counter % 2 == 0:
-                    self.chip_positions['dat_socket'].append(21)
-                    self.chip_positions['label'].append('CD0')
-                else:
-                    self.chip_positions['dat_socket'].append(22)
-                    self.chip_positions['label'].append('CD1')
-                chip_counter += 1
+        self.chip_positions = ChipTable.full_tray(self.max_col, self.max_row)
 
     def populate_from_dicts(self, chip_list):
         """
@@ -509,12 +973,11 @@ class RTSStateMachine(StateMachine):
         
         Args:
             chip_list (list): List of dictionaries containing chip data
+
+        Raises:
+            ValueError: If a chip is missing a field or has an invalid value
         """
-        for key in self.chip_positions:
-            self.chip_positions[key] = []
-        for chip in chip_list:
-            for key in self.chip_positions:
-                self.chip_positions[key].append(chip.get(key, None))
+        self.chip_positions = ChipTable.from_records(chip_list)
 
     def populate_manually(self):
         """Interactively populate chip_positions with user input."""
@@ -523,7 +986,7 @@ class RTSStateMachine(StateMachine):
         print("Tray: 1 or 2 • Column: 1-10 • Row: 1-4 • DAT: 1 or 2 • DAT socket: 21 or 22 • Label: CD0 or CD1")
         
         while True:
-            print(f"\n--- Chip {len(self.chip_positions['tray']) + 1} ---")
+            print(f"\n--- Chip {len(self.chip_positions) + 1} ---")
             
             while True:
                 try:
@@ -582,12 +1045,7 @@ class RTSStateMachine(StateMachine):
                 else:
                     print("Label must be CD0 or CD1.")
             
-            self.chip_positions['tray'].append(tray)
-            self.chip_positions['col'].append(col)
-            self.chip_positions['row'].append(row)
-            self.chip_positions['dat'].append(dat)
-            self.chip_positions['dat_socket'].append(dat_socket)
-            self.chip_positions['label'].append(label)
+            self.chip_positions.append(tray, col, row, dat, dat_socket, label)
             
             print(f"Added chip: {label} at tray {tray}, position ({col}, {row})")
             
@@ -595,4 +1053,4 @@ class RTSStateMachine(StateMachine):
             if continue_input not in ['y', 'yes']:
                 break
         
-        print(f"Manual population complete. Added {len(self.chip_positions['tray'])} chips.")
+        print(f"Manual population complete. Added {len(self.chip_positions)} chips.")
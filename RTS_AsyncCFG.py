@@ -0,0 +1,288 @@
+"""
+asyncio client for the RTS robot server.
+
+Provides the same command set as RTS_CFG, built on asyncio streams, so
+other work (OCR, QC, state machine bookkeeping) can run in the same event
+loop while the arm is moving. Every command has a timeout; retries wait
+with asyncio.sleep() instead of blocking the process. Only idempotent
+commands are resent after an unexpected reply: for a move or drop, whether
+the robot ran it is unknown, so RTSCommandInterrupted is raised instead.
+
+Classes:
+    RTS_AsyncCFG: Non-blocking RTS client
+"""
+
+import asyncio
+
+from RTS_Connection import RTSCommandInterrupted
+from RTS_Protocol import BANNER, IDEMPOTENT_COMMANDS, encode_command, parse_status
+from RTS_StatusCodes import RobotFault, status_code_table
+
+# Seconds to wait for the reply to each command. Moves include the full arm
+# motion and vision sequence on the robot side, so they get much longer.
+DEFAULT_TIMEOUTS = {
+    "default": 10.0,
+    "Quiet": 30.0,
+    "Shutdown": 30.0,
+    "JumpToCamera": 30.0,
+    "JumpToTray": 30.0,
+    "JumpToSocket": 30.0,
+    "DropToTray": 30.0,
+    "InsertIntoSocket": 30.0,
+    "MoveChipFromTrayToSocket": 120.0,
+    "MoveChipFromSocketToTray": 120.0,
+    "MoveChipFromTrayToTray": 120.0,
+}
+
+# Longest readiness wait in seconds after a command, as in RTS_CFG.DEFAULT_TIMINGS
+DEFAULT_READY_DEADLINES = {
+    "default": 5.0,
+    "Quiet": 5.0,
+    "MotorOn": 1.0,
+}
+
+
+class RTS_AsyncCFG():
+    """
+    asyncio counterpart of RTS_CFG.
+
+    Commands on one connection are serialized with a lock, so several tasks
+    may share the client without interleaving frames and replies.
+
+    Attributes:
+        timeouts (dict): Reply timeout in seconds per command name
+        retry_delay (float): Seconds to wait before retrying a command
+        ready_deadlines (dict): Longest readiness wait in seconds per command name
+        ready_replies (tuple): Replies of ready_command meaning the robot is
+            ready; None sleeps the whole readiness deadline instead
+        poll_interval (float): Seconds between readiness polls
+        status_codes (dict): Move status code -> FaultRule; a move ending in
+            one of these codes raises RobotFault (see RTS_StatusCodes). The
+            status_codes argument may also be the path of a JSON site table.
+        msg (str): Last reply received from the server
+    """
+
+    def __init__(self, timeouts=None, retry_delay=1.0, status_codes=None, ready_command="CoverStatus",
+                 ready_replies=None, ready_deadlines=None, poll_interval=0.1):
+        self.reader = None
+        self.writer = None
+        self.msg = None
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.retry_delay = retry_delay
+        self.ready_command = ready_command
+        self.ready_replies = tuple(ready_replies) if ready_replies else None
+        self.ready_deadlines = dict(DEFAULT_READY_DEADLINES)
+        if ready_deadlines:
+            self.ready_deadlines.update(ready_deadlines)
+        self.poll_interval = poll_interval
+        self.status_codes = status_code_table(status_codes)
+        self._lock = asyncio.Lock()
+
+    def timeout_for(self, name):
+        """Return the reply timeout for a command name."""
+        return self.timeouts.get(name, self.timeouts["default"])
+
+    async def rts_init(self, port=201, host_ip='192.168.121.1', timeout=10.0):
+        """
+        Open the connection and check the server banner.
+
+        Raises:
+            ConnectionError: If the server does not answer with the RTS banner
+        """
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(host_ip, port), timeout)
+        print("the socket has successfully connected to ", host_ip)
+        self.msg = await self._readline(timeout)
+        if self.msg != BANNER:
+            await self.close()
+            raise ConnectionError(f"Bad response from server: [{self.msg}]")
+        return self.msg
+
+    async def close(self):
+        """Close the connection to the server."""
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+            self.writer = None
+            self.reader = None
+
+    async def _readline(self, timeout):
+        while True:
+            line = await asyncio.wait_for(self.reader.readline(), timeout)
+            if not line:
+                raise ConnectionAbortedError("Connection closed by RTS server")
+            line = line.decode(errors="replace").strip()
+            if line:
+                return line
+
+    async def command(self, name, *args, timeout=None):
+        """
+        Send one command frame and return its reply.
+
+        Args:
+            name (str): RTS command name
+            *args: Command arguments
+            timeout (float, optional): Override the per-command reply timeout
+
+        A timeout or lost connection closes the connection: a late reply
+        would otherwise be read as the reply to the next command. Call
+        rts_init() again to reconnect.
+
+        Raises:
+            asyncio.TimeoutError: If no reply arrives in time
+            ConnectionError: If the connection is closed or lost
+        """
+        if timeout is None:
+            timeout = self.timeout_for(name)
+        async with self._lock:
+            if self.writer is None:
+                raise ConnectionError(f"Not connected to the RTS server, cannot send {name}")
+            try:
+                self.writer.write(encode_command(name, *args))
+                await self.writer.drain()
+                self.msg = await self._readline(timeout)
+            except (asyncio.TimeoutError, ConnectionError):
+                await self.close()
+                raise
+        return self.msg
+
+    async def wait_until_ready(self, name):
+        """
+        Poll the robot status until it reports ready, giving up after the
+        readiness deadline configured for name (see RTS_CFG.wait_until_ready).
+        Without ready_replies it sleeps the whole deadline.
+
+        Returns:
+            bool: True if the robot reported ready before the deadline
+        """
+        if self.ready_replies is None:
+            await asyncio.sleep(self.ready_deadlines.get(name, self.ready_deadlines["default"]))
+            return True
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.ready_deadlines.get(name, self.ready_deadlines["default"])
+        while True:
+            if await self.command(self.ready_command) in self.ready_replies:
+                return True
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(self.poll_interval, remaining))
+
+    async def _until(self, name, expected, *args):
+        while True:
+            await self.command(name, *args)
+            print(self.msg)
+            if expected in self.msg:
+                return self.msg
+            if name not in IDEMPOTENT_COMMANDS:
+                raise RTSCommandInterrupted(name, ValueError(f"unexpected reply {self.msg!r}"))
+            await asyncio.sleep(self.retry_delay)
+
+    async def MotorOn(self):
+        return await self._until("MotorOn", "On")
+
+    async def MotorOff(self):
+        return await self._until("MotorOff", "Off")
+
+    async def PumpOff(self):
+        return await self._until("PumpOff", "Off")
+
+    async def CoverStatus(self):
+        await self.command("CoverStatus")
+        print(self.msg)
+        return self.msg
+
+    async def JumpToCamera(self):
+        return await self._until("JumpToCamera", "JumpToCamera")
+
+    async def JumpToTray(self, tray_nr, col_nr, row_nr):
+        print("Move Chip To Tray#{},col#{},row#{}".format(tray_nr, col_nr, row_nr))
+        return await self._until("JumpToTray", "JumpToTray", tray_nr, col_nr, row_nr)
+
+    async def DropToTray(self):
+        return await self._until("DropToTray", "DropToTray")
+
+    async def JumpToSocket(self, DAT_nr, socket_nr):
+        print("Move Chip To DAT#{},Socket{}".format(DAT_nr, socket_nr))
+        return await self._until("JumpToSocket", "JumpToSocket", DAT_nr, socket_nr)
+
+    async def InsertIntoSocket(self):
+        return await self._until("InsertIntoSocket", "InsertIntoSocket")
+
+    async def rts_idle(self):
+        print("Quiet")
+        await self._until("Quiet", "Quiet")
+        print("Wait for robot to be ready")
+        if not await self.wait_until_ready("Quiet"):
+            print("Robot not ready after {} seconds".format(self.ready_deadlines.get("Quiet")))
+
+    async def rts_shutdown(self):
+        await self.PumpOff()
+        await self.command("Shutdown")
+        print(self.msg)
+        print("Closing socket connection...")
+        await self.close()
+
+    async def _move(self, name, args, recover, max_tries=3):
+        tryi = 0
+        while True:
+            await self.command(name, *args)
+            print("msg: ", self.msg)
+            status = parse_status(self.msg)
+            if status is None:
+                # The move may have run: resending it could move the arm twice
+                raise RTSCommandInterrupted(name, ValueError(f"unreadable status {self.msg!r}"))
+            if status >= 0 or status == -200:
+                return status
+            fault = self.status_codes.get(status)
+            if fault is not None and not fault.restore:
+                raise RobotFault(status, fault.state, name)
+            tryi = tryi + 1
+            print("Move chip to orignal position")
+            await recover()
+            await self.JumpToCamera()
+            await self.rts_idle()
+            await self.wait_until_ready("MotorOn")
+            await self.MotorOn()
+            if fault is not None and tryi > fault.retries:
+                raise RobotFault(status, fault.state, name, restored=True)
+            if tryi >= max_tries:
+                return status
+            print("Try again")
+
+    async def MoveChipFromTrayToSocket(self, DAT_nr, socket_nr, tray_nr, col_nr, row_nr):
+        print("Move Chip From Tray#{},col#{},row#{} To DAT#{},Socket{}".format(tray_nr, col_nr, row_nr, DAT_nr, socket_nr))
+
+        async def recover():
+            await self.JumpToTray(tray_nr, col_nr, row_nr)
+            await self.DropToTray()
+
+        return await self._move("MoveChipFromTrayToSocket",
+                                (DAT_nr, socket_nr, tray_nr, col_nr, row_nr), recover)
+
+    async def MoveChipFromSocketToTray(self, DAT_nr, socket_nr, tray_nr, col_nr, row_nr, duttype="FE"):
+        if "CD" in duttype:
+            tray_nr = (tray_nr&0x03) + 10
+        print("Move Chip From DAT#{},Socket{} To Tray#{},col#{},row#{}".format(DAT_nr, socket_nr, tray_nr, col_nr, row_nr))
+
+        async def recover():
+            await self.JumpToSocket(DAT_nr, socket_nr)
+            await self.InsertIntoSocket()
+
+        return await self._move("MoveChipFromSocketToTray",
+                                (DAT_nr, socket_nr, tray_nr, col_nr, row_nr), recover)
+
+    async def MoveChipFromTrayToTray(self, stray_nr, scol_nr, srow_nr, dtray_nr, dcol_nr, drow_nr):
+        print("Move Chip From  Tray#{},col#{},row#{} To Tray#{},col#{},row#{}".format(stray_nr, scol_nr, srow_nr, dtray_nr, dcol_nr, drow_nr))
+
+        async def recover():
+            await self.JumpToTray(stray_nr, scol_nr, srow_nr)
+            await self.DropToTray()
+
+        return await self._move("MoveChipFromTrayToTray",
+                                (stray_nr, scol_nr, srow_nr, dtray_nr, dcol_nr, drow_nr), recover)
@@ -0,0 +1,186 @@
+"""
+Benchmarks for the RTS software stack, run against the local mock server.
+
+Usage:
+    python RTS_Bench.py tray --chips 40
+    python RTS_Bench.py tray --chips 40 --latency MoveChipFromTrayToSocket=uniform:2:4 --scale 0.01
+    python RTS_Bench.py startup --repeats 10
+
+The tray benchmark moves every chip of a tray to its socket and back with
+the same per-chip calls the state machine makes (MoveChipsToSockets and
+MoveChipsToTray), parking the arm once at the end of the tray. With no latencies configured the mock answers
+immediately, so the measured time is pure host/protocol overhead.
+
+The startup benchmark times fresh interpreters importing the state machine
+and the command-line tools, and reports which heavy modules (pandas, the
+hardware integration layer) each one loaded.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from RTS_CFG import RTS_CFG
+from RTS_MockServer import MockRobot, RTSMockServer, parse_error, parse_latency
+from RTS_StatusCodes import RobotFault
+
+
+def full_tray_positions(num_chips=40, max_col=10, max_row=4):
+    """Chip positions of a full tray, filled column-major like RTSStateMachine."""
+    chips = []
+    for col in range(1, max_col + 1):
+        for row in range(1, max_row + 1):
+            if len(chips) == num_chips:
+                return chips
+            chips.append({'tray': 2, 'col': col, 'row': row, 'dat': 2,
+                          'dat_socket': 21 + len(chips) % 2,
+                          'label': 'CD0' if len(chips) % 2 == 0 else 'CD1'})
+    return chips
+
+
+def run_tray(robot, num_chips=40, quiet=True, stats_path=None):
+    """
+    Move a full tray through the mock robot and time it.
+
+    Args:
+        robot (MockRobot): Robot model to serve
+        num_chips (int): Number of chips on the tray
+        quiet (bool): Suppress the RTS_CFG console output
+        stats_path (str, optional): Write the RTS_CFG latency statistics here
+
+    Returns:
+        dict: wall time, robot time, overhead, chips per hour and robot
+        faults (moves that raised RobotFault; the chip is skipped)
+    """
+    from FNAL_RTS_integration import MoveChipsToSockets, MoveChipsToTray
+
+    chips = full_tray_positions(num_chips)
+    with RTSMockServer(robot=robot) as server:
+        host, port = server.address
+        output = io.StringIO() if quiet else None
+        with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+            # The mock's CoverStatus reply means ready
+            rts = RTS_CFG(ready_replies=(robot.cover_status,))
+            rts.rts_init(port=port, host_ip=host)
+            faults = 0
+            start = time.perf_counter()
+            for chip in chips:
+                chip_positions = {key: [value] for key, value in chip.items()}
+                try:
+                    MoveChipsToSockets(rts, chip_positions)
+                    MoveChipsToTray(rts, chip_positions)
+                except RobotFault:
+                    faults += 1
+            rts.park()
+            wall = time.perf_counter() - start
+            rts.conn.close()
+    if stats_path:
+        rts.dump_stats(stats_path)
+    print(rts.stats.report())
+
+    commands = sum(robot.counts.values())
+    return {
+        'chips': num_chips,
+        'commands': commands,
+        'wall_s': wall,
+        'robot_s': robot.total_delay,
+        'overhead_s': wall - robot.total_delay,
+        'overhead_per_command_ms': 1e3 * (wall - robot.total_delay) / max(commands, 1),
+        'chips_per_hour': 3600.0 * num_chips / wall if wall > 0 else float('inf'),
+        'faults': faults,
+    }
+
+
+# Code run by each startup target, in a fresh interpreter
+STARTUP_TARGETS = {
+    'interpreter': "pass",
+    'state_machine_import': "import RTSStateMachine",
+    'headless_machine': "from RTSStateMachine import RTSStateMachine; RTSStateMachine(interactive=False)",
+    'log_replay_import': "import LogReplay",
+    'rts_cfg_import': "import RTS_CFG",
+}
+HEAVY_MODULES = ('pandas', 'numpy', 'FNAL_RTS_integration', 'RTS_CFG', 'multiprocessing')
+
+
+def run_startup(repeats=5, targets=None):
+    """
+    Time fresh Python processes running each startup target.
+
+    Each target runs in a temporary working directory with this directory
+    on PYTHONPATH, so machines created by a target leave no files behind.
+
+    Args:
+        repeats (int): Processes started per target
+        targets (dict, optional): Name -> code (default: STARTUP_TARGETS)
+
+    Returns:
+        dict: Name -> {'min_ms', 'median_ms', 'heavy'} where heavy lists the
+        HEAVY_MODULES the target imported
+    """
+    targets = targets or STARTUP_TARGETS
+    env = dict(os.environ)
+    here = os.path.dirname(os.path.abspath(__file__))
+    env['PYTHONPATH'] = os.pathsep.join(p for p in (here, env.get('PYTHONPATH')) if p)
+    probe = "; import sys; print('heavy:' + ','.join(m for m in %r if m in sys.modules))" % (HEAVY_MODULES,)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, code in targets.items():
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env,
+                               stdout=subprocess.DEVNULL, check=True)
+                times.append(time.perf_counter() - start)
+            loaded = subprocess.run([sys.executable, "-c", code + probe], cwd=workdir, env=env,
+                                    capture_output=True, text=True, check=True).stdout
+            heavy = [line for line in loaded.splitlines() if line.startswith('heavy:')][-1][len('heavy:'):]
+            results[name] = {'min_ms': 1e3 * min(times), 'median_ms': 1e3 * statistics.median(times),
+                             'heavy': heavy.split(",") if heavy else []}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RTS benchmarks against the mock robot")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    tray = sub.add_parser("tray", help="full-tray throughput through RTS_CFG")
+    tray.add_argument("--chips", type=int, default=40)
+    tray.add_argument("--latency", action="append", default=[], metavar="CMD=SPEC")
+    tray.add_argument("--error", action="append", default=[], metavar="CMD=CODE:P")
+    tray.add_argument("--scale", type=float, default=1.0)
+    tray.add_argument("--seed", type=int, default=0)
+    tray.add_argument("--stats", default=None, help="write latency statistics JSON here")
+    tray.add_argument("--verbose", action="store_true")
+
+    startup = sub.add_parser("startup", help="process startup and import time of the tools")
+    startup.add_argument("--repeats", type=int, default=5)
+
+    args = parser.parse_args(argv)
+
+    if args.bench == "tray":
+        robot = MockRobot(time_scale=args.scale, seed=args.seed)
+        for text in args.latency:
+            robot.set_latency(*parse_latency(text))
+        for text in args.error:
+            robot.inject_error(*parse_error(text))
+        result = run_tray(robot, args.chips, quiet=not args.verbose, stats_path=args.stats)
+        for key, value in result.items():
+            print(f"{key:>24}: {value:.3f}" if isinstance(value, float) else f"{key:>24}: {value}")
+    elif args.bench == "startup":
+        results = run_startup(args.repeats)
+        base = results['interpreter']['min_ms']
+        print(f"{'target':<24}{'min ms':>10}{'median ms':>12}{'over python':>13}  heavy modules")
+        for name, r in results.items():
+            print(f"{name:<24}{r['min_ms']:>10.1f}{r['median_ms']:>12.1f}{r['min_ms'] - base:>13.1f}  "
+                  f"{', '.join(r['heavy']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
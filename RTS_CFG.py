@@ -1,183 +1,394 @@
-import socket # for socket 
 import sys 
 import time 
+import contextlib
+import threading
+
+from RTS_Connection import RTSCommandInterrupted, RTSConnection
+from RTS_Protocol import parse_status
+from RTS_Stats import CommandStats, timed_call
+from RTS_Trace import TraceWriter
+from RTS_StatusCodes import RobotFault, status_code_table
+
+# Wait timing in seconds, per command name with fallback to 'default'.
+#   retry_interval: pause before resending a command whose reply was not the expected one
+#   poll_interval:  pause between status polls while waiting for the robot to be ready
+#   deadline:       longest readiness wait before giving up (the old fixed sleep)
+DEFAULT_TIMINGS = {
+    'default': {'retry_interval': 1.0, 'poll_interval': 0.1, 'deadline': 5.0},
+    'Quiet': {'deadline': 5.0},
+    'MotorOn': {'deadline': 1.0},
+    'Shutdown': {'deadline': 3.0},
+}
 
 class RTS_CFG():
-    def __init__(self):
-        self.s = None
+    def __init__(self, timings=None, ready_command="CoverStatus", ready_replies=None, stats_path=None,
+                 idle_timeout=30.0, trace_path=None, status_codes=None):
+        """
+        Args:
+            timings (dict, optional): Per-command overrides of DEFAULT_TIMINGS,
+                e.g. {'Quiet': {'deadline': 8.0}}
+            ready_command (str): Status command polled by wait_until_ready
+            ready_replies (tuple, optional): Replies of ready_command meaning the
+                robot is ready, e.g. ("199",), the reply the old CoverStatus loop
+                was written to wait for (never enabled, not yet confirmed on the
+                robot). None keeps the old fixed sleeps (see wait_until_ready).
+            stats_path (str, optional): JSON file the latency statistics are
+                written to by rts_shutdown
+            idle_timeout (float): Seconds the motor stays powered after the last
+                motor_session ends before the arm is parked
+            trace_path (str, optional): Record every command frame and reply to
+                this trace file (see RTS_Trace)
+            status_codes (dict or str, optional): Move status code -> FaultRule,
+                or the path of a JSON site table (see RTS_StatusCodes). A move
+                ending in one of these codes raises RobotFault instead of
+                retrying blindly. The default table is empty.
+        """
+        self.conn = None
+        # park() may run on the idle timer thread: every frame goes through
+        # _conn_lock, and each thread sees the replies to its own commands
+        self._conn_lock = threading.RLock()
+        self._replies = threading.local()
         self.msg = None
+        self.stats = CommandStats()
+        self.stats_path = stats_path
+        self.timings = {name: dict(values) for name, values in DEFAULT_TIMINGS.items()}
+        for name, values in (timings or {}).items():
+            self.timings.setdefault(name, {}).update(values)
+        self.ready_command = ready_command
+        self.ready_replies = tuple(ready_replies) if ready_replies else None
+        self.motor_on = False
+        self.idle_timeout = idle_timeout
+        self._session_depth = 0
+        self._session_lock = threading.RLock()
+        self._park_timer = None
+        self.status_codes = status_code_table(status_codes)
+        self.trace = None
+        if trace_path:
+            self.start_trace(trace_path)
+
+    def timing(self, name, key):
+        """Return a timing value for a command, falling back to the default."""
+        return self.timings.get(name, {}).get(key, self.timings['default'][key])
+
+    def check_fault(self, name, status, tries):
+        """
+        Raise RobotFault for a move status in the status code table.
+
+        Args:
+            name (str): Move command
+            status (int): Negative status other than -200
+            tries (int): Recoveries (chip put back) done so far for this move
+
+        Raises:
+            RobotFault: If the code is a fault that is not restored, or whose
+                retries are used up
+        """
+        fault = self.status_codes.get(status)
+        if fault is not None and (not fault.restore or tries > fault.retries):
+            raise RobotFault(status, fault.state, name, restored=tries > 0)
+
+    def move_status(self, name):
+        """
+        Parse the status reply of a move in self.msg.
+
+        Raises:
+            RTSCommandInterrupted: If the reply is not an integer status. The
+                move is not resent: the arm may have moved.
+        """
+        status = parse_status(self.msg)
+        if status is None:
+            raise RTSCommandInterrupted(name, ValueError(f"unreadable status {self.msg!r}"))
+        return status
+
+    def retry_wait(self, name):
+        """Pause before retrying a command."""
+        self.stats.record_retry(name)
+        time.sleep(self.timing(name, 'retry_interval'))
+
+    def wait_until_ready(self, name):
+        """
+        Poll the robot status until it reports ready, instead of sleeping a
+        fixed time. Gives up after the deadline configured for name.
+
+        Without ready_replies, no reply is known to mean ready: this sleeps
+        the whole deadline, the old fixed sleep.
 
-    def rts_init(self, port=2001, host_ip='192.168.0.2'): # default port for socket 
+        Returns:
+            bool: True if the robot reported ready before the deadline
+        """
+        if self.ready_replies is None:
+            time.sleep(self.timing(name, 'deadline'))
+            return True
+        poll_interval = self.timing(name, 'poll_interval')
+        deadline = time.monotonic() + self.timing(name, 'deadline')
         while True:
-            try: 
-                self.s = socket.socket(socket.AF_INET, socket.SOCK_STREAM) 
-                print ("Socket successfully created")
-            except socket.error as err: 
-                print ("socket creation failed with error %s" %(err))
-             
-            # connecting to the server 
-            self.s.connect((host_ip, port))
- 
-            print("the socket has successfully connected to ",host_ip) 
-            self.msg=self.s.recv(1024).decode()
-            self.msg = self.msg.strip()
-            
-            if self.msg != "RTS ready":
-                print("***ERROR! Bad responce from server: [",self.msg,"]")
-                self.s.close()
-                while True:
-                    tmp = input ("Exit (E) or Retry (R):")
-                    if "E" in  tmp:
-                        exit()
-                    elif "R" in tmp:
-                        break
-                    else:
-                        pass
-            else:
-                break
+            if self.roundtrip(self.ready_command) in self.ready_replies:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(poll_interval, remaining))
+
+    @property
+    def msg(self):
+        """Last reply received by the calling thread."""
+        return getattr(self._replies, 'msg', None)
+
+    @msg.setter
+    def msg(self, value):
+        self._replies.msg = value
+
+    @property
+    def s(self):
+        """Socket of the current connection."""
+        return self.conn.sock if self.conn is not None else None
+
+    @property
+    def reader(self):
+        """Reply reader of the current connection."""
+        return self.conn.reader if self.conn is not None else None
+
+    def rts_init(self, port=2001, host_ip='192.168.0.2', **conn_kwargs): # default port for socket 
+        """
+        Connect to the RTS and remember the endpoint for later reconnects.
+
+        Extra keyword arguments (max_attempts, base_delay, max_delay, jitter,
+        connect_timeout, resend_limit) configure the RTSConnection.
+
+        Raises:
+            RTSConnectionError: If the RTS cannot be reached
+        """
+        self.conn = RTSConnection(host_ip, port, **conn_kwargs)
+        self.conn.connect()
+        self.msg = self.conn.banner
+        if self.trace is not None:
+            self.trace.note("endpoint", host_ip, port)
+        return self.msg
+
+    def rts_reconnect(self):
+        """Reconnect to the endpoint given to rts_init."""
+        self.conn.reconnect()
+        self.msg = self.conn.banner
+        if self.trace is not None:
+            self.trace.note("reconnect")
+        return self.msg
+
+    def send_command(self, name, *args):
+        """Send a command and all of its arguments to the RTS as one frame."""
+        with self._conn_lock:
+            self.conn.send(name, *args)
+
+    def read_reply(self):
+        """Read the next complete reply line from the RTS into self.msg."""
+        with self._conn_lock:
+            self.msg = self.conn.readline()
+        return self.msg
+
+    def roundtrip(self, name, *args):
+        """
+        Send a command and return its reply, reconnecting and resending
+        idempotent commands if the connection drops. The round trip is
+        recorded in self.stats together with any integer status reply.
+        """
+        with self._conn_lock:
+            if self.trace is not None:
+                self.trace.command(name, *args)
+            start = time.perf_counter()
+            reply = self.conn.request(name, *args)
+            self.stats.record_frame(name, time.perf_counter() - start, parse_status(reply))
+            if self.trace is not None:
+                self.trace.reply(reply)
+        return reply
+
+    def start_trace(self, path):
+        """Start recording command frames and replies to a trace file."""
+        self.stop_trace()
+        self.trace = TraceWriter(path)
+        if self.conn is not None:
+            self.trace.note("endpoint", self.conn.host_ip, self.conn.port)
+
+    def stop_trace(self):
+        """Stop recording and close the trace file."""
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+
+    def request(self, name, *args):
+        """Send a command and read its reply into self.msg."""
+        self.msg = self.roundtrip(name, *args)
         return self.msg
 
+    def dump_stats(self, path=None):
+        """Write latency, retry, status and reconnect statistics to a JSON file."""
+        path = path or self.stats_path
+        reconnects = self.conn.reconnects if self.conn is not None else []
+        self.stats.dump(path, extra={'reconnects': reconnects})
+        print("Wrote RTS latency statistics to", path)
+
+    @contextlib.contextmanager
+    def motor_session(self, idle_timeout=None):
+        """
+        Keep the motor powered across consecutive moves.
+
+        The motor is turned on when the first session starts (if it is not
+        already on). When the last nested session ends the arm is not parked
+        straight away: a timer parks it (JumpToCamera, PumpOff, MotorOff)
+        once it has been idle for idle_timeout seconds, so the next session
+        that starts within the timeout reuses the powered motor. Call park()
+        to power down immediately, e.g. at the end of a tray.
+
+        Args:
+            idle_timeout (float, optional): Override self.idle_timeout; 0 parks
+                as soon as the session ends
+        """
+        # _session_lock only guards the session count and the timer; robot
+        # I/O is serialized by _conn_lock, which a running park() holds
+        # until the motor is off
+        with self._session_lock:
+            self._cancel_park_timer()
+            self._session_depth += 1
+        try:
+            with self._conn_lock:
+                if not self.motor_on:
+                    self.MotorOn()
+            yield self
+        finally:
+            park_now = False
+            with self._session_lock:
+                self._session_depth -= 1
+                if self._session_depth == 0:
+                    timeout = self.idle_timeout if idle_timeout is None else idle_timeout
+                    if timeout <= 0:
+                        park_now = True
+                    else:
+                        self._park_timer = threading.Timer(timeout, self._park_if_idle)
+                        self._park_timer.daemon = True
+                        self._park_timer.start()
+            if park_now:
+                self.park()
+
+    def _cancel_park_timer(self):
+        with self._session_lock:
+            if self._park_timer is not None:
+                self._park_timer.cancel()
+                self._park_timer = None
+
+    def _park_if_idle(self):
+        timer = threading.current_thread()
+        with self._conn_lock:
+            with self._session_lock:
+                # A session started, or park() ran, while this timer waited
+                if self._session_depth > 0 or self._park_timer is not timer:
+                    return
+                self._park_timer = None
+            self._park()
+
+    def park(self):
+        """Move the arm to the camera, release the pump and power the motor down."""
+        with self._conn_lock:
+            self._cancel_park_timer()
+            self._park()
+
+    def _park(self):
+        if self.motor_on:
+            self.JumpToCamera()
+            self.PumpOff()
+            self.MotorOff()
+
+    @timed_call
     def MotorOn(self): #
         while True:
-            try:
-                msg = "MotorOn"
-                self.s.send(msg.encode())
-                self.s.send(b"\r\n") 
-                self.msg = self.s.recv(1024).decode() 
-                self.msg = self.msg.strip()
-                print (self.msg)
-                if "On" in self.msg:
-                    break
-                else:
-                    time.sleep(1)
-            except ConnectionAbortedError:
-                print ("ConnectionAbortedError")
-                self.rts_init(port=2001, host_ip='192.168.0.2')
+            msg = "MotorOn"
+            self.request(msg)
+            print (self.msg)
+            if "On" in self.msg:
+                self.motor_on = True
+                break
+            else:
+                self.retry_wait(msg)
 
+    @timed_call
     def MotorOff(self): #
         while True:
-            try:
-                msg = "MotorOff"
-                self.s.send(msg.encode())
-                self.s.send(b"\r\n") 
-                self.msg = self.s.recv(1024).decode() 
-                self.msg = self.msg.strip()
-                print (self.msg)
-                if "Off" in self.msg:
-                    break
-                else:
-                    time.sleep(1)
-            except ConnectionAbortedError:
-                print ("ConnectionAbortedError")
-                self.rts_init(port=2001, host_ip='192.168.0.2')
+            msg = "MotorOff"
+            self.request(msg)
+            print (self.msg)
+            if "Off" in self.msg:
+                self.motor_on = False
+                break
+            else:
+                self.retry_wait(msg)
 
+    @timed_call
     def CoverStatus(self): #
-        if True:
-            try:
-                msg = "CoverStatus"
-                self.s.send(msg.encode())
-                self.s.send(b"\r\n") 
-                self.msg = self.s.recv(1024).decode() 
-                self.msg = self.msg.strip()
-                print (self.msg)
-                #if "199" in self.msg:
-                #    break
-                #else:
-                #    time.sleep(1)
-            except ConnectionAbortedError:
-                print ("ConnectionAbortedError")
-                self.rts_init(port=2001, host_ip='192.168.0.2')
-            return self.msg
+        msg = "CoverStatus"
+        self.request(msg)
+        print (self.msg)
+        #if "199" in self.msg:
+        #    break
+        #else:
+        #    time.sleep(1)
+        return self.msg
 
+    @timed_call
     def JumpToCamera(self): #
         while True:
-            try:
-                msg = "JumpToCamera"
-                self.s.send(msg.encode())
-                self.s.send(b"\r\n") 
-                self.msg = self.s.recv(1024).decode() 
-                self.msg = self.msg.strip()
-                print (self.msg)
-                if msg in self.msg:
-                    break
-                else:
-                    time.sleep(1)
-            except ConnectionAbortedError:
-                print ("ConnectionAbortedError")
-                self.rts_init(port=2001, host_ip='192.168.0.2')
+            msg = "JumpToCamera"
+            self.request(msg)
+            print (self.msg)
+            if msg in self.msg:
+                break
+            else:
+                self.retry_wait(msg)
 
+    @timed_call
     def PumpOff(self): #
         while True:
-            try:
-                msg = "PumpOff"
-                self.s.send(msg.encode())
-                self.s.send(b"\r\n")
-                self.msg = self.s.recv(1024).decode()
-                self.msg = self.msg.strip()
-                print (self.msg)
-                if "Off" in self.msg:
-                    break
-                else:
-                    time.sleep(1)
-            except ConnectionAbortedError:
-                print ("ConnectionAbortedError")
-                self.rts_init(port=2001, host_ip='192.168.0.2')
+            msg = "PumpOff"
+            self.request(msg)
+            print (self.msg)
+            if "Off" in self.msg:
+                break
+            else:
+                self.retry_wait(msg)
 
+    @timed_call
     def MoveChipFromTrayToSocket(self, DAT_nr, socket_nr, tray_nr, col_nr, row_nr):
         tryi = 0
         while True:
-            try:
-                print ("Move Chip From Tray#{},col#{},row#{} To DAT#{},Socket{}".format(tray_nr, col_nr, row_nr, DAT_nr, socket_nr))
-                self.msg = "MoveChipFromTrayToSocket"
-                self.s.send(self.msg.encode())
-                self.s.send(b"\r\n")
-
-                self.s.send(str(DAT_nr).encode())
-                self.s.send(b"\r\n")
-    
-                self.s.send(str(socket_nr).encode())
-                self.s.send(b"\r\n")
-    
-                self.s.send(str(tray_nr).encode())
-                self.s.send(b"\r\n")
-    
-                self.s.send(str(col_nr).encode())
-                self.s.send(b"\r\n")
-    
-                self.s.send(str(row_nr).encode())
-                self.s.send(b"\r\n")
-    
-                self.msg = self.s.recv(1024).decode()
-                self.msg = self.msg.strip()
-                print("msg: ", self.msg)
-                #try:
-                if True:
-                    status = int(self.msg)
-                    if (status < 0) and (status != -200) :
-                        tryi = tryi + 1 
-                        print ("Move chip to orignal position")
-                        self.JumpToTray(tray_nr, col_nr, row_nr)    
-                        self.DropToTray()    
-                        self.JumpToCamera()
-                        self.rts_idle() 
-                        time.sleep (1)
-                        self.MotorOn() 
-                    else:
-                        break
-                    if tryi > 2:
-                        break
-                    else:
-                        print ("Try again")
-                        continue
-                #except:
-                #    print ("whyereeeee")
-                #    time.sleep(1)
-            except ConnectionAbortedError:
-                print ("ConnectionAbortedError")
-                self.rts_init(port=2001, host_ip='192.168.0.2')
+            print ("Move Chip From Tray#{},col#{},row#{} To DAT#{},Socket{}".format(tray_nr, col_nr, row_nr, DAT_nr, socket_nr))
+            self.msg = "MoveChipFromTrayToSocket"
+            self.request(self.msg, DAT_nr, socket_nr, tray_nr, col_nr, row_nr)
+            print("msg: ", self.msg)
+            #try:
+            if True:
+                status = self.move_status("MoveChipFromTrayToSocket")
+                if (status < 0) and (status != -200) :
+                    self.check_fault("MoveChipFromTrayToSocket", status, 0)
+                    tryi = tryi + 1
+                    self.stats.record_retry("MoveChipFromTrayToSocket")
+                    print ("Move chip to orignal position")
+                    self.JumpToTray(tray_nr, col_nr, row_nr)    
+                    self.DropToTray()    
+                    self.JumpToCamera()
+                    self.rts_idle() 
+                    self.wait_until_ready("MotorOn")
+                    self.MotorOn() 
+                    self.check_fault("MoveChipFromTrayToSocket", status, tryi)
+                else:
+                    break
+                if tryi > 2:
+                    break
+                else:
+                    print ("Try again")
+                    continue
+            #except:
+            #    print ("whyereeeee")
+            #    time.sleep(1)
         return status
 
 
+    @timed_call
     def MoveChipFromSocketToTray(self, DAT_nr, socket_nr, tray_nr, col_nr, row_nr, duttype="FE"):
         if "FE" in duttype:
             sktn = socket_nr
@@ -191,264 +402,133 @@ class RTS_CFG():
 
         tryi = 0
         while True:
-            try:
-                print ("Move Chip From DAT#{},Socket{} To Tray#{},col#{},row#{}".format(DAT_nr, socket_nr, tray_nr, col_nr, row_nr))
-                self.msg = "MoveChipFromSocketToTray"
-                self.s.send(self.msg.encode())
-                self.s.send(b"\r\n")
-    
-                self.s.send(str(DAT_nr).encode())
-                self.s.send(b"\r\n")
-    
-                self.s.send(str(socket_nr).encode())
-                self.s.send(b"\r\n")
-    
-                self.s.send(str(tray_nr).encode())
-                self.s.send(b"\r\n")
-    
-                self.s.send(str(col_nr).encode())
-                self.s.send(b"\r\n")
-    
-                self.s.send(str(row_nr).encode())
-                self.s.send(b"\r\n")
-    
-                self.msg = self.s.recv(1024).decode()
-                self.msg = self.msg.strip()
-                print("msg: ", self.msg)
-                try:
-                    status = int(self.msg)
-                    if (status < 0) and (status != -200) :
-                        tryi = tryi + 1
-                        print ("Move chip to orignal position")
-                        self.JumpToSocket(DAT_nr, socket_nr)    
-                        self.InsertIntoSocket()    
-                        self.JumpToCamera()
-                        self.rts_idle() 
-                        time.sleep (1)
-                        self.MotorOn() 
-                    else:
-                        break
-
-                    if tryi > 2:
-                        break
-                    else: 
-                        print ("Try again")
-                        continue
-                except:
-                    time.sleep(1)
-
-                try:
-                    status = int(self.msg)
-                    break
-                except:
-                    time.sleep(1)
+            print ("Move Chip From DAT#{},Socket{} To Tray#{},col#{},row#{}".format(DAT_nr, socket_nr, tray_nr, col_nr, row_nr))
+            self.msg = "MoveChipFromSocketToTray"
+            self.request(self.msg, DAT_nr, socket_nr, tray_nr, col_nr, row_nr)
+            print("msg: ", self.msg)
+            status = self.move_status("MoveChipFromSocketToTray")
+            if (status < 0) and (status != -200) :
+                self.check_fault("MoveChipFromSocketToTray", status, 0)
+                tryi = tryi + 1
+                self.stats.record_retry("MoveChipFromSocketToTray")
+                print ("Move chip to orignal position")
+                self.JumpToSocket(DAT_nr, socket_nr)    
+                self.InsertIntoSocket()    
+                self.JumpToCamera()
+                self.rts_idle() 
+                self.wait_until_ready("MotorOn")
+                self.MotorOn() 
+                self.check_fault("MoveChipFromSocketToTray", status, tryi)
+            else:
+                break
 
-                status = int(self.msg)
+            if tryi > 2:
                 break
-            except ConnectionAbortedError:
-                print ("ConnectionAbortedError")
-                self.rts_init(port=2001, host_ip='192.168.0.2')
+            else: 
+                print ("Try again")
+                continue
         return status
 
+    @timed_call
     def MoveChipFromTrayToTray(self, stray_nr, scol_nr, srow_nr, dtray_nr, dcol_nr, drow_nr):
-        i = 0
-        origpos = False
         tryi = 0
         while True:
             print ("Move Chip From  Tray#{},col#{},row#{} To Tray#{},col#{},row#{}".format(stray_nr, scol_nr, srow_nr, dtray_nr, dcol_nr, drow_nr))
-            i = i + 1
             self.msg = "MoveChipFromTrayToTray"
-            self.s.send(self.msg.encode())
-            self.s.send(b"\r\n")
-    
-            self.s.send(str(stray_nr).encode())
-            self.s.send(b"\r\n")
-    
-            self.s.send(str(scol_nr).encode())
-            self.s.send(b"\r\n")
-    
-            self.s.send(str(srow_nr).encode())
-            self.s.send(b"\r\n")
-
-            self.s.send(str(dtray_nr).encode())
-            self.s.send(b"\r\n")
-    
-            self.s.send(str(dcol_nr).encode())
-            self.s.send(b"\r\n")
-    
-            self.s.send(str(drow_nr).encode())
-            self.s.send(b"\r\n")
-
-            self.msg = self.s.recv(1024).decode()
-            self.msg = self.msg.strip()
+            self.request(self.msg, stray_nr, scol_nr, srow_nr, dtray_nr, dcol_nr, drow_nr)
             print("msg: ", self.msg)
-            try:
-                status = int(self.msg)
-                if (status < 0) and (status != -200) :
-                    print ("Move chip to orignal position")
-                    tryi = tryi + 1
-                    i=i-1
-                    self.JumpToTray(stray_nr, scol_nr, srow_nr)    
-                    self.DropToTray()    
-                    self.JumpToCamera()
-                    self.rts_idle() 
-                    time.sleep (1)
-                    self.MotorOn() 
-                    continue
-                else:
-                    break
-
-                if tryi > 2:
-                    break
-                else:
-                    print ("Try again")
-                    continue
-            except:
-                time.sleep(1)
+            status = self.move_status("MoveChipFromTrayToTray")
+            if (status < 0) and (status != -200) :
+                self.check_fault("MoveChipFromTrayToTray", status, 0)
+                print ("Move chip to orignal position")
+                tryi = tryi + 1
+                self.stats.record_retry("MoveChipFromTrayToTray")
+                self.JumpToTray(stray_nr, scol_nr, srow_nr)    
+                self.DropToTray()    
+                self.JumpToCamera()
+                self.rts_idle() 
+                self.wait_until_ready("MotorOn")
+                self.MotorOn() 
+                self.check_fault("MoveChipFromTrayToTray", status, tryi)
                 continue
-
-            if status >=0 :
-                break
             else:
-                if origpos:
-                    print ("Error")
-                    break
-                cn = (drow_nr-1)*15+dcol_nr-1 + 1
-                dcol_nr = cn%15 + 1
-                drow_nr = cn//15 + 1
-                print (cn , dcol_nr, drow_nr, i)
-                if (cn >= 20) :
-                    input ("please check..., any key to put the chip back to orignal position")
-                    dtray_nr = stray_nr
-                    dcol_nr = scol_nr
-                    drow_nr = srow_nr
-                    origpos = True
+                break
         return status
 
+    @timed_call
     def rts_idle(self): 
         while True:
-            try:
-                print ("Quiet")
-                self.msg = "Quiet"
-                self.s.send(self.msg.encode())
-                self.s.send(b"\r\n")
-                self.msg = self.s.recv(1024).decode()
-                self.msg = self.msg.strip()
-                print (self.msg)
-                print ("Wait 5 seconds")
-                if "Quiet" in self.msg:
-                    time.sleep(5)
-                    break
-                else:
-                    time.sleep(1)
-            except ConnectionAbortedError:
-                print ("ConnectionAbortedError")
-                self.rts_init(port=2001, host_ip='192.168.0.2')
+            print ("Quiet")
+            self.msg = "Quiet"
+            self.request(self.msg)
+            print (self.msg)
+            if "Quiet" in self.msg:
+                print ("Wait for robot to be ready")
+                if not self.wait_until_ready("Quiet"):
+                    print ("Robot not ready after {} seconds".format(self.timing("Quiet", "deadline")))
+                break
+            else:
+                self.retry_wait("Quiet")
 
+    @timed_call
     def rts_shutdown(self): 
-        while True:
-            try:
-                self.PumpOff()
-
-                self.msg = "Shutdown"
-                self.s.send(self.msg.encode())
-                self.s.send(b"\r\n")
-                self.msg = self.s.recv(1024).decode()
-                self.msg = self.msg.strip()
-                print (self.msg)
-                break
-            except ConnectionAbortedError:
-                print ("ConnectionAbortedError")
-                self.rts_init(port=2001, host_ip='192.168.0.2')
+        self._cancel_park_timer()
+        self.PumpOff()
+
+        self.msg = "Shutdown"
+        self.request(self.msg)
+        print (self.msg)
 
         print("Closing socket connection...")
-        time.sleep(3)
-        self.s.close()
+        self.conn.wait_closed(self.timing("Shutdown", "deadline"))
+        self.conn.close()
+        if self.stats_path:
+            self.dump_stats()
+        self.stop_trace()
         
+    @timed_call
     def JumpToTray(self, tray_nr, col_nr, row_nr):
         while True:
-            try:
-                print ("Move Chip To Tray#{},col#{},row#{}".format(tray_nr, col_nr, row_nr))
-                msg = "JumpToTray"
-                self.s.send(msg.encode())
-                self.s.send(b"\r\n")
-    
-                self.s.send(str(tray_nr).encode())
-                self.s.send(b"\r\n")
-    
-                self.s.send(str(col_nr).encode())
-                self.s.send(b"\r\n")
-    
-                self.s.send(str(row_nr).encode())
-                self.s.send(b"\r\n")
-    
-                self.msg = self.s.recv(1024).decode()
-                self.msg = self.msg.strip()
-                print (self.msg)
-                if msg in self.msg:
-                    break
-                else:
-                    time.sleep(1)
-            except ConnectionAbortedError:
-                print ("ConnectionAbortedError")
-                self.rts_init(port=2001, host_ip='192.168.0.2')
+            print ("Move Chip To Tray#{},col#{},row#{}".format(tray_nr, col_nr, row_nr))
+            msg = "JumpToTray"
+            self.request(msg, tray_nr, col_nr, row_nr)
+            print (self.msg)
+            if msg in self.msg:
+                break
+            else:
+                self.retry_wait(msg)
 
+    @timed_call
     def DropToTray(self): #
         while True:
-            try:
-                msg = "DropToTray"
-                self.s.send(msg.encode())
-                self.s.send(b"\r\n")
-                self.msg = self.s.recv(1024).decode()
-                self.msg = self.msg.strip()
-                print (self.msg)
-                if "DropToTray" in self.msg:
-                    break
-                else:
-                    time.sleep(1)
-            except ConnectionAbortedError:
-                print ("ConnectionAbortedError")
-                self.rts_init(port=2001, host_ip='192.168.0.2')
+            msg = "DropToTray"
+            self.request(msg)
+            print (self.msg)
+            if "DropToTray" in self.msg:
+                break
+            else:
+                self.retry_wait(msg)
 
+    @timed_call
     def JumpToSocket(self, DAT_nr, socket_nr):
         while True:
-            try:
-
-                print ("Move Chip To DAT#{},Socket{}".format(DAT_nr, socket_nr))
-                msg = "JumpToSocket"
-                self.s.send(msg.encode())
-                self.s.send(b"\r\n")
-    
-                self.s.send(str(DAT_nr).encode())
-                self.s.send(b"\r\n")
-    
-                self.s.send(str(socket_nr).encode())
-                self.s.send(b"\r\n")
-    
-                self.msg = self.s.recv(1024).decode()
-                self.msg = self.msg.strip()
-                print (self.msg)
-                if msg in self.msg:
-                    break
-                else:
-                    time.sleep(1)
-            except ConnectionAbortedError:
-                print ("ConnectionAbortedError")
-                self.rts_init(port=2001, host_ip='192.168.0.2')
 
+            print ("Move Chip To DAT#{},Socket{}".format(DAT_nr, socket_nr))
+            msg = "JumpToSocket"
+            self.request(msg, DAT_nr, socket_nr)
+            print (self.msg)
+            if msg in self.msg:
+                break
+            else:
+                self.retry_wait(msg)
+
+    @timed_call
     def InsertIntoSocket(self): #
         while True:
-            try:
-                msg = "InsertIntoSocket"
-                self.s.send(msg.encode())
-                self.s.send(b"\r\n")
-                self.msg = self.s.recv(1024).decode()
-                self.msg = self.msg.strip()
-                print (self.msg)
-                if "InsertIntoSocket" in self.msg:
-                    break
-                else:
-                    time.sleep(1)
-            except ConnectionAbortedError:
-                print ("ConnectionAbortedError")
-                self.rts_init(port=2001, host_ip='192.168.0.2')
\ No newline at end of file
+            msg = "InsertIntoSocket"
+            self.request(msg)
+            print (self.msg)
+            if "InsertIntoSocket" in self.msg:
+                break
+            else:
+                self.retry_wait(msg)
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""
+Connection management for the RTS robot link.
+
+RTSConnection remembers the endpoint it was opened with, so a dropped
+connection is re-established to the same robot. Connecting retries with
+bounded exponential backoff and jitter instead of a tight loop, and a
+command interrupted by a dropped connection is resent automatically when
+it is idempotent. Every reconnect is recorded with its duration.
+
+Classes:
+    RTSConnection: Socket, reply reader and reconnect policy for one robot
+    RTSConnectionError: The robot could not be reached
+    RTSCommandInterrupted: A non-idempotent command was cut off mid-flight
+"""
+
+import random
+import socket
+import time
+
+from RTS_Protocol import BANNER, IDEMPOTENT_COMMANDS, LineReader, configure_socket, encode_command
+
+
+class RTSConnectionError(ConnectionError):
+    """Raised when the robot cannot be reached within the retry budget."""
+
+
+class RTSCommandInterrupted(ConnectionError):
+    """
+    Raised when the connection drops during a command that is not safe to
+    resend. The connection has already been re-established; whether the
+    robot executed the command is unknown, so the caller must decide.
+    """
+
+    def __init__(self, name, cause):
+        super().__init__(f"Connection lost during {name}: {cause}")
+        self.command = name
+        self.cause = cause
+
+
+class RTSConnection:
+    """
+    Connection to one RTS robot server.
+
+    Attributes:
+        host_ip (str): Robot address
+        port (int): Robot port
+        sock (socket.socket): Connected socket, or None
+        reader (LineReader): Reply reader for sock
+        reconnects (list): One dict per reconnect with 'time', 'seconds',
+            'attempts' and 'reason'
+    """
+
+    def __init__(self, host_ip, port, connect_timeout=5.0, max_attempts=8,
+                 base_delay=0.5, max_delay=30.0, jitter=0.5, resend_limit=1):
+        self.host_ip = host_ip
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.resend_limit = resend_limit
+        self.sock = None
+        self.reader = None
+        self.banner = None
+        self.reconnects = []
+
+    @property
+    def endpoint(self):
+        """(host_ip, port) of the robot."""
+        return (self.host_ip, self.port)
+
+    @property
+    def reconnect_time(self):
+        """Total seconds spent reconnecting."""
+        return sum(r['seconds'] for r in self.reconnects)
+
+    def backoff_delay(self, attempt):
+        """Seconds to wait before connection attempt number attempt (0-based)."""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * random.uniform(1.0 - self.jitter, 1.0)
+
+    def _open(self):
+        sock = socket.create_connection(self.endpoint, timeout=self.connect_timeout)
+        try:
+            configure_socket(sock)
+            reader = LineReader(sock)
+            banner = reader.readline()
+        except (OSError, ConnectionError):
+            sock.close()
+            raise
+        if banner != BANNER:
+            sock.close()
+            raise ConnectionError(f"Bad response from server: [{banner}]")
+        # Commands can legitimately take minutes; only the connect is bounded.
+        sock.settimeout(None)
+        self.sock, self.reader, self.banner = sock, reader, banner
+        return banner
+
+    def connect(self):
+        """
+        Connect to the robot, retrying with exponential backoff.
+
+        Returns:
+            int: Number of attempts used
+
+        Raises:
+            RTSConnectionError: If every attempt fails
+        """
+        self.close()
+        last_error = None
+        for attempt in range(self.max_attempts):
+            if attempt:
+                delay = self.backoff_delay(attempt - 1)
+                print(f"Retrying connection to {self.host_ip}:{self.port} in {delay:.1f} s")
+                time.sleep(delay)
+            try:
+                self._open()
+                print("the socket has successfully connected to ", self.host_ip)
+                return attempt + 1
+            except (OSError, ConnectionError) as err:
+                last_error = err
+                print(f"***ERROR! Could not connect to {self.host_ip}:{self.port}: {err}")
+        raise RTSConnectionError(
+            f"Could not connect to {self.host_ip}:{self.port} after {self.max_attempts} attempts: {last_error}")
+
+    def reconnect(self, reason=None):
+        """Re-establish the connection to the remembered endpoint and record it."""
+        print(f"Reconnecting to {self.host_ip}:{self.port}")
+        start = time.monotonic()
+        attempts = self.connect()
+        self.reconnects.append({
+            'time': time.time(),
+            'seconds': time.monotonic() - start,
+            'attempts': attempts,
+            'reason': repr(reason) if reason is not None else None,
+        })
+
+    def close(self):
+        """Close the socket, if open."""
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+        self.reader = None
+
+    def wait_closed(self, timeout):
+        """
+        Wait up to timeout seconds for the server to close the connection,
+        discarding anything it still sends.
+
+        Returns:
+            bool: True if the server closed the connection in time
+        """
+        if self.sock is None:
+            return True
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.sock.settimeout(remaining)
+                if not self.sock.recv(4096):
+                    return True
+        except socket.timeout:
+            return False
+        except OSError:
+            return True
+
+    def send(self, name, *args):
+        """Send one command frame."""
+        self.sock.sendall(encode_command(name, *args))
+
+    def readline(self):
+        """Read the next reply line."""
+        return self.reader.readline()
+
+    def request(self, name, *args):
+        """
+        Send a command and return its reply, reconnecting if the link drops.
+
+        Idempotent commands are resent on the new connection (up to
+        resend_limit times). Other commands raise RTSCommandInterrupted once
+        the connection is back.
+
+        Raises:
+            RTSCommandInterrupted: If a non-idempotent command was interrupted
+            RTSConnectionError: If the robot cannot be reached again
+        """
+        resends = 0
+        while True:
+            try:
+                if self.sock is None:
+                    raise ConnectionAbortedError("Not connected")
+                self.send(name, *args)
+                return self.readline()
+            except (ConnectionError, OSError) as err:
+                if isinstance(err, RTSConnectionError):
+                    raise
+                print(f"{type(err).__name__} during {name}")
+                self.reconnect(reason=err)
+                if name not in IDEMPOTENT_COMMANDS or resends >= self.resend_limit:
+                    raise RTSCommandInterrupted(name, err) from err
+                resends += 1
+                print(f"Resending {name}")
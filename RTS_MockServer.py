@@ -0,0 +1,251 @@
+"""
+Local stand-in for the RTS robot server.
+
+Speaks the same line protocol as the robot (RTS ready banner, CRLF
+framed commands and replies) so RTS_CFG, RTS_AsyncCFG and the
+FNAL_RTS_integration moves can be exercised and benchmarked without
+hardware. Each command can be given a latency distribution, and move
+commands can be made to fail with injected status codes.
+
+Classes:
+    MockRobot: Command handler with latencies and error injection
+    RTSMockServer: Threaded TCP server around a robot model
+
+Usage:
+    python RTS_MockServer.py --port 2001 \\
+        --latency MoveChipFromTrayToSocket=uniform:2:4 \\
+        --error MoveChipFromTrayToSocket=-1:0.05
+"""
+
+import argparse
+import random
+import socketserver
+import threading
+import time
+
+from RTS_Protocol import BANNER, COMMAND_ARGS, LineReader, encode_command
+
+MOVE_COMMANDS = ("MoveChipFromTrayToSocket", "MoveChipFromSocketToTray", "MoveChipFromTrayToTray")
+
+
+def make_distribution(spec):
+    """
+    Build a sampler from a latency specification.
+
+    Args:
+        spec: One of
+            a number: fixed latency in seconds
+            ("fixed", s), ("uniform", lo, hi), ("normal", mu, sigma),
+            ("lognormal", mu, sigma), ("exp", mean)
+            a callable taking a random.Random and returning seconds
+
+    Returns:
+        callable: sampler(rng) -> non-negative latency in seconds
+    """
+    if callable(spec):
+        return spec
+    if isinstance(spec, (int, float)):
+        return lambda rng: float(spec)
+    kind, *params = spec
+    params = [float(p) for p in params]
+    if kind == "fixed":
+        return lambda rng: params[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(params[0], params[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(params[0], params[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(params[0], params[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1.0 / params[0]) if params[0] > 0 else 0.0
+    raise ValueError(f"Unknown latency distribution: {kind}")
+
+
+def parse_latency(text):
+    """Parse 'Command=kind:p1:p2' (or 'Command=seconds') from the command line."""
+    name, _, spec = text.partition("=")
+    fields = spec.split(":")
+    if len(fields) == 1:
+        return name, float(fields[0])
+    return name, tuple(fields)
+
+
+def parse_error(text):
+    """Parse 'Command=code:probability' from the command line."""
+    name, _, spec = text.partition("=")
+    code, probability = spec.split(":")
+    return name, int(code), float(probability)
+
+
+class MockRobot:
+    """
+    Robot model answering RTS commands.
+
+    Attributes:
+        latencies (dict): Command name -> latency sampler
+        errors (dict): Command name -> list of (status code, probability)
+        time_scale (float): Multiplier applied to every sampled latency
+        cover_status (str): Reply to CoverStatus
+        motor_on (bool): Current motor state
+        counts (dict): Number of times each command was received
+        total_delay (float): Sum of all latencies served, in seconds
+    """
+
+    def __init__(self, latencies=None, errors=None, time_scale=1.0, seed=None, cover_status="199"):
+        self.latencies = {}
+        for name, spec in (latencies or {}).items():
+            self.latencies[name] = make_distribution(spec)
+        self.errors = {}
+        for name, entries in (errors or {}).items():
+            self.errors[name] = list(entries)
+        self.time_scale = time_scale
+        self.cover_status = cover_status
+        self.motor_on = False
+        self.counts = {}
+        self.total_delay = 0.0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def set_latency(self, name, spec):
+        """Set the latency distribution of one command."""
+        self.latencies[name] = make_distribution(spec)
+
+    def inject_error(self, name, code, probability):
+        """Make a command reply with status code with the given probability."""
+        self.errors.setdefault(name, []).append((code, probability))
+
+    def _status(self, name):
+        draw = self._rng.random()
+        for code, probability in self.errors.get(name, ()):
+            if draw < probability:
+                return code
+            draw -= probability
+        return 0
+
+    def handle(self, name, args):
+        """
+        Answer one command.
+
+        Args:
+            name (str): Command name
+            args (list): Command arguments as strings
+
+        Returns:
+            tuple: (delay in seconds, reply line)
+        """
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+            sampler = self.latencies.get(name)
+            delay = sampler(self._rng) * self.time_scale if sampler else 0.0
+            self.total_delay += delay
+
+            if name == "MotorOn":
+                self.motor_on = True
+                return delay, "MotorOn"
+            if name == "MotorOff":
+                self.motor_on = False
+                return delay, "MotorOff"
+            if name == "CoverStatus":
+                return delay, self.cover_status
+            if name in MOVE_COMMANDS:
+                return delay, str(self._status(name))
+            if name in COMMAND_ARGS:
+                return delay, name
+            return delay, f"Unknown command {name}"
+
+
+class _RTSHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        robot = self.server.robot
+        reader = LineReader(self.request)
+        self.request.sendall(encode_command(BANNER))
+        while True:
+            try:
+                name = reader.readline()
+                args = [reader.readline() for _ in range(COMMAND_ARGS.get(name, 0))]
+            except (ConnectionError, OSError):
+                return
+            delay, reply = robot.handle(name, args)
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                self.request.sendall(encode_command(reply))
+            except OSError:
+                return
+            if name == "Shutdown":
+                return
+
+
+class RTSMockServer(socketserver.ThreadingTCPServer):
+    """
+    Threaded TCP server that serves a robot model on a local port.
+
+    Attributes:
+        robot: Object with handle(name, args) -> (delay, reply)
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0, robot=None):
+        super().__init__((host, port), _RTSHandler)
+        self.robot = robot if robot is not None else MockRobot()
+        self._thread = None
+
+    @property
+    def address(self):
+        """(host, port) the server is listening on."""
+        return self.server_address[:2]
+
+    def start(self):
+        """Serve in a background thread and return (host, port)."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self.address
+
+    def stop(self):
+        """Stop serving and close the listening socket."""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local mock RTS robot server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2001)
+    parser.add_argument("--latency", action="append", default=[], metavar="CMD=SPEC",
+                        help="e.g. MoveChipFromTrayToSocket=uniform:2:4 or MotorOn=0.2")
+    parser.add_argument("--error", action="append", default=[], metavar="CMD=CODE:P",
+                        help="e.g. MoveChipFromTrayToSocket=-1:0.05")
+    parser.add_argument("--scale", type=float, default=1.0, help="latency multiplier")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    robot = MockRobot(time_scale=args.scale, seed=args.seed)
+    for text in args.latency:
+        robot.set_latency(*parse_latency(text))
+    for text in args.error:
+        robot.inject_error(*parse_error(text))
+
+    server = RTSMockServer(args.host, args.port, robot)
+    print(f"Mock RTS server listening on {server.address[0]}:{server.address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping mock RTS server.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Drive several RTS test stands from one process.
+
+Each stand has its own robot connection (RTS_AsyncCFG) and its own
+RTSStateMachine. All stands share one asyncio event
+loop, which multiplexes the sockets with selectors, so a stand waiting on
+a slow move or a retry never blocks the others.
+
+A robot fault or an interrupted move only affects its chip: the stand's
+state machine enters the matching error state and its recovery policy
+retries, rejects or pauses, as in RTSStateMachine.run_chip_cycle(). The
+stand moves rejected chips out of the socket itself. An operator pause
+never waits on input(): by default it fails only that stand with
+OperatorRequired, and the other stands keep moving.
+
+Classes:
+    Stand: One robot and its state machine
+    MultiStandController: Runs trays on several stands concurrently
+
+Example:
+    controller = MultiStandController()
+    controller.add_stand("stand1", "192.168.121.1", 201, sm1)
+    controller.add_stand("stand2", "192.168.122.1", 201, sm2)
+    results = asyncio.run(controller.run())
+"""
+
+import asyncio
+import time
+
+from ChipTable import PENDING, IN_SOCKET, TESTED, DONE, BAD
+from RTS_AsyncCFG import RTS_AsyncCFG
+from RTS_Connection import RTSCommandInterrupted
+from RTS_StatusCodes import RobotFault
+from RTSOrchestrator import OperatorRequired
+from RTSRecovery import REJECT
+
+
+def _operator_required(stand):
+    raise OperatorRequired(f"[{stand.name}] Operator needed at chip {stand.state_machine.current_chip_index + 1}")
+
+
+class Stand:
+    """
+    One test stand: robot client and state machine.
+
+    The stand awaits each command on its own client, which serializes
+    commands on its connection, so every stand has exactly one command in
+    flight.
+
+    Attributes:
+        name (str): Stand name used in log output
+        host_ip (str): Robot address
+        port (int): Robot port
+        state_machine (RTSStateMachine): State machine for this stand
+        client (RTS_AsyncCFG): Robot client
+        chips_done (int): Chips returned to the tray on this stand
+        chips_rejected (int): Chips rejected by the recovery policy
+        on_pause (callable): Called with the stand when its state machine
+            would pause for the operator. It runs on the event loop, so it
+            must not block; it may set the machine's state and return, or
+            raise to stop the stand. The default raises OperatorRequired.
+    """
+
+    def __init__(self, name, host_ip, port, state_machine, client=None, on_pause=None):
+        self.name = name
+        self.host_ip = host_ip
+        self.port = port
+        self.state_machine = state_machine
+        self.client = client if client is not None else RTS_AsyncCFG()
+        self.chips_done = 0
+        self.chips_rejected = 0
+        self._started = False
+        self.on_pause = on_pause if on_pause is not None else _operator_required
+
+        # The stand moves the chips itself; the state machine only tracks state
+        self.state_machine.external_motion = True
+        self.state_machine.pause_with_user_input = lambda: self.on_pause(self)
+
+    async def start(self):
+        """Connect to the robot."""
+        await self.client.rts_init(port=self.port, host_ip=self.host_ip)
+        self._started = True
+
+    async def stop(self):
+        """Shut the robot down and close the connection."""
+        if self._started:
+            self._started = False
+            try:
+                await self.client.rts_shutdown()
+            finally:
+                await self.client.close()
+
+    async def _move(self, state):
+        """Move the current chip if state is a move state; a fault enters its error state."""
+        sm = self.state_machine
+        if state == sm.moving_chip_to_socket:
+            move = self.client.MoveChipFromTrayToSocket
+        elif state == sm.moving_chip_to_tray:
+            move = self.client.MoveChipFromSocketToTray
+        else:
+            return
+        chip = sm.get_current_chip_data()
+        try:
+            await move(chip['dat'], chip['dat_socket'], chip['tray'], chip['col'], chip['row'])
+        except (RobotFault, RTSCommandInterrupted) as e:
+            if isinstance(e, RobotFault):
+                if e.restored and state == sm.moving_chip_to_socket:
+                    # The robot put the chip back in its pocket
+                    sm.record_chip_status(sm.current_chip_index, PENDING)
+                sm.enter_fault(e)
+            else:
+                sm.enter_interrupted(e)
+            if sm.current_state == state:
+                # The fault has no error state from this move: ask the operator
+                sm.pause_cycle()
+            return
+        if state == sm.moving_chip_to_tray:
+            sm.record_chip_status(sm.current_chip_index, DONE)
+
+    async def _reject(self, index):
+        """Move a rejected chip from its socket back to its pocket and mark it BAD."""
+        sm = self.state_machine
+        chip = sm.chip_positions.row_view(index)
+        try:
+            await self.client.MoveChipFromSocketToTray(chip.dat, chip.dat_socket, chip.tray, chip.col, chip.row)
+        except (RobotFault, RTSCommandInterrupted) as e:
+            # Loading the next chip would put it on top of this one
+            raise OperatorRequired(f"[{self.name}] Chip {index + 1} is still in its socket: {e}") from e
+        sm.record_chip_status(index, BAD)
+
+    async def run_chip(self):
+        """
+        Cycle the current chip from ground back to ground, moving it whenever
+        the machine enters a move state. Errors are left through
+        RTSStateMachine.recover(), as in run_chip_cycle().
+
+        Returns:
+            bool: True if the chip was returned to the tray, False if it was rejected
+
+        Raises:
+            OperatorRequired: From the default on_pause, or if a rejected chip
+                cannot be moved out of its socket
+        """
+        sm = self.state_machine
+        while True:
+            if sm.current_state.id not in sm.CYCLE_STATES:
+                index = sm.current_chip_index
+                if sm.recover() == REJECT:
+                    if sm.chip_positions.status[index] in (IN_SOCKET, TESTED):
+                        await self._reject(index)
+                    return False
+            else:
+                unloading = sm.current_state == sm.moving_chip_to_tray
+                sm.cycle()
+                if unloading and sm.current_state == sm.ground:
+                    return True
+            await self._move(sm.current_state)
+
+    async def run_tray(self):
+        """
+        Process every chip of the state machine's tray.
+
+        Steps through the same six-state cycle as run_full_cycle(), moving
+        the chip whenever the machine enters a move state.
+
+        Returns:
+            int: Number of chips processed
+        """
+        sm = self.state_machine
+        num_chips = len(sm.chip_positions['col'])
+        sm.current_chip_index = 0
+        if sm.recovery is not None:
+            sm.recovery.start_tray()
+        await self.client.MotorOn()
+        for i in range(num_chips):
+            print(f"[{self.name}] --- Processing chip {i+1}/{num_chips} ---")
+            if await self.run_chip():
+                self.chips_done += 1
+            else:
+                self.chips_rejected += 1
+            sm.advance_chip_position()
+        await self.client.JumpToCamera()
+        await self.client.PumpOff()
+        await self.client.MotorOff()
+        return num_chips
+
+
+class MultiStandController:
+    """
+    Runs a tray on every registered stand concurrently.
+
+    A stand that fails (lost connection, timeout, error) is reported in the
+    results and does not stop the other stands.
+
+    Attributes:
+        stands (dict): Stand name -> Stand
+    """
+
+    def __init__(self):
+        self.stands = {}
+
+    def add_stand(self, name, host_ip, port, state_machine, client=None, on_pause=None):
+        """Register a stand and return it."""
+        stand = Stand(name, host_ip, port, state_machine, client, on_pause)
+        self.stands[name] = stand
+        return stand
+
+    async def _run_stand(self, stand):
+        start = time.perf_counter()
+        try:
+            await stand.start()
+            chips = await stand.run_tray()
+            return {'chips': chips, 'rejected': stand.chips_rejected,
+                    'seconds': time.perf_counter() - start, 'error': None}
+        except Exception as e:
+            print(f"[{stand.name}] Stand failed: {e!r}")
+            return {'chips': stand.chips_done, 'rejected': stand.chips_rejected,
+                    'seconds': time.perf_counter() - start, 'error': repr(e)}
+        finally:
+            try:
+                await stand.stop()
+            except Exception as e:
+                print(f"[{stand.name}] Error during shutdown: {e!r}")
+
+    async def run(self):
+        """
+        Run one tray on every stand.
+
+        Returns:
+            dict: Stand name -> {'chips', 'rejected', 'seconds', 'error'}
+        """
+        names = list(self.stands)
+        results = await asyncio.gather(*(self._run_stand(self.stands[n]) for n in names))
+        return dict(zip(names, results))
@@ -0,0 +1,187 @@
+"""
+Pick order planning for tray moves.
+
+Arm travel between chips is the dominant per-chip cost, so the order in
+which chips are visited matters. This module models the tray and DAT
+socket geometry in millimetres and orders the chips to minimise total
+travel with a nearest-neighbour construction followed by 2-opt
+improvement.
+
+Two kinds of tour are planned:
+    'socket': each chip is carried from its tray pocket to its socket
+              (MoveChipsToSockets / MoveChipsToTray). The cost from chip i
+              to chip j is the empty travel from socket i to pocket j.
+    'cycle':  each chip is moved to its socket, tested and returned to its
+              own pocket before the next one (RTSStateMachine). The cost
+              from chip i to chip j is the travel from pocket i to pocket j.
+
+Classes:
+    TrayGeometry: Positions of tray pockets, DAT sockets and the camera
+
+Functions:
+    plan_order: Visit order for a list of chips
+    tour_length: Travel distance of a visit order
+"""
+
+import math
+
+
+class TrayGeometry:
+    """
+    Geometry of the RTS deck, in millimetres.
+
+    The defaults are placeholders, not measurements of any stand: two trays
+    and four DAT sockets at round-number positions, enough to exercise the
+    planner. Orders planned with them only approximate the real travel;
+    pass the measured pitches, tray origins and socket positions of the
+    stand to plan for it.
+
+    Attributes:
+        col_pitch (float): Distance between tray columns
+        row_pitch (float): Distance between tray rows
+        tray_origins (dict): Tray number -> (x, y) of column 1, row 1
+        sockets (dict): (DAT, socket) -> (x, y)
+        camera (tuple): (x, y) of the camera/home position
+    """
+
+    def __init__(self, col_pitch=25.0, row_pitch=25.0, tray_origins=None,
+                 sockets=None, camera=(0.0, 0.0)):
+        self.col_pitch = col_pitch
+        self.row_pitch = row_pitch
+        self.tray_origins = tray_origins or {1: (100.0, 0.0), 2: (100.0, 150.0)}
+        self.sockets = sockets or {
+            (1, 21): (-150.0, 0.0), (1, 22): (-150.0, 40.0),
+            (2, 21): (-150.0, 150.0), (2, 22): (-150.0, 190.0),
+        }
+        self.camera = camera
+
+    def tray_position(self, tray, col, row):
+        """(x, y) of a tray pocket."""
+        x0, y0 = self.tray_origins.get(tray, (0.0, 0.0))
+        return (x0 + (col - 1) * self.col_pitch, y0 + (row - 1) * self.row_pitch)
+
+    def socket_position(self, dat, dat_socket):
+        """(x, y) of a DAT socket."""
+        return self.sockets.get((dat, dat_socket), self.camera)
+
+    @staticmethod
+    def distance(a, b):
+        """Straight-line distance between two points."""
+        return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+def _points(chips, geometry):
+    pockets = [geometry.tray_position(c['tray'], c['col'], c['row']) for c in chips]
+    sockets = [geometry.socket_position(c.get('dat'), c.get('dat_socket')) for c in chips]
+    return pockets, sockets
+
+
+def _cost_matrix(chips, geometry, mode):
+    pockets, sockets = _points(chips, geometry)
+    ends = sockets if mode == 'socket' else pockets
+    dist = geometry.distance
+    n = len(chips)
+    cost = [[dist(ends[i], pockets[j]) for j in range(n)] for i in range(n)]
+    start = [dist(geometry.camera, pockets[j]) for j in range(n)]
+    return cost, start
+
+
+def _length(order, cost, start):
+    if not order:
+        return 0.0
+    total = start[order[0]]
+    for a, b in zip(order, order[1:]):
+        total += cost[a][b]
+    return total
+
+
+def tour_length(chips, order=None, geometry=None, mode='socket'):
+    """
+    Empty-arm travel of visiting chips in order, starting at the camera.
+
+    Args:
+        chips (list): Chip dicts with 'tray', 'col', 'row', 'dat', 'dat_socket'
+        order (list, optional): Visit order as indices into chips (default: as listed)
+        geometry (TrayGeometry, optional): Deck geometry
+        mode (str): 'socket' or 'cycle', see the module docstring
+
+    Returns:
+        float: Travel in millimetres
+    """
+    geometry = geometry or TrayGeometry()
+    cost, start = _cost_matrix(chips, geometry, mode)
+    return _length(list(range(len(chips))) if order is None else list(order), cost, start)
+
+
+def _nearest_neighbour(cost, start):
+    n = len(start)
+    unvisited = set(range(n))
+    current = min(unvisited, key=lambda j: (start[j], j))
+    order = [current]
+    unvisited.remove(current)
+    while unvisited:
+        row = cost[current]
+        current = min(unvisited, key=lambda j: (row[j], j))
+        order.append(current)
+        unvisited.remove(current)
+    return order
+
+
+def _two_opt(order, cost, start, max_passes=50):
+    # Reversing order[i:k + 1] replaces the two edges at its ends and turns
+    # the edges inside it around. Costs are symmetric in 'cycle' mode, where
+    # the inner edges cancel; in 'socket' mode their change is summed as k
+    # grows. Either way each candidate costs O(1).
+    order = list(order)
+    n = len(order)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(n - 1):
+            inner = 0.0     # reversed minus forward cost of the edges inside the segment
+            for k in range(i + 1, n):
+                inner += cost[order[k]][order[k - 1]] - cost[order[k - 1]][order[k]]
+                first, last = order[i], order[k]
+                if i == 0:
+                    old, new = start[first], start[last]
+                else:
+                    prev = order[i - 1]
+                    old, new = cost[prev][first], cost[prev][last]
+                if k < n - 1:
+                    nxt = order[k + 1]
+                    old += cost[last][nxt]
+                    new += cost[first][nxt]
+                if new - old + inner < -1e-9:
+                    order[i:k + 1] = order[i:k + 1][::-1]
+                    inner = -inner
+                    improved = True
+        if not improved:
+            break
+    return order
+
+
+def plan_order(chips, geometry=None, mode='socket'):
+    """
+    Order chips to minimise total arm travel.
+
+    Args:
+        chips (list): Chip dicts with 'tray', 'col', 'row', 'dat', 'dat_socket'
+        geometry (TrayGeometry, optional): Deck geometry
+        mode (str): 'socket' or 'cycle', see the module docstring
+
+    Returns:
+        list: Indices into chips in visit order
+    """
+    if mode not in ('socket', 'cycle'):
+        raise ValueError(f"Unknown planning mode: {mode}")
+    if len(chips) < 2:
+        return list(range(len(chips)))
+    geometry = geometry or TrayGeometry()
+    cost, start = _cost_matrix(chips, geometry, mode)
+    order = _nearest_neighbour(cost, start)
+    return _two_opt(order, cost, start)
+
+
+def chips_from_positions(chip_positions):
+    """Convert a chip_positions dict of lists into a list of chip dicts."""
+    keys = list(chip_positions)
+    return [dict(zip(keys, values)) for values in zip(*(chip_positions[k] for k in keys))]
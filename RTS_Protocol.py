@@ -0,0 +1,134 @@
+"""
+Wire protocol for talking to the RTS robot server.
+
+A command is sent as one frame: the command name followed by each of its
+arguments, every field terminated by CRLF. Replies from the server are
+CRLF (or LF) terminated lines. TCP gives no guarantee that one recv()
+returns exactly one reply, so replies are read through a line buffer that
+copes with replies split across reads and several replies merged in one.
+
+Classes:
+    LineReader: Buffered reply reader for a connected socket
+
+Functions:
+    encode_command: Build the frame for a command and its arguments
+    parse_status: Parse an integer status reply
+"""
+
+import socket
+
+TERMINATOR = b"\r\n"
+
+# Number of arguments each RTS command takes, in the order they are sent
+COMMAND_ARGS = {
+    "MotorOn": 0,
+    "MotorOff": 0,
+    "PumpOff": 0,
+    "CoverStatus": 0,
+    "JumpToCamera": 0,
+    "Quiet": 0,
+    "Shutdown": 0,
+    "DropToTray": 0,
+    "InsertIntoSocket": 0,
+    "JumpToTray": 3,               # tray, col, row
+    "JumpToSocket": 2,             # DAT, socket
+    "MoveChipFromTrayToSocket": 5, # DAT, socket, tray, col, row
+    "MoveChipFromSocketToTray": 5, # DAT, socket, tray, col, row
+    "MoveChipFromTrayToTray": 6,   # src tray, col, row, dst tray, col, row
+}
+
+# Commands that leave the robot in the same state however many times they run,
+# so they can be resent after a dropped connection without moving a chip twice
+IDEMPOTENT_COMMANDS = frozenset((
+    "MotorOn", "MotorOff", "PumpOff", "CoverStatus", "Quiet",
+    "JumpToCamera", "JumpToTray", "JumpToSocket",
+))
+
+BANNER = "RTS ready"
+
+
+def encode_command(name, *args):
+    """
+    Encode a command and its arguments as a single CRLF-delimited frame.
+
+    Args:
+        name (str): RTS command name, e.g. "MoveChipFromTrayToSocket"
+        *args: Command arguments, converted with str()
+
+    Returns:
+        bytes: The frame to send in one sendall() call
+    """
+    return b"".join(str(field).encode() + TERMINATOR for field in (name,) + args)
+
+
+def parse_status(reply):
+    """
+    Parse an integer status reply from a move command.
+
+    Args:
+        reply (str): Stripped reply line
+
+    Returns:
+        int or None: The status code, or None if the reply is not an integer
+    """
+    try:
+        return int(reply)
+    except (TypeError, ValueError):
+        return None
+
+
+class LineReader:
+    """
+    Buffered line reader for replies from the RTS server.
+
+    Bytes received beyond the end of the current reply are kept for the
+    next call, so merged replies are returned one at a time and a reply
+    split across several recv() calls is reassembled before it is returned.
+
+    Attributes:
+        sock (socket.socket): Connected socket to read from
+        bufsize (int): Maximum number of bytes per recv() call
+    """
+
+    def __init__(self, sock, bufsize=4096):
+        self.sock = sock
+        self.bufsize = bufsize
+        self._buffer = bytearray()
+
+    def readline(self):
+        """
+        Return the next non-empty reply line, without its terminator.
+
+        Raises:
+            ConnectionAbortedError: If the server closes the connection
+        """
+        while True:
+            end = self._buffer.find(b"\n")
+            while end >= 0:
+                line = bytes(self._buffer[:end])
+                del self._buffer[:end + 1]
+                line = line.decode(errors="replace").strip()
+                if line:
+                    return line
+                end = self._buffer.find(b"\n")
+
+            data = self.sock.recv(self.bufsize)
+            if not data:
+                raise ConnectionAbortedError("Connection closed by RTS server")
+            self._buffer.extend(data)
+
+    def pending(self):
+        """Return True if unread bytes are waiting in the buffer."""
+        return bool(self._buffer)
+
+    def clear(self):
+        """Discard any buffered, unread bytes."""
+        self._buffer.clear()
+
+
+def configure_socket(sock):
+    """Disable Nagle's algorithm so each command frame is sent immediately."""
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except (OSError, AttributeError):
+        pass
@@ -0,0 +1,201 @@
+"""
+Latency statistics for the RTS robot link.
+
+Every command frame sent to the robot is timed from send to parsed reply,
+and every RTS_CFG call (including its retries and recovery moves) is timed
+as a whole. Latencies go into log-bucketed histograms: recording is a
+couple of arithmetic operations and a list increment, memory is fixed per
+command, and p50/p95/p99 are read off the buckets with a relative error
+bounded by the bucket growth factor.
+
+Classes:
+    LatencyHistogram: Fixed-size log-bucketed latency histogram
+    CommandStats: Per-command histograms, retry and status counters
+
+Functions:
+    timed_call: Decorator timing an RTS_CFG method into self.stats
+"""
+
+import functools
+import json
+import math
+import os
+import time
+
+
+class LatencyHistogram:
+    """
+    Histogram of latencies with logarithmically spaced buckets.
+
+    Bucket i covers [min_value * growth**i, min_value * growth**(i+1)).
+    Values below min_value go in the first bucket, values above the range
+    in the last.
+
+    Attributes:
+        count (int): Number of samples
+        total (float): Sum of samples in seconds
+        min (float): Smallest sample
+        max (float): Largest sample
+    """
+
+    __slots__ = ("min_value", "growth", "_log_growth", "counts", "count", "total", "min", "max")
+
+    def __init__(self, min_value=1e-6, max_value=1e4, growth=1.1):
+        self.min_value = min_value
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        size = int(math.ceil(math.log(max_value / min_value) / self._log_growth)) + 1
+        self.counts = [0] * size
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def record(self, seconds):
+        """Add one sample."""
+        if seconds > self.min_value:
+            index = int(math.log(seconds / self.min_value) / self._log_growth)
+            if index >= len(self.counts):
+                index = len(self.counts) - 1
+        else:
+            index = 0
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """
+        Approximate q-th percentile (0-100) in seconds.
+
+        Returns the upper edge of the bucket holding the percentile, clamped
+        to the observed min/max, or None if there are no samples.
+        """
+        if not self.count:
+            return None
+        rank = q / 100.0 * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                if index == len(self.counts) - 1:
+                    # Samples above the range all land here: only max bounds them
+                    return self.max
+                upper = self.min_value * self.growth ** (index + 1)
+                return max(self.min, min(upper, self.max))
+        return self.max
+
+    @property
+    def mean(self):
+        """Mean latency in seconds, or None if there are no samples."""
+        return self.total / self.count if self.count else None
+
+    def summary(self):
+        """Return count, mean, min, max, p50, p95 and p99 as a dict."""
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class CommandStats:
+    """
+    Latency, retry and status statistics per robot command.
+
+    Attributes:
+        frames (dict): Command name -> LatencyHistogram of single round trips
+        calls (dict): RTS_CFG method name -> LatencyHistogram of whole calls
+        retries (dict): Command or method name -> number of retries
+        statuses (dict): Command name -> {status code: count} for integer replies
+    """
+
+    def __init__(self):
+        self.frames = {}
+        self.calls = {}
+        self.retries = {}
+        self.statuses = {}
+        self.started = time.time()
+
+    def record_frame(self, name, seconds, status=None):
+        """Record one command round trip, and its status code if it has one."""
+        histogram = self.frames.get(name)
+        if histogram is None:
+            histogram = self.frames[name] = LatencyHistogram()
+        histogram.record(seconds)
+        if status is not None:
+            codes = self.statuses.setdefault(name, {})
+            codes[status] = codes.get(status, 0) + 1
+
+    def record_call(self, name, seconds):
+        """Record one complete RTS_CFG method call."""
+        histogram = self.calls.get(name)
+        if histogram is None:
+            histogram = self.calls[name] = LatencyHistogram()
+        histogram.record(seconds)
+
+    def record_retry(self, name):
+        """Count one retry of a command or method."""
+        self.retries[name] = self.retries.get(name, 0) + 1
+
+    def summary(self):
+        """Return all statistics as a JSON-serializable dict."""
+        return {
+            "started": self.started,
+            "frames": {name: h.summary() for name, h in sorted(self.frames.items())},
+            "calls": {name: h.summary() for name, h in sorted(self.calls.items())},
+            "retries": dict(sorted(self.retries.items())),
+            "statuses": {name: {str(code): n for code, n in sorted(codes.items())}
+                         for name, codes in sorted(self.statuses.items())},
+        }
+
+    def report(self):
+        """Return a plain-text table of the call and frame latencies in ms."""
+        lines = [f"{'command':<32}{'n':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'retries':>9}"]
+        for title, table in (("calls", self.calls), ("frames", self.frames)):
+            lines.append(f"[{title}]")
+            for name, h in sorted(table.items()):
+                s = h.summary()
+                lines.append(f"{name:<32}{s['count']:>7}"
+                             + "".join(f"{1e3 * s[k]:>10.1f}" for k in ("p50", "p95", "p99", "max"))
+                             + f"{self.retries.get(name, 0):>9}")
+        return "\n".join(lines)
+
+    def dump(self, path, extra=None):
+        """
+        Write the statistics to a JSON file, atomically.
+
+        Args:
+            path (str): Output file
+            extra (dict, optional): Additional top-level entries (e.g. reconnects)
+        """
+        data = self.summary()
+        data["dumped"] = time.time()
+        if extra:
+            data.update(extra)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+def timed_call(method):
+    """Time a whole RTS_CFG method call, including retries, into self.stats."""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.stats.record_call(name, time.perf_counter() - start)
+
+    return wrapper
@@ -0,0 +1,117 @@
+"""
+Robot move status codes and the error states they stand for.
+
+A move command replies with an integer status: 0 or more is success and
+-200 is not a fault. RTS_CFG and RTS_AsyncCFG used to answer every other
+negative status the same way: put the chip back where it was picked up,
+idle the robot and try again, up to three times. For many faults a retry
+cannot help (the safety guard is open, there is no air pressure) and only
+delays the operator.
+
+The status code table maps each known fault code to:
+
+    state     the RTSStateMachine error state it stands for
+    restore   whether to put the chip back (JumpToTray/DropToTray or
+              JumpToSocket/InsertIntoSocket) after the fault; False for
+              faults where the arm must not move or holds no chip, which
+              are reported at once
+    retries   for restored faults, moves retried before the fault is reported
+
+When a fault's retries are used up, the move raises RobotFault. The state
+machine turns it straight into an error_cycle transition to that state,
+and the recovery policy (RTSRecovery) takes it from there. Codes that are
+not in the table keep the blind retry.
+
+DEFAULT_STATUS_CODES is empty: which codes the robot program returns for
+which fault is a property of the site's robot program, not of this code.
+Until a table is loaded, every fault keeps the blind retry. Write the
+site's codes to a JSON file and pass its path (or the table from
+load_status_codes()) as status_codes to RTS_CFG or RTS_AsyncCFG.
+
+Classes:
+    FaultRule: Error state, retries and restore flag of one code
+    RobotFault: Raised by a move that ended in a known fault
+
+Functions:
+    load_status_codes: Read a status code table from a JSON file
+    status_code_table: Table for a client's status_codes argument
+"""
+
+import json
+from collections import namedtuple
+
+NOT_A_FAULT = -200
+
+FaultRule = namedtuple("FaultRule", ["state", "retries", "restore"], defaults=(0, False))
+
+DEFAULT_STATUS_CODES = {}
+
+
+class RobotFault(RuntimeError):
+    """
+    A move command ended in a fault from the status code table.
+
+    Attributes:
+        code (int): Status code returned by the robot
+        state (str): Error state id the code stands for
+        command (str): Move command that failed
+        restored (bool): Whether the chip was put back where it was picked
+            up before the fault was raised
+    """
+
+    def __init__(self, code, state, command, restored=False):
+        super().__init__(f"{command} returned {code} ({state})")
+        self.code = code
+        self.state = state
+        self.command = command
+        self.restored = restored
+
+
+def is_fault(status):
+    """Whether a move status is a fault (negative and not -200)."""
+    return status < 0 and status != NOT_A_FAULT
+
+
+def load_status_codes(path):
+    """
+    Read a status code table from a JSON file.
+
+    The file holds an object mapping codes to objects with "state" and
+    optional "retries" (default 0) and "restore" (default false).
+
+    Returns:
+        dict: Code -> FaultRule
+
+    Raises:
+        ValueError: If an entry has no state or a code is not an integer
+    """
+    with open(path) as f:
+        entries = json.load(f)
+    table = {}
+    for code, entry in entries.items():
+        if "state" not in entry:
+            raise ValueError(f"Status code {code} needs a 'state'")
+        try:
+            code = int(code)
+        except ValueError:
+            raise ValueError(f"Status code must be an integer, got {code!r}") from None
+        table[code] = FaultRule(entry["state"], entry.get("retries", 0), entry.get("restore", False))
+    return table
+
+
+def status_code_table(status_codes=None):
+    """
+    Return the status code table for a client's status_codes argument.
+
+    Args:
+        status_codes (dict or str, optional): Code -> FaultRule, or the path
+            of a JSON site table; None for DEFAULT_STATUS_CODES
+
+    Returns:
+        dict: A copy of the table, code -> FaultRule
+    """
+    if status_codes is None:
+        return dict(DEFAULT_STATUS_CODES)
+    if isinstance(status_codes, str):
+        return load_status_codes(status_codes)
+    return dict(status_codes)
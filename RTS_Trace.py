@@ -0,0 +1,243 @@
+"""
+Record and replay traces of RTS robot sessions.
+
+A trace is a tab-separated text file with one line per event:
+
+    <seconds since start>  >  <command> [<arg> ...]     command frame sent
+    <seconds since start>  <  <reply>                   reply received
+    <seconds since start>  #  <note>                    connect/reconnect/meta
+
+RTS_CFG writes one when started with trace_path (or start_trace()). A
+recorded production run can then be replayed without the robot:
+
+    serve: ReplayRobot answers each command with the recorded reply after
+           the recorded robot latency (scaled by --speed), behind the
+           RTSMockServer, so new versions of FNAL_RTS_integration or
+           RTSStateMachine can run against the real timing of that tray.
+    drive: the recorded command frames are sent to a server (mock or
+           replay) with the recorded gaps between them.
+
+Usage:
+    python RTS_Trace.py serve tray.trace --speed 10 --port 2001
+    python RTS_Trace.py drive tray.trace --speed 10 --port 2001
+    python RTS_Trace.py summary tray.trace
+"""
+
+import argparse
+import socket
+import threading
+import time
+
+from RTS_MockServer import MockRobot, RTSMockServer
+from RTS_Protocol import BANNER, LineReader, configure_socket, encode_command
+
+SEND = ">"
+RECV = "<"
+NOTE = "#"
+
+
+class TraceWriter:
+    """
+    Append-only writer of timestamped trace events.
+
+    Attributes:
+        path (str): Trace file
+        start (float): time.monotonic() at which the trace started
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.start = time.monotonic()
+        self._file = open(path, "a", buffering=1)
+        self._lock = threading.Lock()
+        self.note("start", f"{time.time():.6f}")
+
+    def _write(self, kind, fields):
+        line = f"{time.monotonic() - self.start:.6f}\t{kind}\t" + "\t".join(str(f) for f in fields) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def command(self, name, *args):
+        """Record a command frame sent to the robot."""
+        self._write(SEND, (name,) + args)
+
+    def reply(self, reply):
+        """Record a reply received from the robot."""
+        self._write(RECV, (reply,))
+
+    def note(self, *fields):
+        """Record a connection event or other annotation."""
+        self._write(NOTE, fields)
+
+    def close(self):
+        """Flush and close the trace file."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def load_trace(path):
+    """
+    Read a trace file.
+
+    Returns:
+        list: (time, kind, fields) tuples in file order
+    """
+    events = []
+    with open(path) as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) < 3:
+                continue
+            events.append((float(parts[0]), parts[1], parts[2:]))
+    return events
+
+
+def command_pairs(events):
+    """
+    Pair each command with the reply that followed it.
+
+    Returns:
+        list: (send time, name, args, reply time, reply) tuples; reply and
+        reply time are None for a command that never got an answer
+    """
+    pairs = []
+    pending = None
+    for t, kind, fields in events:
+        if kind == SEND:
+            if pending is not None:
+                pairs.append(pending + (None, None))
+            pending = (t, fields[0], fields[1:])
+        elif kind == RECV and pending is not None:
+            pairs.append(pending + (t, fields[0]))
+            pending = None
+    if pending is not None:
+        pairs.append(pending + (None, None))
+    return pairs
+
+
+class ReplayRobot:
+    """
+    Robot model that answers with the replies and latencies of a trace.
+
+    Commands are matched to the trace in order. If the client sends a
+    command the trace does not expect next, the next recorded occurrence of
+    that command is used; if there is none, the fallback model answers.
+
+    Attributes:
+        speed (float): Replay speed factor (2.0 = twice as fast as recorded)
+        matched (int): Commands answered from the trace
+        unmatched (int): Commands answered by the fallback model
+        counts (dict): Number of times each command was received
+        total_delay (float): Sum of all latencies served, in seconds
+    """
+
+    def __init__(self, events, speed=1.0, fallback=None):
+        self.pairs = [p for p in command_pairs(events) if p[4] is not None]
+        self.speed = speed
+        self.fallback = fallback if fallback is not None else MockRobot()
+        self.matched = 0
+        self.unmatched = 0
+        self.counts = {}
+        self.total_delay = 0.0
+        self._cursor = 0
+        self._lock = threading.Lock()
+
+    def handle(self, name, args):
+        """Answer one command; see MockRobot.handle."""
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+            for index in range(self._cursor, len(self.pairs)):
+                send_t, recorded, _, reply_t, reply = self.pairs[index]
+                if recorded == name:
+                    self._cursor = index + 1
+                    self.matched += 1
+                    delay = (reply_t - send_t) / self.speed
+                    self.total_delay += delay
+                    return delay, reply
+            self.unmatched += 1
+        return self.fallback.handle(name, args)
+
+
+def drive(events, host, port, speed=1.0, quiet=False):
+    """
+    Send the recorded command frames of a trace to a server, keeping the
+    recorded gap between a reply and the next command (scaled by speed).
+
+    Returns:
+        dict: commands sent, replies that differed from the trace, wall time
+    """
+    pairs = command_pairs(events)
+    sock = socket.create_connection((host, port))
+    configure_socket(sock)
+    reader = LineReader(sock)
+    banner = reader.readline()
+    if banner != BANNER:
+        sock.close()
+        raise ConnectionError(f"Bad response from server: [{banner}]")
+
+    mismatches = 0
+    start = time.perf_counter()
+    previous_reply_t = None
+    try:
+        for send_t, name, args, reply_t, reply in pairs:
+            if previous_reply_t is not None and send_t > previous_reply_t:
+                time.sleep((send_t - previous_reply_t) / speed)
+            sock.sendall(encode_command(name, *args))
+            got = reader.readline()
+            if reply is not None and got != reply:
+                mismatches += 1
+                if not quiet:
+                    print(f"{name}: recorded [{reply}] got [{got}]")
+            previous_reply_t = reply_t
+    finally:
+        sock.close()
+    return {"commands": len(pairs), "mismatches": mismatches,
+            "wall_s": time.perf_counter() - start}
+
+
+def summarize(events):
+    """Return per-command counts and recorded latency totals of a trace."""
+    summary = {}
+    for send_t, name, _, reply_t, _ in command_pairs(events):
+        entry = summary.setdefault(name, {"count": 0, "seconds": 0.0})
+        entry["count"] += 1
+        if reply_t is not None:
+            entry["seconds"] += reply_t - send_t
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded RTS sessions")
+    sub = parser.add_subparsers(dest="action", required=True)
+    for action in ("serve", "drive", "summary"):
+        p = sub.add_parser(action)
+        p.add_argument("trace")
+        if action != "summary":
+            p.add_argument("--speed", type=float, default=1.0)
+            p.add_argument("--host", default="127.0.0.1")
+            p.add_argument("--port", type=int, default=2001)
+    args = parser.parse_args(argv)
+
+    events = load_trace(args.trace)
+    if args.action == "summary":
+        for name, entry in sorted(summarize(events).items()):
+            print(f"{name:<32}{entry['count']:>7}{entry['seconds']:>12.3f} s")
+    elif args.action == "serve":
+        robot = ReplayRobot(events, speed=args.speed)
+        server = RTSMockServer(args.host, args.port, robot)
+        print(f"Replaying {args.trace} at {args.speed}x on {server.address[0]}:{server.address[1]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print(f"\nMatched {robot.matched} commands, {robot.unmatched} not in trace.")
+        finally:
+            server.server_close()
+    else:
+        result = drive(events, args.host, args.port, speed=args.speed)
+        for key, value in result.items():
+            print(f"{key:>12}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import builtins
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RTS_MockServer import MockRobot, RTSMockServer
+from RTS_CFG import RTS_CFG
+from ChipTable import ChipTable
+
+# Short waits so fault and recovery paths run in milliseconds against the mock
+FAST_TIMINGS = {'default': {'deadline': 0.2, 'retry_interval': 0.01}}
+
+# Example site status code table (-101..-108); the built-in table is empty
+STATUS_CODES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "status_codes.json")
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Run every test in its own folder: sessions are written to ./images."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def operator(monkeypatch):
+    """Answer the pause menu; append choices to the returned list ("1" = ground)."""
+    answers = []
+    monkeypatch.setattr(builtins, "input", lambda *args: answers.pop(0) if answers else "1")
+    return answers
+
+
+@pytest.fixture
+def robot():
+    return MockRobot(seed=1)
+
+
+@pytest.fixture
+def server(robot):
+    with RTSMockServer(robot=robot) as server:
+        yield server
+
+
+@pytest.fixture
+def rts(server):
+    host, port = server.address
+    client = RTS_CFG(timings=FAST_TIMINGS, idle_timeout=0.05, status_codes=STATUS_CODES, ready_replies=("199",))
+    client.rts_init(port=port, host_ip=host)
+    yield client
+    client._cancel_park_timer()
+    client.conn.close()
+
+
+def make_chips(n, sockets=(21,)):
+    """n chips in row 1 of tray 2, spread over the given DAT 2 sockets."""
+    return ChipTable.from_records([
+        dict(tray=2, col=i + 1, row=1, dat=2, dat_socket=sockets[i % len(sockets)],
+             label="CD%d" % (i % 2))
+        for i in range(n)
+    ])
+
+
+def hardware_machine(rts, chips, **kwargs):
+    """An RTSStateMachine that drives the mock robot."""
+    from RTSStateMachine import RTSStateMachine
+    sm = RTSStateMachine(interactive=False, **kwargs)
+    if chips is not None:
+        sm.chip_positions = chips
+    sm.BypassRTS = False
+    sm.rts = rts
+    return sm
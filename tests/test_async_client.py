@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from RTS_AsyncCFG import RTS_AsyncCFG
+
+
+def run_client(server, body, **kwargs):
+    async def run():
+        client = RTS_AsyncCFG(retry_delay=0.01, **kwargs)
+        host, port = server.address
+        await client.rts_init(port=port, host_ip=host)
+        try:
+            await body(client, host, port)
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+
+
+def test_commands_share_one_connection(server, robot):
+    async def body(client, host, port):
+        replies = await asyncio.gather(*(client.CoverStatus() for _ in range(5)), client.JumpToCamera())
+        assert replies == ["199"] * 5 + ["JumpToCamera"]
+
+    run_client(server, body)
+    assert robot.counts["CoverStatus"] == 5
+
+
+def test_timeout_closes_the_connection(server, robot):
+    robot.set_latency("JumpToCamera", 0.3)
+
+    async def body(client, host, port):
+        with pytest.raises(asyncio.TimeoutError):
+            await client.JumpToCamera()
+        assert client.writer is None
+        # The late JumpToCamera reply is never read as the reply to this one
+        with pytest.raises(ConnectionError, match="Not connected"):
+            await client.CoverStatus()
+        await client.rts_init(port=port, host_ip=host)
+        assert await client.CoverStatus() == "199"
+
+    run_client(server, body, timeouts={"JumpToCamera": 0.05})
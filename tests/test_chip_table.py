@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from ChipTable import ChipTable, DONE, PASSED, STATUS_NAMES
+
+
+def record(**changes):
+    chip = dict(tray=2, col=1, row=1, dat=2, dat_socket=21, label="CD0")
+    chip.update(changes)
+    return chip
+
+
+def test_full_tray_alternates_sockets():
+    table = ChipTable.full_tray()
+    assert len(table) == 40
+    assert list(table['dat_socket'][:4]) == [21, 22, 21, 22]
+    assert list(table['label'][:2]) == ['CD0', 'CD1']
+    assert table.as_dict(5) == dict(tray=2, col=2, row=2, dat=2, dat_socket=22, label='CD1')
+
+
+@pytest.mark.parametrize("changes, message", [
+    (dict(col=11), "col outside 1-10"),
+    (dict(row=0), "row outside 1-4"),
+    (dict(dat_socket=23), "dat_socket outside 21-22"),
+    (dict(label="CD7"), "label not in"),
+])
+def test_from_records_rejects_invalid_values(changes, message):
+    with pytest.raises(ValueError, match=message):
+        ChipTable.from_records([record(), record(**changes)])
+
+
+def test_from_records_reports_missing_key():
+    chip = record()
+    del chip['dat']
+    with pytest.raises(ValueError, match="have no 'dat'"):
+        ChipTable.from_records([record(), chip])
+
+
+def test_validation_can_be_skipped():
+    table = ChipTable.from_records([record(col=11)], validate=False)
+    assert table['col'][0] == 11
+
+
+def test_labels_are_normalised():
+    table = ChipTable.from_records([record(label=" cd1 ")])
+    assert table['label'][0] == 'CD1'
+
+
+def test_take_copies_status_and_result():
+    table = ChipTable.full_tray(max_col=2, max_row=2)
+    table.set_status(2, DONE, PASSED)
+    taken = table.take([2, 0])
+    assert [taken['col'][i] for i in range(2)] == [2, 1]
+    assert list(taken.status) == [DONE, 0]
+    assert list(taken.result) == [PASSED, 0]
+    taken.set_status(1, DONE)
+    assert table.status[0] == 0
+
+
+def test_slice_returns_table():
+    table = ChipTable.full_tray(max_col=2, max_row=2)
+    part = table[1:3]
+    assert isinstance(part, ChipTable)
+    assert part.to_records() == table.to_records()[1:3]
+
+
+def test_reorder_in_place():
+    table = ChipTable.full_tray(max_col=2, max_row=2)
+    records = table.to_records()
+    table.set_status(3, DONE)
+    table.reorder([3, 2, 1, 0])
+    assert table.to_records() == records[::-1]
+    assert table.status[0] == DONE
+
+
+def test_where_and_find():
+    table = ChipTable.full_tray(max_col=3, max_row=4)
+    table.set_status(4, DONE, PASSED)
+    assert table.where(status=DONE) == [4]
+    assert table.where(result=PASSED) == [4]
+    assert table.find(col=2, row=1) == 4
+    assert table.find(col=2, row=1, tray=1) is None
+    assert table.counts() == {STATUS_NAMES[0]: 11, STATUS_NAMES[DONE]: 1}
+
+
+def test_load_json_and_csv(tmp_path):
+    records = [record(col=c) for c in (1, 2, 3)]
+    json_path = tmp_path / "tray.json"
+    json_path.write_text(json.dumps(records))
+    csv_path = tmp_path / "tray.csv"
+    csv_path.write_text("tray,col,row,dat,dat_socket,label\n"
+                        + "".join(f"2,{c},1,2,21,CD0\n" for c in (1, 2, 3)))
+    assert ChipTable.load(str(json_path)).to_records() == records
+    assert ChipTable.load(str(csv_path)).to_records() == records
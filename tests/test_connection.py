@@ -0,0 +1,59 @@
+import socket
+
+import pytest
+
+from RTS_Connection import RTSCommandInterrupted, RTSConnection, RTSConnectionError
+
+
+@pytest.fixture
+def conn(server):
+    host, port = server.address
+    conn = RTSConnection(host, port, base_delay=0.001, max_attempts=3)
+    conn.connect()
+    yield conn
+    conn.close()
+
+
+def unused_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_backoff_doubles_up_to_the_cap():
+    conn = RTSConnection("127.0.0.1", 1, base_delay=0.5, max_delay=3.0, jitter=0.0)
+    assert [conn.backoff_delay(n) for n in range(5)] == [0.5, 1.0, 2.0, 3.0, 3.0]
+
+
+def test_jitter_only_shortens_the_delay():
+    conn = RTSConnection("127.0.0.1", 1, base_delay=1.0, jitter=0.5)
+    delays = [conn.backoff_delay(0) for _ in range(50)]
+    assert all(0.5 <= delay <= 1.0 for delay in delays)
+
+
+def test_unreachable_robot_gives_up_after_max_attempts(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("RTS_Connection.time.sleep", sleeps.append)
+    conn = RTSConnection("127.0.0.1", unused_port(), max_attempts=3, base_delay=0.25, jitter=0.0)
+    with pytest.raises(RTSConnectionError, match="after 3 attempts"):
+        conn.connect()
+    assert sleeps == [0.25, 0.5]
+
+
+def test_idempotent_command_is_resent_after_a_drop(conn, robot):
+    conn.sock.close()
+    assert conn.request("CoverStatus") == "199"
+    assert len(conn.reconnects) == 1
+    assert conn.reconnects[0]["attempts"] == 1
+    assert conn.endpoint == conn.sock.getpeername()[:2]
+
+
+def test_move_is_not_resent_after_a_drop(conn, robot):
+    conn.sock.close()
+    with pytest.raises(RTSCommandInterrupted) as info:
+        conn.request("DropToTray")
+    assert info.value.command == "DropToTray"
+    # The link is back for the caller, but the command was not sent again
+    assert conn.sock is not None
+    assert "DropToTray" not in robot.counts
+    assert conn.request("Quiet") == "Quiet"
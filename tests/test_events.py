@@ -0,0 +1,68 @@
+import threading
+
+from conftest import make_chips
+from RTSEvents import EventBus, TransitionEvent
+from RTSStateMachine import RTSStateMachine
+
+
+def event(target="testing", chip=0):
+    return TransitionEvent("cycle", "ground", target, chip, 0.0, {})
+
+
+def test_full_queue_drops_without_blocking():
+    bus = EventBus(maxsize=2)
+    started, release = threading.Event(), threading.Event()
+    seen = []
+
+    def slow(e):
+        started.set()
+        release.wait(5)
+        seen.append(e.chip_index)
+    bus.subscribe(slow)
+    try:
+        assert bus.publish(event(chip=0))
+        assert started.wait(5)
+        # The subscriber holds event 0: the queue takes two more, the rest are dropped
+        assert [bus.publish(event(chip=i)) for i in (1, 2, 3, 4)] == [True, True, False, False]
+        release.set()
+        assert bus.flush(5)
+    finally:
+        release.set()
+        bus.stop()
+    assert seen == [0, 1, 2]
+    assert bus.stats() == {"published": 3, "dropped": 2, "delivered": 3, "errors": 0, "queued": 0}
+
+
+def test_failing_subscriber_is_counted_and_isolated():
+    bus = EventBus()
+    seen = []
+
+    def broken(e):
+        raise RuntimeError("dashboard down")
+    bus.subscribe(broken)
+    bus.subscribe(seen.append, kinds=["testing"])
+    bus.publish(event("testing"))
+    bus.publish(event("ground"))
+    assert bus.flush(5)
+    bus.stop()
+    assert [e.target for e in seen] == ["testing"]
+    assert (bus.errors, bus.delivered) == (2, 1)
+
+
+def test_no_subscribers_publishes_nothing():
+    bus = EventBus()
+    assert bus.publish(event())
+    assert bus.stats()["published"] == 0
+
+
+def test_machine_publishes_transitions():
+    sm = RTSStateMachine(interactive=False)
+    sm.chip_positions = make_chips(1)
+    seen = []
+    sm.event_bus.subscribe(seen.append)
+    sm.cycle()
+    assert sm.event_bus.flush(5)
+    sm.event_bus.stop()
+    [e] = seen
+    assert (e.event, e.source, e.target, e.chip_index) == ("cycle", "ground", "surveying_sockets", 0)
+    assert e.payload["chip"]["col"] == 1
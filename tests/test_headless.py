@@ -0,0 +1,62 @@
+import builtins
+import json
+
+import pytest
+
+from RTSStateMachine import RTSStateMachine
+
+CHIPS = [dict(tray=2, col=1, row=1, dat=2, dat_socket=21, label="CD0"),
+         dict(tray=2, col=2, row=1, dat=2, dat_socket=22, label="CD1")]
+
+
+@pytest.fixture(autouse=True)
+def no_prompts(monkeypatch):
+    def refuse(*args):
+        raise AssertionError("the headless constructor prompted")
+    monkeypatch.setattr(builtins, "input", refuse)
+
+
+def test_csv_manifest_any_column_order_and_case(tmp_path):
+    path = tmp_path / "tray.csv"
+    path.write_text("Label,DAT_Socket,Row,Col,Tray,DAT,Operator\n"
+                    "CD0,21,1,1,2,2,alice\n"
+                    "\n"
+                    "CD1,22,1,2,2,2,alice\n")
+    sm = RTSStateMachine.from_manifest(str(path))
+    assert sm.chip_positions.to_records() == CHIPS
+    assert sm.current_state == sm.ground
+
+
+@pytest.mark.parametrize("content", [
+    CHIPS,
+    {"chips": CHIPS},
+    {key: [chip[key] for chip in CHIPS] for key in CHIPS[0]},
+])
+def test_json_manifest_shapes(tmp_path, content):
+    path = tmp_path / "tray.json"
+    path.write_text(json.dumps(content))
+    assert RTSStateMachine.from_manifest(str(path)).chip_positions.to_records() == CHIPS
+
+
+def test_every_bad_line_is_reported(tmp_path):
+    path = tmp_path / "tray.csv"
+    path.write_text("tray,col,row,dat,dat_socket,label\n"
+                    "2,1,1,2,21,CD0\n"
+                    "2,x,1,2,21,CD0\n"
+                    "2,y,1,2,21,CD0\n")
+    with pytest.raises(ValueError, match=r"non-integer col on lines \[3, 4\]"):
+        RTSStateMachine.from_manifest(str(path))
+
+
+def test_missing_columns_and_unknown_type(tmp_path):
+    path = tmp_path / "tray.csv"
+    path.write_text("tray,col,row\n2,1,1\n")
+    with pytest.raises(ValueError, match="has no columns"):
+        RTSStateMachine.from_manifest(str(path))
+    with pytest.raises(ValueError, match="Unsupported manifest type"):
+        RTSStateMachine.from_manifest(str(tmp_path / "tray.xlsx"))
+
+
+def test_no_manifest_uses_a_full_tray():
+    sm = RTSStateMachine(interactive=False)
+    assert len(sm.chip_positions) == 40
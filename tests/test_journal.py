@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+import FNAL_RTS_integration
+from conftest import hardware_machine, make_chips
+from ChipTable import DONE, IN_SOCKET, PASSED, TESTED
+from RTSJournal import Journal, load_journal, replay
+from RTSStateMachine import RTSStateMachine
+
+
+class Crash(BaseException):
+    """Stands in for the process dying: not caught by the state machine."""
+
+
+def write_manifest(path, chips):
+    path.write_text(json.dumps(chips.to_records()))
+    return str(path)
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    path = tmp_path / "run.journal"
+    journal = Journal(str(path), fsync=False)
+    journal.tray_start(make_chips(2), "s1")
+    journal.chip(0, DONE, PASSED)
+    journal.close()
+    with open(path, "a") as f:
+        f.write('{"type": "chip", "chip": 1, "sta')
+    records = load_journal(str(path))
+    assert [r["type"] for r in records] == ["tray_start", "chip"]
+
+
+def test_replay():
+    records = [
+        {"type": "tray_start", "chips": [], "session": "s1"},
+        {"type": "transition", "event": "cycle", "source": "ground", "target": "surveying_sockets", "chip": 0},
+        {"type": "chip", "chip": 0, "status": IN_SOCKET, "result": None},
+        {"type": "chip", "chip": 0, "status": TESTED, "result": PASSED},
+        {"type": "chip", "chip": 0, "status": DONE, "result": None},
+        {"type": "transition", "event": "error_cycle", "source": "moving_chip_to_socket",
+         "target": "bad_contact", "chip": 1},
+    ]
+    point = replay(records, RTSStateMachine.CYCLE_STATES)
+    assert point.session == "s1"
+    assert point.status[0] == (DONE, PASSED)
+    assert (point.chip_index, point.state, point.last_normal_state) == (1, "bad_contact", "surveying_sockets")
+    assert replay(records + [{"type": "tray_end"}]) is None
+
+
+def test_finished_run_does_not_resume(tmp_path):
+    manifest = write_manifest(tmp_path / "tray.json", make_chips(2))
+    journal = str(tmp_path / "run.journal")
+    sm = RTSStateMachine(interactive=False, manifest=manifest, journal=journal)
+    sm.handle_tray()
+    sm.journal.close()
+    sm = RTSStateMachine(interactive=False, manifest=manifest, journal=journal)
+    assert sm.resume_point is None
+    sm.journal.close()
+
+
+@pytest.mark.parametrize("crash_at", [1, 2])
+def test_crash_during_unload_resumes_with_chip_in_socket(tmp_path, rts, robot, monkeypatch, crash_at):
+    manifest = write_manifest(tmp_path / "tray.json", make_chips(4))
+    journal = str(tmp_path / "run.journal")
+    unload = FNAL_RTS_integration.MoveChipsToTray
+    calls = []
+
+    def crashing_unload(rts, chip_positions, plan=False):
+        calls.append(chip_positions['col'][0])
+        if len(calls) == crash_at + 1:
+            raise Crash()
+        return unload(rts, chip_positions, plan)
+
+    monkeypatch.setattr(FNAL_RTS_integration, "MoveChipsToTray", crashing_unload)
+    sm = hardware_machine(rts, None, manifest=manifest, journal=journal)
+    with pytest.raises(Crash):
+        sm.handle_tray()
+    sm.journal.close()
+    # The chip whose unload was cut off is not DONE and not counted
+    assert list(sm.chip_positions.status[:crash_at + 1]) == [DONE] * crash_at + [TESTED]
+    assert sm.metrics.chips_completed == crash_at
+
+    monkeypatch.setattr(FNAL_RTS_integration, "MoveChipsToTray", unload)
+    resumed = hardware_machine(rts, None, manifest=manifest, journal=journal)
+    assert resumed.resume_point is not None
+    assert resumed.current_chip_index == crash_at
+    resumed.handle_tray()
+    resumed.journal.close()
+    assert list(resumed.chip_positions.status) == [DONE] * 4
+    # Every chip was loaded once and unloaded once
+    assert robot.counts["MoveChipFromTrayToSocket"] == 4
+    assert robot.counts["MoveChipFromSocketToTray"] == 4
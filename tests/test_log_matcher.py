@@ -0,0 +1,53 @@
+import pytest
+
+from LogMatcher import LogMatcher, LogPattern
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return LogMatcher()
+
+
+def test_unrelated_line(matcher):
+    assert matcher.match("12:00:01 motor temperature nominal") is None
+
+
+def test_state_name(matcher):
+    assert matcher.match("entering testing").state == "testing"
+
+
+def test_error_beats_message_and_state(matcher):
+    line = "Picked up chip from tray 2 col 3 row 4, bad_contact while testing"
+    assert matcher.match(line).state == "bad_contact"
+
+
+def test_message_beats_state(matcher):
+    assert matcher.match("testing done, picked up chip from tray 1").state == "moving_chip_to_socket"
+
+
+def test_position_captures(matcher):
+    match = matcher.match("10:15:02 Picked up chip from tray 2, col 3, row 4")
+    assert match.state == "moving_chip_to_socket"
+    assert match.captures == {"tray": 2, "col": 3, "row": 4}
+
+
+def test_dat_capture(matcher):
+    match = matcher.match("Jumped to DAT 2")
+    assert match.state == "testing"
+    assert match.captures == {"dat": 2}
+
+
+def test_case_sensitive_table():
+    matcher = LogMatcher([LogPattern("Quiet", "ground")], ignore_case=False)
+    assert matcher.match("Quiet") is not None
+    assert matcher.match("quiet") is None
+
+
+def test_same_priority_first_listed_wins():
+    matcher = LogMatcher([LogPattern("alpha", "ground", 5), LogPattern("beta", "pause", 5)])
+    assert matcher.match("beta then alpha").state == "ground"
+
+
+def test_invalid_pattern_is_named():
+    with pytest.raises(ValueError, match="'pause'"):
+        LogMatcher([LogPattern("(unclosed", "pause")])
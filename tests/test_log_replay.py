@@ -0,0 +1,53 @@
+from LogReplay import TimestampParser, replay_file, replay_files, write_timeline
+
+LOG = """\
+2025-03-01 10:00:00 Picked up chip from tray 2, col 1, row 1
+2025-03-01 10:00:20 Jumped to DAT 2
+2025-03-01 10:00:50 entering moving_chip_to_tray
+2025-03-01 10:01:00 Picked up chip from tray 2, col 2, row 1
+2025-03-01 10:01:30 motor temperature nominal
+traceback without a timestamp
+"""
+
+
+def write_log(tmp_path, text=LOG, name="RobotLog.txt"):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+def test_timeline_rows(tmp_path):
+    timeline = replay_file(write_log(tmp_path))
+    assert timeline["state"] == ["moving_chip_to_socket", "testing", "moving_chip_to_tray",
+                                 "moving_chip_to_socket"]
+    assert timeline["line"] == [1, 2, 3, 4]
+    # The logged positions select their chips in the full 10x4 tray layout
+    assert timeline["chip_index"] == [0, 0, 0, 4]
+    assert timeline["dwell_s"][:3] == [20.0, 30.0, 10.0]
+
+
+def test_last_dwell_ends_at_last_timestamped_line(tmp_path):
+    timeline = replay_file(write_log(tmp_path))
+    assert timeline["dwell_s"][-1] == 30.0
+
+
+def test_untimed_log_has_no_dwell(tmp_path):
+    timeline = replay_file(write_log(tmp_path, "entering testing\nentering ground\n"))
+    assert timeline["state"] == ["testing", "ground"]
+    assert timeline["dwell_s"] == [None, None]
+
+
+def test_custom_time_format(tmp_path):
+    text = "[01/03/2025 10:00:00] entering testing\n[01/03/2025 10:00:05] entering ground\n"
+    parse_time = TimestampParser(r"^\[([^\]]+)\]", "%d/%m/%Y %H:%M:%S")
+    timeline = replay_file(write_log(tmp_path, text), parse_time=parse_time)
+    assert timeline["dwell_s"] == [5.0, 0.0]
+
+
+def test_files_are_concatenated_and_written(tmp_path):
+    paths = [write_log(tmp_path, name="a.txt"), write_log(tmp_path, name="b.txt")]
+    timeline = replay_files(paths)
+    assert timeline["file"] == [paths[0]] * 4 + [paths[1]] * 4
+    df = write_timeline(timeline, str(tmp_path / "timeline.csv"))
+    assert len(df) == 8
+    assert (tmp_path / "timeline.csv").read_text().startswith("file,line,timestamp,state,chip_index,dwell_s")
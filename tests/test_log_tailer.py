@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+
+import pytest
+
+from LogTailer import LogTailer
+
+
+@pytest.fixture
+def log(tmp_path):
+    return tmp_path / "RobotLog.txt"
+
+
+def append(path, text):
+    with open(path, "a") as f:
+        f.write(text)
+
+
+def test_reads_only_new_lines(log):
+    append(log, "one\ntwo\n")
+    with LogTailer(str(log), use_inotify=False) as tailer:
+        assert tailer.read_lines() == ["one", "two"]
+        assert tailer.read_lines() == []
+        append(log, "three\r\n")
+        assert tailer.read_lines() == ["three"]
+        assert tailer.offset == log.stat().st_size
+
+
+def test_partial_line_waits_for_its_newline(log):
+    append(log, "entering test")
+    with LogTailer(str(log), use_inotify=False) as tailer:
+        assert tailer.read_lines() == []
+        append(log, "ing\nnext")
+        assert tailer.read_lines() == ["entering testing"]
+
+
+def test_missing_file_and_from_end(log):
+    with LogTailer(str(log), use_inotify=False) as tailer:
+        assert tailer.read_lines() == []
+        append(log, "created\n")
+        assert tailer.read_lines() == ["created"]
+    with LogTailer(str(log), from_start=False, use_inotify=False) as tailer:
+        append(log, "later\n")
+        assert tailer.read_lines() == ["later"]
+
+
+def test_truncation_starts_over(log):
+    append(log, "old line one\nold line two\n")
+    with LogTailer(str(log), use_inotify=False) as tailer:
+        tailer.read_lines()
+        log.write_text("new\n")
+        assert tailer.read_lines() == ["new"]
+        assert tailer.rotations == 1
+
+
+def test_rotation_starts_over(log, tmp_path):
+    append(log, "before rotation\n")
+    with LogTailer(str(log), use_inotify=False) as tailer:
+        tailer.read_lines()
+        os.rename(log, tmp_path / "RobotLog.1.txt")
+        # Longer than the old file: only the inode shows the rotation
+        append(log, "after rotation, a longer first line\n")
+        assert tailer.read_lines() == ["after rotation, a longer first line"]
+        assert tailer.rotations == 1
+
+
+def test_wait_wakes_on_append(log):
+    append(log, "")
+    with LogTailer(str(log)) as tailer:
+        if not tailer.uses_inotify:
+            pytest.skip("inotify not available")
+        timer = threading.Timer(0.05, append, (log, "woken\n"))
+        timer.start()
+        start = time.monotonic()
+        assert tailer.wait(timeout=2.0)
+        assert time.monotonic() - start < 1.0
+        timer.join()
+        assert tailer.read_lines() == ["woken"]
@@ -0,0 +1,80 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from conftest import make_chips
+from RTSMetrics import RTSMetrics
+from RTSStateMachine import RTSStateMachine
+
+
+def sample(text, line_start):
+    [line] = [line for line in text.splitlines() if line.startswith(line_start + " ")]
+    return float(line.rsplit(" ", 1)[1])
+
+
+def test_dwell_and_transitions():
+    metrics = RTSMetrics()
+    metrics.observe(None, "ground", now=0.0)
+    metrics.observe("ground", "testing", now=1.0)
+    metrics.observe("testing", "ground", now=4.0)
+    metrics.observe("ground", "testing", now=4.5)
+    metrics.observe("testing", "ground", now=6.5)
+    assert metrics.dwell("testing") == 5.0
+    assert metrics.dwell("ground") == 1.5
+    text = metrics.render()
+    assert sample(text, 'rts_state_entries_total{lane="main",state="testing"}') == 2
+    assert sample(text, 'rts_state_dwell_seconds_max{lane="main",state="testing"}') == 3.0
+    assert sample(text, 'rts_transitions_total{lane="main",source="ground",target="testing"}') == 2
+    assert "# TYPE rts_chips_completed_total counter" in text
+
+
+def test_lanes_are_separate():
+    metrics = RTSMetrics()
+    metrics.observe(None, "testing", lane="DAT2-21", now=0.0)
+    metrics.observe(None, "testing", lane="DAT2-22", now=1.0)
+    metrics.observe("testing", "ground", lane="DAT2-21", now=3.0)
+    assert metrics.dwell("testing", lane="DAT2-21") == 3.0
+    assert metrics.dwell("testing", lane="DAT2-22") == 0.0
+    assert metrics.dwell("testing") == 0.0
+
+
+def test_rolling_throughput():
+    metrics = RTSMetrics(windows=(300, 3600))
+    metrics.started = 0.0
+    for t in (100.0, 200.0, 4000.0):
+        metrics.chip_done(now=t)
+    assert metrics.chips_completed == 3
+    assert metrics.chips_per_hour(300, now=4100.0) == pytest.approx(12.0)
+    assert metrics.chips_per_hour(3600, now=4100.0) == pytest.approx(1.0)
+    # Before a full window has passed the rate is over the time since start
+    early = RTSMetrics()
+    early.started = 0.0
+    early.chip_done(now=900.0)
+    assert early.chips_per_hour(3600, now=1800.0) == pytest.approx(2.0)
+
+
+def test_textfile_and_http(tmp_path):
+    metrics = RTSMetrics(initial_state="ground")
+    metrics.chip_done()
+    path = str(tmp_path / "rts.prom")
+    metrics.write_textfile(path)
+    with open(path) as f:
+        assert sample(f.read(), "rts_chips_completed_total") == 1
+    host, port = metrics.serve(port=0)
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+            assert sample(response.read().decode(), "rts_chips_completed_total") == 1
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://{host}:{port}/other", timeout=5)
+    finally:
+        metrics.stop()
+
+
+def test_machine_counts_chips_and_transitions():
+    sm = RTSStateMachine(interactive=False)
+    sm.chip_positions = make_chips(2)
+    sm.handle_tray()
+    assert sm.metrics.chips_completed == 2
+    text = sm.metrics.render()
+    assert sample(text, 'rts_transitions_total{lane="main",source="ground",target="surveying_sockets"}') == 2
@@ -0,0 +1,60 @@
+import time
+
+
+def test_nested_sessions_power_the_motor_once(rts, robot):
+    with rts.motor_session():
+        with rts.motor_session():
+            assert rts.motor_on
+        with rts.motor_session():
+            pass
+    assert robot.counts["MotorOn"] == 1
+    assert "MotorOff" not in robot.counts
+
+
+def test_session_within_idle_timeout_reuses_the_motor(rts, robot):
+    with rts.motor_session(idle_timeout=5.0):
+        pass
+    with rts.motor_session():
+        pass
+    assert robot.counts["MotorOn"] == 1
+    assert "MotorOff" not in robot.counts
+
+
+def test_idle_timer_parks_the_arm(rts, robot):
+    with rts.motor_session():
+        pass
+    deadline = time.monotonic() + 2.0
+    while rts.motor_on and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not rts.motor_on
+    assert robot.counts["JumpToCamera"] == 1
+    assert robot.counts["MotorOff"] == 1
+
+
+def test_zero_timeout_parks_at_once(rts, robot):
+    with rts.motor_session(idle_timeout=0):
+        pass
+    assert not rts.motor_on
+    assert robot.counts["MotorOff"] == 1
+
+
+def test_park_on_timer_does_not_mix_replies(rts, robot):
+    # Commands outside a session keep running while the timer parks the arm
+    with rts.motor_session(idle_timeout=0.01):
+        pass
+    deadline = time.monotonic() + 0.3
+    while time.monotonic() < deadline:
+        assert rts.CoverStatus() == "199"
+        assert rts.msg == "199"
+    assert not rts.motor_on
+    assert robot.counts["MotorOff"] == 1
+
+
+def test_session_after_park_powers_up_again(rts, robot):
+    with rts.motor_session():
+        pass
+    rts.park()
+    assert robot.counts["MotorOff"] == 1
+    with rts.motor_session(idle_timeout=0):
+        assert rts.motor_on
+    assert robot.counts["MotorOn"] == 2
@@ -0,0 +1,131 @@
+import asyncio
+import builtins
+
+import pytest
+
+from conftest import STATUS_CODES, make_chips
+from ChipTable import BAD, DONE
+from RTS_AsyncCFG import RTS_AsyncCFG
+from RTS_MockServer import MockRobot, RTSMockServer
+from RTS_MultiStand import MultiStandController
+from RTS_StatusCodes import RobotFault
+from RTSRecovery import REJECT, RecoveryPolicy, RecoveryRule
+from RTSStateMachine import RTSStateMachine
+
+FAST = dict(retry_delay=0.01, status_codes=STATUS_CODES, ready_replies=("199",),
+            ready_deadlines={'default': 0.05, 'Quiet': 0.05, 'MotorOn': 0.05})
+
+
+class FlakyUnload(RTS_AsyncCFG):
+    """Fails the first unload with a restored bad_contact: the chip stays in the socket."""
+
+    async def MoveChipFromSocketToTray(self, *args):
+        if not getattr(self, "failed", False):
+            self.failed = True
+            await self.command("MoveChipFromSocketToTray", *args)
+            raise RobotFault(-106, "bad_contact", "MoveChipFromSocketToTray", restored=True)
+        return await super().MoveChipFromSocketToTray(*args)
+
+
+@pytest.fixture(autouse=True)
+def no_console(monkeypatch):
+    def refuse(*args):
+        raise AssertionError("a stand waited on input()")
+    monkeypatch.setattr(builtins, "input", refuse)
+
+
+@pytest.fixture
+def stands():
+    """Two mock robots; yields a function that runs one tray on each."""
+    robots = [MockRobot(seed=1), MockRobot(seed=2)]
+    servers = [RTSMockServer(robot=robot) for robot in robots]
+    for server in servers:
+        server.start()
+
+    def run(chips=3, clients=(None, None), policies=(None, None)):
+        controller = MultiStandController()
+        machines = []
+        for n, server in enumerate(servers):
+            sm = RTSStateMachine(interactive=False)
+            sm.chip_positions = make_chips(chips)
+            if policies[n] is not None:
+                sm.recovery = policies[n]
+            host, port = server.address
+            controller.add_stand(f"stand{n + 1}", host, port, sm, clients[n] or RTS_AsyncCFG(**FAST))
+            machines.append(sm)
+        return asyncio.run(controller.run()), machines
+
+    yield robots, run
+    for server in servers:
+        server.stop()
+
+
+def test_stands_run_their_trays(stands):
+    robots, run = stands
+    results, machines = run()
+    for name, sm in zip(("stand1", "stand2"), machines):
+        assert results[name]["error"] is None
+        assert list(sm.chip_positions.status) == [DONE] * 3
+    assert [robot.counts["MoveChipFromSocketToTray"] for robot in robots] == [3, 3]
+
+
+def test_pause_fails_only_its_stand(stands):
+    robots, run = stands
+    robots[0].inject_error("MoveChipFromTrayToSocket", -104, 1.0)
+    results, machines = run()
+    assert "OperatorRequired" in results["stand1"]["error"]
+    assert results["stand2"]["error"] is None
+    assert list(machines[1].chip_positions.status) == [DONE] * 3
+
+
+def test_restored_load_fault_is_rejected_without_moving(stands):
+    robots, run = stands
+    robots[0].inject_error("MoveChipFromTrayToSocket", -106, 1.0)
+    results, machines = run(chips=2)
+    assert results["stand1"]["error"] is None
+    assert results["stand1"]["rejected"] == 2
+    assert list(machines[0].chip_positions.status) == [BAD] * 2
+    assert "MoveChipFromSocketToTray" not in robots[0].counts
+
+
+def test_rejected_chip_is_moved_out_of_the_socket(stands):
+    robots, run = stands
+    reject = RecoveryPolicy({"bad_contact": RecoveryRule(REJECT)})
+    results, machines = run(chips=2, clients=(FlakyUnload(**FAST), None), policies=(reject, None))
+    assert results["stand1"]["error"] is None
+    assert list(machines[0].chip_positions.status) == [BAD, DONE]
+    # The failed unload, the reject move and the second chip's unload
+    assert robots[0].counts["MoveChipFromSocketToTray"] == 3
+    assert robots[0].counts["MoveChipFromTrayToSocket"] == 2
+
+
+def test_stand_stops_when_rejected_chip_stays_in_socket(stands):
+    robots, run = stands
+    robots[0].inject_error("MoveChipFromSocketToTray", -106, 1.0)
+    reject = RecoveryPolicy({"bad_contact": RecoveryRule(REJECT)})
+    results, machines = run(chips=2, policies=(reject, None))
+    assert "still in its socket" in results["stand1"]["error"]
+    # The next chip is never loaded on top of the rejected one
+    assert robots[0].counts["MoveChipFromTrayToSocket"] == 1
+    assert results["stand2"]["error"] is None
+
+
+def test_unreachable_stand_fails_alone():
+    controller = MultiStandController()
+    sm = RTSStateMachine(interactive=False)
+    sm.chip_positions = make_chips(1)
+    # Port 9 (discard) has no RTS server listening
+    controller.add_stand("offline", "127.0.0.1", 9, sm, RTS_AsyncCFG(**FAST))
+    results = asyncio.run(controller.run())
+    assert results["offline"]["error"] is not None
+    assert results["offline"]["chips"] == 0
+
+
+def test_timed_out_move_fails_its_stand(stands):
+    robots, run = stands
+    robots[0].set_latency("MoveChipFromTrayToSocket", 0.5)
+    slow = RTS_AsyncCFG(timeouts={"MoveChipFromTrayToSocket": 0.05}, **FAST)
+    results, machines = run(clients=(slow, None))
+    assert "TimeoutError" in results["stand1"]["error"]
+    assert results["stand2"]["error"] is None
+    assert list(machines[1].chip_positions.status) == [DONE] * 3
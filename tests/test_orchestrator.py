@@ -0,0 +1,89 @@
+import json
+import os
+import time
+
+import pytest
+
+import RTSOrchestrator
+from conftest import make_chips
+from RTSOrchestrator import TrayOrchestrator
+
+
+@pytest.fixture
+def manifests(tmp_path):
+    def write(*names, chips=2):
+        paths = []
+        for name in names:
+            path = tmp_path / f"{name}.json"
+            path.write_text(json.dumps(make_chips(chips).to_records()))
+            paths.append(str(path))
+        return paths
+    return write
+
+
+@pytest.fixture
+def faulty_worker(monkeypatch):
+    """Workers crash on a manifest named crash*.json and hang on hang*.json."""
+    run_tray = RTSOrchestrator._run_tray
+
+    def run(machine_class, name, manifest, messages, rts, options):
+        stem = os.path.basename(manifest)
+        if stem.startswith(("crash", "hang")):
+            messages.put(('tray_start', name, manifest, 2, False))
+            if stem.startswith("crash"):
+                # Let the queue's feeder thread send tray_start before dying
+                messages.close()
+                messages.join_thread()
+                os._exit(3)
+            time.sleep(60)
+        run_tray(machine_class, name, manifest, messages, rts, options)
+    # Forked workers inherit the patched module
+    monkeypatch.setattr(RTSOrchestrator, "_run_tray", run)
+
+
+def orchestrator(tmp_path, stands=2):
+    sim = TrayOrchestrator([{'name': f"sim{i + 1}"} for i in range(stands)],
+                           journal_dir=str(tmp_path / "journals"), log_dir=None,
+                           hang_timeout=1.0, progress=None, start_method="fork")
+    sim.poll_interval = 0.05
+    return sim
+
+
+def test_simulated_stands_share_the_trays(tmp_path, manifests):
+    paths = manifests("a", "b", "c")
+    results = orchestrator(tmp_path).run(paths)
+    assert {tray['status'] for tray in results['trays'].values()} == {'done'}
+    assert results['chips'] == 6
+    assert sum(stand['trays'] for stand in results['stands'].values()) == 3
+    assert all(stand['exitcode'] == 0 for stand in results['stands'].values())
+    chips = results['trays'][paths[0]]['chips']
+    assert [chip['status'] for chip in chips] == ['done', 'done']
+
+
+def test_invalid_manifest_fails_only_its_tray(tmp_path, manifests):
+    bad = tmp_path / "bad.csv"
+    bad.write_text("tray,col\n2,1\n")
+    results = orchestrator(tmp_path, stands=1).run([str(bad)] + manifests("a"))
+    assert results['trays'][str(bad)]['status'] == 'failed'
+    assert "has no columns" in results['trays'][str(bad)]['error']
+    assert results['chips'] == 2
+
+
+@pytest.mark.parametrize("fault, exitcode", [("crash", 3), ("hang", -15)])
+def test_lost_stand_fails_only_its_tray(tmp_path, manifests, faulty_worker, fault, exitcode):
+    paths = manifests(fault, "a", "b")
+    results = orchestrator(tmp_path).run(paths)
+    trays = results['trays']
+    assert trays[paths[0]]['status'] == ('crashed' if fault == "crash" else 'hung')
+    assert [trays[path]['status'] for path in paths[1:]] == ['done', 'done']
+    assert results['chips'] == 4
+    lost = trays[paths[0]]['stand']
+    assert results['stands'][lost]['error'].startswith(trays[paths[0]]['status'])
+    assert results['stands'][lost]['exitcode'] == exitcode
+    [other] = set(results['stands']) - {lost}
+    assert results['stands'][other]['trays'] == 2
+
+
+def test_stand_names_must_be_unique():
+    with pytest.raises(ValueError, match="unique"):
+        TrayOrchestrator([{'name': "sim"}, {'name': "sim"}])
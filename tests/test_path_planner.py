@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from ChipTable import ChipTable
+from RTS_PathPlanner import TrayGeometry, _cost_matrix, _nearest_neighbour, _two_opt, plan_order, tour_length
+from RTSStateMachine import RTSStateMachine
+
+
+def random_chips(n, seed):
+    rng = random.Random(seed)
+    pockets = rng.sample([(tray, col, row) for tray in (1, 2) for col in range(1, 11) for row in range(1, 5)], n)
+    return [dict(tray=tray, col=col, row=row, dat=rng.choice((1, 2)), dat_socket=rng.choice((21, 22)))
+            for tray, col, row in pockets]
+
+
+@pytest.mark.parametrize("mode", ["socket", "cycle"])
+@pytest.mark.parametrize("seed", range(10))
+def test_two_opt_never_increases_tour_length(mode, seed):
+    chips = random_chips(25, seed)
+    cost, start = _cost_matrix(chips, TrayGeometry(), mode)
+    rng = random.Random(seed)
+    for order in (_nearest_neighbour(cost, start), rng.sample(range(25), 25)):
+        improved = _two_opt(order, cost, start)
+        assert sorted(improved) == list(range(25))
+        assert tour_length(chips, improved, mode=mode) <= tour_length(chips, order, mode=mode) + 1e-9
+
+
+@pytest.mark.parametrize("mode", ["socket", "cycle"])
+def test_plan_is_shorter_than_a_shuffled_tray(mode):
+    chips = random_chips(40, 1)
+    order = plan_order(chips, mode=mode)
+    assert sorted(order) == list(range(40))
+    assert tour_length(chips, order, mode=mode) < tour_length(chips, mode=mode)
+
+
+def test_small_trays_and_bad_mode():
+    assert plan_order([]) == []
+    assert plan_order(random_chips(1, 0)) == [0]
+    with pytest.raises(ValueError, match="Unknown planning mode"):
+        plan_order(random_chips(3, 0), mode="zigzag")
+
+
+def test_tour_length_from_the_camera():
+    geometry = TrayGeometry(tray_origins={1: (3.0, 4.0)}, camera=(0.0, 0.0))
+    chips = [dict(tray=1, col=1, row=1), dict(tray=1, col=2, row=1)]
+    assert tour_length(chips, geometry=geometry, mode="cycle") == pytest.approx(5.0 + 25.0)
+
+
+def test_machine_reorders_its_chip_table():
+    records = [dict(r, label="CD%d" % (i % 2)) for i, r in enumerate(random_chips(12, 3))]
+    sm = RTSStateMachine(interactive=False)
+    sm.chip_positions = ChipTable.from_records(records)
+    order = sm.plan_chip_order()
+    assert sm.chip_positions.to_records() == [records[i] for i in order]
+    assert tour_length(records, order, mode="cycle") <= tour_length(records, mode="cycle")
@@ -0,0 +1,97 @@
+from conftest import hardware_machine, make_chips
+from ChipTable import BAD, DONE, FAILED, IN_SOCKET, PASSED, TESTED
+from RTSPipeline import PipelineScheduler
+from RTSStateMachine import RTSStateMachine
+
+
+def simulated_machine(n):
+    sm = RTSStateMachine(interactive=False)
+    sm.chip_positions = make_chips(n, sockets=(21, 22))
+    return sm
+
+
+def test_one_lane_per_socket():
+    sm = simulated_machine(5)
+    lanes = PipelineScheduler(sm).lanes
+    assert [(lane.name, lane.chips) for lane in lanes] == [("DAT2-21", [0, 2, 4]), ("DAT2-22", [1, 3])]
+
+
+def test_resume_skips_done_and_rejected_chips():
+    sm = simulated_machine(4)
+    sm.chip_positions.set_status(0, DONE)
+    sm.chip_positions.set_status(3, BAD)
+    lanes = PipelineScheduler(sm, skip_done=True).lanes
+    assert {lane.name: lane.chips for lane in lanes} == {"DAT2-21": [2], "DAT2-22": [1]}
+
+
+def test_resume_unloads_tested_chip_first(rts, robot):
+    sm = hardware_machine(rts, make_chips(3))
+    sm.chip_positions.set_status(0, TESTED, FAILED)
+    summary = sm.handle_tray_pipelined(resume=True)
+    assert not summary["halted"]
+    assert list(sm.chip_positions.status) == [DONE] * 3
+    assert sm.chip_positions.where(result=FAILED) == [0]
+    # The tested chip was still in its socket: it is unloaded, not loaded again
+    assert robot.counts["MoveChipFromTrayToSocket"] == 2
+    assert robot.counts["MoveChipFromSocketToTray"] == 3
+
+
+def test_resume_stops_on_chip_left_loading(rts, robot, operator):
+    sm = hardware_machine(rts, make_chips(3))
+    sm.chip_positions.set_status(0, IN_SOCKET)
+    summary = sm.handle_tray_pipelined(resume=True)
+    assert summary["halted"]
+    assert summary["lanes"]["DAT2-21"]["stopped"][:2] == (0, "resume")
+    assert "MoveChipFromTrayToSocket" not in robot.counts
+    assert list(sm.chip_positions.status) == [IN_SOCKET, 0, 0]
+
+
+def test_simulated_tray():
+    sm = simulated_machine(6)
+    summary = sm.handle_tray_pipelined(test=lambda sm, index: index != 3)
+    assert not summary["halted"]
+    assert {name: lane["done"] for name, lane in summary["lanes"].items()} == {"DAT2-21": 3, "DAT2-22": 3}
+    assert list(sm.chip_positions.status) == [DONE] * 6
+    assert sm.chip_positions.where(result=FAILED) == [3]
+    assert len(sm.chip_positions.where(result=PASSED)) == 5
+    assert set(sm.lane_states.values()) == {sm.ground}
+
+
+def test_test_error_fails_only_its_chip():
+    def test(sm, index):
+        if index == 0:
+            raise RuntimeError("WIB timeout")
+        return True
+
+    sm = simulated_machine(4)
+    summary = sm.handle_tray_pipelined(test=test)
+    assert not summary["halted"]
+    assert sm.chip_positions.where(result=FAILED) == [0]
+    assert summary["lanes"]["DAT2-21"]["errors"][0][:2] == (0, "test")
+    assert list(sm.chip_positions.status) == [DONE] * 4
+
+
+def test_robot_fault_stops_lanes(rts, robot, operator):
+    robot.inject_error("MoveChipFromSocketToTray", -104, 1.0)
+    sm = hardware_machine(rts, make_chips(6, sockets=(21, 22)))
+    summary = sm.handle_tray_pipelined()
+    assert summary["halted"]
+    for lane in summary["lanes"].values():
+        index, step, error = lane["stopped"]
+        assert step == "unload" and "safe_guard" in error
+    assert set(sm.lane_states.values()) == {sm.safe_guard}
+    # The chips stay recorded as tested, not done, and no further chip is loaded
+    assert list(sm.chip_positions.status[:2]) == [TESTED, TESTED]
+    assert sm.chip_positions.where(status=DONE) == []
+    assert robot.counts["MoveChipFromTrayToSocket"] == 2
+
+
+def test_failed_load_does_not_load_next_chip(rts, robot, operator):
+    robot.inject_error("MoveChipFromTrayToSocket", -103, 1.0)
+    sm = hardware_machine(rts, make_chips(4))
+    summary = sm.handle_tray_pipelined()
+    assert summary["halted"]
+    assert summary["lanes"]["DAT2-21"]["stopped"][:2] == (0, "load")
+    assert sm.lane_states["DAT2-21"] == sm.no_chip
+    assert list(sm.chip_positions.status) == [IN_SOCKET, 0, 0, 0]
+    assert robot.counts["MoveChipFromTrayToSocket"] == 1
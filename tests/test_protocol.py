@@ -0,0 +1,68 @@
+import socket
+
+import pytest
+
+from RTS_Protocol import LineReader, encode_command, parse_status
+
+
+class ChunkedSocket:
+    """Returns the given chunks from recv(), one per call, then EOF."""
+
+    def __init__(self, *chunks):
+        self.chunks = list(chunks)
+
+    def recv(self, bufsize):
+        return self.chunks.pop(0)[:bufsize] if self.chunks else b""
+
+
+def test_command_is_one_frame():
+    assert encode_command("MoveChipFromTrayToSocket", 2, 21, 2, 1, 1) == \
+        b"MoveChipFromTrayToSocket\r\n2\r\n21\r\n2\r\n1\r\n1\r\n"
+    assert encode_command("Quiet") == b"Quiet\r\n"
+
+
+def test_parse_status():
+    assert parse_status("-106") == -106
+    assert parse_status("0") == 0
+    assert parse_status("JumpToCamera") is None
+    assert parse_status(None) is None
+
+
+def test_split_reply_is_reassembled():
+    reader = LineReader(ChunkedSocket(b"Jump", b"ToCam", b"era\r", b"\n"))
+    assert reader.readline() == "JumpToCamera"
+    assert not reader.pending()
+
+
+def test_merged_replies_come_one_at_a_time():
+    reader = LineReader(ChunkedSocket(b"Quiet\r\n199\r\n-1", b"06\n"))
+    assert reader.readline() == "Quiet"
+    assert reader.pending()
+    assert reader.readline() == "199"
+    assert reader.readline() == "-106"
+
+
+def test_blank_lines_are_skipped():
+    reader = LineReader(ChunkedSocket(b"\r\n\r\n", b"On\r\n"))
+    assert reader.readline() == "On"
+
+
+def test_closed_connection():
+    reader = LineReader(ChunkedSocket(b"partial"))
+    with pytest.raises(ConnectionAbortedError):
+        reader.readline()
+
+
+def test_clear_drops_buffered_replies():
+    reader = LineReader(ChunkedSocket(b"stale\r\nstale\r\n", b"fresh\r\n"))
+    assert reader.readline() == "stale"
+    reader.clear()
+    assert reader.readline() == "fresh"
+
+
+def test_reads_from_a_real_socket():
+    a, b = socket.socketpair()
+    with a, b:
+        reader = LineReader(b, bufsize=3)
+        a.sendall(b"MotorOn\r\nOff\r\n")
+        assert [reader.readline(), reader.readline()] == ["MotorOn", "Off"]
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from RTSRecovery import RecoveryPolicy, RecoveryRule, load_policy, RETRY, RESTART, REJECT, PAUSE
+
+
+def test_rule_retries_then_escalates():
+    policy = RecoveryPolicy()
+    assert [policy.decide("bad_contact", 0) for _ in range(3)] == [RETRY, RETRY, REJECT]
+    assert policy.escalations == 1
+    assert policy.counts["bad_contact"] == {"seen": 3, RETRY: 2, REJECT: 1}
+
+
+def test_retries_are_per_chip():
+    policy = RecoveryPolicy()
+    policy.decide("failed_init", 0)
+    assert policy.decide("failed_init", 0) == REJECT
+    assert policy.decide("failed_init", 1) == RETRY
+
+
+def test_stand_errors_pause_at_once():
+    policy = RecoveryPolicy()
+    assert policy.decide("safe_guard", 0) == PAUSE
+    assert policy.decide("unknown_error", 0) == PAUSE
+    assert policy.escalations == 0
+
+
+def test_chip_budget_over_all_errors():
+    policy = RecoveryPolicy(chip_budget=2)
+    assert policy.decide("bad_contact", 0) == RETRY
+    assert policy.decide("no_wib_connection", 0) == RETRY
+    assert policy.decide("no_wib_connection", 0) == REJECT
+
+
+def test_tray_budget_pauses_until_next_tray():
+    policy = RecoveryPolicy(tray_budget=2)
+    assert policy.decide("bad_contact", 0) == RETRY
+    assert policy.decide("bad_contact", 1) == RETRY
+    assert policy.decide("bad_contact", 2) == PAUSE
+    assert policy.stats()["tray_retries"] == 2
+    policy.start_tray()
+    assert policy.decide("bad_contact", 2) == RETRY
+
+
+def test_restart_rule():
+    policy = RecoveryPolicy()
+    assert [policy.decide("no_server_connection", 0) for _ in range(4)] == [RESTART] * 3 + [PAUSE]
+
+
+def test_invalid_rule():
+    with pytest.raises(ValueError):
+        RecoveryPolicy({"bad_contact": RecoveryRule("ignore")})
+    with pytest.raises(ValueError):
+        RecoveryPolicy({"bad_contact": RecoveryRule(RETRY, 1, RETRY)})
+
+
+def test_load_policy(tmp_path):
+    path = tmp_path / "policy.json"
+    path.write_text(json.dumps({"chip_budget": 1, "bad_contact": {"action": "reject"}}))
+    policy = load_policy(str(path))
+    assert policy.chip_budget == 1
+    assert policy.decide("bad_contact", 0) == REJECT
+    path.write_text(json.dumps({"bad_contact": {"retries": 1}}))
+    with pytest.raises(ValueError, match="needs an 'action'"):
+        load_policy(str(path))
@@ -0,0 +1,50 @@
+import time
+
+import pytest
+
+from RTS_Connection import RTSCommandInterrupted
+
+MOVES = {
+    "MoveChipFromTrayToSocket": (2, 21, 2, 1, 1),
+    "MoveChipFromSocketToTray": (2, 21, 2, 1, 1),
+    "MoveChipFromTrayToTray": (2, 1, 1, 2, 2, 1),
+}
+
+
+@pytest.mark.parametrize("name", sorted(MOVES))
+def test_unreadable_move_reply_is_not_resent(rts, robot, name):
+    request = rts.conn.request
+
+    def garbled(command, *args):
+        reply = request(command, *args)
+        return "garbled" if command == name else reply
+    rts.conn.request = garbled
+
+    with pytest.raises(RTSCommandInterrupted, match=name):
+        getattr(rts, name)(*MOVES[name])
+    assert robot.counts[name] == 1
+
+
+def test_ready_reply_ends_the_wait(rts, robot):
+    start = time.monotonic()
+    assert rts.wait_until_ready("Quiet")
+    assert time.monotonic() - start < 0.1
+    assert robot.counts["CoverStatus"] == 1
+
+
+def test_wait_gives_up_at_the_deadline(rts, robot):
+    robot.cover_status = "100"
+    rts.timings["Quiet"].update(deadline=0.2, poll_interval=0.05)
+    start = time.monotonic()
+    assert not rts.wait_until_ready("Quiet")
+    assert 0.2 <= time.monotonic() - start < 0.5
+    assert robot.counts["CoverStatus"] >= 3
+
+
+def test_without_ready_replies_the_fixed_sleep_is_kept(rts, robot):
+    rts.ready_replies = None
+    rts.timings["Quiet"].update(deadline=0.1)
+    start = time.monotonic()
+    assert rts.wait_until_ready("Quiet")
+    assert time.monotonic() - start >= 0.1
+    assert "CoverStatus" not in robot.counts
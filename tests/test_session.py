@@ -0,0 +1,73 @@
+import json
+import os
+
+import pytest
+
+from conftest import make_chips
+from ChipTable import BAD, DONE, PASSED
+from RTSSession import MANIFEST, SessionStore
+from RTSStateMachine import RTSStateMachine
+
+
+def read_manifest(session):
+    with open(os.path.join(session.path, MANIFEST)) as f:
+        return json.load(f)
+
+
+def test_open_session_records_positions(tmp_path):
+    store = SessionStore(str(tmp_path / "images"))
+    chips = make_chips(2)
+    session = store.open_session(chips, stand="RTS-1")
+    manifest = read_manifest(session)
+    assert manifest["id"] == session.id and manifest["stand"] == "RTS-1"
+    assert manifest["chips"]["1"]["position"] == chips.to_records()[1]
+    # Chip folders are only created when a chip has files
+    assert os.listdir(session.path) == [MANIFEST]
+    assert not session.closed
+
+
+def test_add_file(tmp_path):
+    store = SessionStore(str(tmp_path / "images"))
+    session = store.open_session(make_chips(1))
+    inside = os.path.join(session.chip_dir(0), "top.png")
+    outside = str(tmp_path / "wib.log")
+    session.add_file(0, "images", inside)
+    session.add_file(0, "logs", outside)
+    chip = read_manifest(session)["chips"]["0"]
+    assert chip["images"] == [os.path.join("chip_00", "top.png")]
+    assert chip["logs"] == [outside]
+    assert session.files(0, "images") == [inside]
+    assert session.files(1) == {"images": [], "ocr": [], "logs": []}
+    with pytest.raises(ValueError, match="Unknown file kind"):
+        session.add_file(0, "video", inside)
+
+
+def test_close_records_results_and_indexes_once(tmp_path):
+    store = SessionStore(str(tmp_path / "images"))
+    chips = make_chips(2)
+    session = store.open_session(chips)
+    chips.set_status(0, DONE, PASSED)
+    chips.set_status(1, BAD)
+    session.close(chips)
+    session.close(chips)
+    chip = read_manifest(session)["chips"]
+    assert (chip["0"]["status"], chip["0"]["result"]) == ("done", "passed")
+    assert (chip["1"]["status"], chip["1"]["result"]) == ("bad", "none")
+    [entry] = store.sessions()
+    assert (entry["id"], entry["chips"]) == (session.id, 2)
+    loaded = store.load(session.id)
+    assert loaded.closed and loaded.manifest == session.manifest
+    with pytest.raises(KeyError):
+        store.load("19700101_000000_000000")
+
+
+def test_one_session_per_tray():
+    sm = RTSStateMachine(interactive=False)
+    sm.chip_positions = make_chips(2)
+    sm.handle_tray_pipelined(test=lambda sm, index: index == 0)
+    sm.handle_tray_pipelined(test=lambda sm, index: True)
+    assert sm.session is None
+    first, second = sm.session_store.sessions()
+    assert first["id"] != second["id"]
+    chip = sm.session_store.load(first["id"]).manifest["chips"]
+    assert [chip[i]["result"] for i in ("0", "1")] == ["passed", "failed"]
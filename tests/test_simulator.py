@@ -0,0 +1,66 @@
+import pytest
+
+from RTSSimulator import TraySimulator, main, state_graph
+
+# Fixed durations: a chip takes 16 s (robot 5 s, socket 10+1+2 s), a tray swap 5 s
+FIXED = {'surveying_sockets': 1.0, 'moving_chip_to_socket': 2.0, 'testing': 10.0,
+         'writing_to_hwdb': 1.0, 'moving_chip_to_tray': 2.0, 'tray_swap': 5.0}
+
+
+def without_wall_time(result):
+    return {k: v for k, v in result.items() if k != 'wall_s'}
+
+
+def test_graph_follows_the_state_machine():
+    next_state, errors = state_graph()
+    assert next_state['moving_chip_to_tray'] == 'ground'
+    assert next_state['bad_contact'] == 'moving_chip_to_socket'
+    assert 'lost_vacuum' in errors['moving_chip_to_socket']
+
+
+def test_same_seed_same_result():
+    def run(seed):
+        sim = TraySimulator(chips_per_tray=10, error_rates={'bad_contact': 0.05}, seed=seed)
+        return without_wall_time(sim.run(5))
+    assert run(3) == run(3)
+    assert run(3) != run(4)
+
+
+def test_serial_time():
+    result = TraySimulator(chips_per_tray=2, mode='serial', durations=FIXED).run(2)
+    # Two trays of two 16 s chips and one swap
+    assert result['sim_hours'] * 3600 == pytest.approx(69.0)
+    assert result['chips'] == 4
+    assert result['per_stand']['S1']['robot']['waited'] == 0
+
+
+def test_pipelined_lanes_overlap_and_share_the_robot():
+    result = TraySimulator(chips_per_tray=2, durations=FIXED).run(1)
+    # The second lane waits 3 s for the robot, then tests while the first finishes
+    assert result['sim_hours'] * 3600 == pytest.approx(19.0)
+    robot = result['per_stand']['S1']['robot']
+    assert (robot['requests'], robot['waited'], robot['max_wait_s']) == (4, 1, 3.0)
+    serial = TraySimulator(chips_per_tray=2, mode='serial', durations=FIXED).run(1)
+    assert result['chips_per_hour'] > serial['chips_per_hour']
+
+
+def test_chip_is_abandoned_after_too_many_errors():
+    sim = TraySimulator(chips_per_tray=2, durations=FIXED, error_rates={'lost_vacuum': 1.0},
+                        max_errors_per_chip=2, seed=1)
+    result = sim.run(1)
+    assert (result['chips'], result['chips_abandoned']) == (2, 2)
+    assert result['errors'] == {'lost_vacuum': 6}
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError, match="Unknown mode"):
+        TraySimulator(mode='parallel')
+    with pytest.raises(ValueError, match="Unknown error state"):
+        TraySimulator(error_rates={'testing': 0.1})
+
+
+def test_command_line(capsys):
+    main(["--trays", "2", "--chips", "4", "--stands", "1", "2"])
+    rows = capsys.readouterr().out.splitlines()
+    assert rows[0].split()[:2] == ["stands", "DATs"]
+    assert [row.split()[0] for row in rows[1:]] == ["1", "2"]
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from RTS_Stats import CommandStats, LatencyHistogram
+
+
+def test_empty_histogram():
+    h = LatencyHistogram()
+    assert h.percentile(50) is None
+    assert h.summary()["min"] is None
+
+
+@pytest.mark.parametrize("q", [50, 95, 99])
+def test_percentiles_within_bucket_growth(q):
+    h = LatencyHistogram(growth=1.1)
+    samples = [0.001 * n for n in range(1, 1001)]
+    for value in samples:
+        h.record(value)
+    exact = samples[int(q / 100 * len(samples)) - 1]
+    assert exact <= h.percentile(q) <= exact * 1.1 ** 2
+    assert h.count == 1000
+    assert h.mean == pytest.approx(sum(samples) / 1000)
+
+
+def test_out_of_range_samples_are_clamped():
+    h = LatencyHistogram(min_value=1e-3, max_value=1.0)
+    h.record(1e-6)
+    h.record(50.0)
+    assert h.counts[0] == 1 and h.counts[-1] == 1
+    # The upper edge of the first bucket; the last bucket is clamped to the maximum
+    assert h.percentile(1) == pytest.approx(1.1e-3)
+    assert h.percentile(100) == 50.0
+
+
+def test_command_stats(tmp_path):
+    stats = CommandStats()
+    stats.record_frame("MoveChipFromTrayToSocket", 0.5, -106)
+    stats.record_frame("MoveChipFromTrayToSocket", 0.4, 0)
+    stats.record_frame("CoverStatus", 0.001)
+    stats.record_retry("MoveChipFromTrayToSocket")
+    stats.record_call("MoveChipFromTrayToSocket", 2.0)
+    path = str(tmp_path / "stats.json")
+    stats.dump(path, extra={"reconnects": []})
+    data = json.load(open(path))
+    assert data["frames"]["MoveChipFromTrayToSocket"]["count"] == 2
+    assert data["statuses"] == {"MoveChipFromTrayToSocket": {"-106": 1, "0": 1}}
+    assert data["retries"] == {"MoveChipFromTrayToSocket": 1}
+    assert data["reconnects"] == []
+    assert "MoveChipFromTrayToSocket" in stats.report()
+
+
+def test_rts_cfg_records_frames_and_calls(rts, robot):
+    rts.MotorOn()
+    rts.MoveChipFromTrayToSocket(2, 21, 2, 1, 1)
+    assert rts.stats.frames["MotorOn"].count == 1
+    assert rts.stats.calls["MoveChipFromTrayToSocket"].count == 1
+    assert rts.stats.statuses["MoveChipFromTrayToSocket"] == {0: 1}
@@ -0,0 +1,181 @@
+import asyncio
+import json
+
+import pytest
+
+from conftest import FAST_TIMINGS, STATUS_CODES, hardware_machine, make_chips
+from ChipTable import BAD, DONE, PENDING, TESTED
+from RTS_AsyncCFG import RTS_AsyncCFG
+from RTS_Connection import RTSCommandInterrupted
+from RTS_CFG import RTS_CFG
+from RTS_StatusCodes import DEFAULT_STATUS_CODES, RobotFault, is_fault, load_status_codes
+from RTSRecovery import PAUSE
+
+MOVE = ("MoveChipFromTrayToSocket", 2, 21, 2, 1, 1)
+
+
+def test_is_fault():
+    assert is_fault(-1)
+    assert not is_fault(0)
+    assert not is_fault(-200)
+
+
+def test_fault_without_restore_is_raised_at_once(rts, robot):
+    robot.inject_error(MOVE[0], -104, 1.0)
+    with pytest.raises(RobotFault) as info:
+        rts.MoveChipFromTrayToSocket(*MOVE[1:])
+    assert (info.value.code, info.value.state, info.value.command) == (-104, "safe_guard", MOVE[0])
+    assert robot.counts[MOVE[0]] == 1
+    assert "DropToTray" not in robot.counts
+
+
+def test_restored_fault_is_retried_then_raised(rts, robot):
+    robot.inject_error(MOVE[0], -106, 1.0)
+    with pytest.raises(RobotFault) as info:
+        rts.MoveChipFromTrayToSocket(*MOVE[1:])
+    assert info.value.state == "bad_contact"
+    retries = load_status_codes(STATUS_CODES)[-106].retries
+    assert robot.counts[MOVE[0]] == retries + 1
+    assert robot.counts["DropToTray"] == retries + 1
+
+
+def test_unknown_code_keeps_blind_retry(rts, robot):
+    robot.inject_error(MOVE[0], -1, 1.0)
+    assert rts.MoveChipFromTrayToSocket(*MOVE[1:]) == -1
+    assert robot.counts[MOVE[0]] == 3
+
+
+def test_default_table_keeps_blind_retry(server, robot):
+    assert DEFAULT_STATUS_CODES == {}
+    host, port = server.address
+    rts = RTS_CFG(timings=FAST_TIMINGS, ready_replies=("199",))
+    rts.rts_init(port=port, host_ip=host)
+    robot.inject_error(MOVE[0], -106, 1.0)
+    try:
+        assert rts.MoveChipFromTrayToSocket(*MOVE[1:]) == -106
+    finally:
+        rts.conn.close()
+    assert robot.counts[MOVE[0]] == 3
+
+
+def test_site_table(tmp_path, rts, robot):
+    path = tmp_path / "codes.json"
+    path.write_text(json.dumps({"-1": {"state": "no_chip"}}))
+    rts.status_codes = load_status_codes(str(path))
+    robot.inject_error(MOVE[0], -1, 1.0)
+    with pytest.raises(RobotFault, match="no_chip"):
+        rts.MoveChipFromTrayToSocket(*MOVE[1:])
+
+
+def test_load_status_codes_rejects_bad_entries(tmp_path):
+    path = tmp_path / "codes.json"
+    path.write_text(json.dumps({"-1": {"retries": 1}}))
+    with pytest.raises(ValueError, match="needs a 'state'"):
+        load_status_codes(str(path))
+    path.write_text(json.dumps({"x": {"state": "no_chip"}}))
+    with pytest.raises(ValueError, match="must be an integer"):
+        load_status_codes(str(path))
+
+
+def test_async_client(server, robot):
+    robot.inject_error(MOVE[0], -106, 1.0)
+
+    async def run():
+        client = RTS_AsyncCFG(retry_delay=0.01, status_codes=STATUS_CODES, ready_replies=("199",),
+                              ready_deadlines={'default': 0.05, 'Quiet': 0.05, 'MotorOn': 0.05})
+        host, port = server.address
+        await client.rts_init(port=port, host_ip=host)
+        try:
+            with pytest.raises(RobotFault, match="bad_contact"):
+                await client.MoveChipFromTrayToSocket(*MOVE[1:])
+            moves = robot.counts[MOVE[0]]
+
+            # An unreadable move reply is never resent: the arm may have moved
+            command = client.command
+
+            async def garbled(name, *args, **kwargs):
+                await command(name, *args, **kwargs)
+                client.msg = "garbled"
+                return client.msg
+            client.command = garbled
+            with pytest.raises(RTSCommandInterrupted):
+                await client.MoveChipFromTrayToSocket(*MOVE[1:])
+            assert robot.counts[MOVE[0]] == moves + 1
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+
+
+def test_machine_rejects_chip_after_retries(rts, robot):
+    robot.inject_error(MOVE[0], -106, 1.0)
+    sm = hardware_machine(rts, make_chips(2))
+    sm.run_chip_cycle()
+    assert sm.current_state == sm.ground
+    assert sm.chip_positions.status[0] == BAD
+    assert sm.recovery.counts["bad_contact"] == {"seen": 3, "retry": 2, "reject": 1}
+
+
+def test_restored_load_fault_rejects_without_moving(rts, robot):
+    robot.inject_error(MOVE[0], -106, 1.0)
+    sm = hardware_machine(rts, make_chips(1))
+    sm.cycle()
+    sm.cycle()
+    assert sm.current_state == sm.bad_contact
+    assert sm.chip_positions.status[0] == PENDING
+    sm.run_chip_cycle()
+    assert sm.chip_positions.status[0] == BAD
+    # The chip was put back by the robot: there is nothing in the socket to move
+    assert "MoveChipFromSocketToTray" not in robot.counts
+
+
+def test_reject_moves_chip_out_of_socket(rts, robot):
+    sm = hardware_machine(rts, make_chips(1))
+    sm.chip_positions.set_status(0, TESTED)
+    sm.current_state = sm.no_wib_connection
+    sm.reject_cycle()
+    assert sm.current_state == sm.moving_chip_to_bad_tray
+    assert sm.chip_positions.status[0] == BAD
+    assert robot.counts["MoveChipFromSocketToTray"] == 1
+
+
+def test_fault_on_reject_move_pauses(rts, robot, operator):
+    robot.inject_error("MoveChipFromSocketToTray", -104, 1.0)
+    sm = hardware_machine(rts, make_chips(1))
+    sm.chip_positions.set_status(0, TESTED)
+    sm.current_state = sm.no_wib_connection
+    sm.reject_cycle()
+    assert sm.current_state == sm.safe_guard
+    # Still in the socket, so not BAD, and the operator takes over
+    assert sm.chip_positions.status[0] == TESTED
+    assert sm.recover() == PAUSE
+
+
+def test_machine_pauses_on_stand_fault(rts, robot, operator):
+    robot.inject_error(MOVE[0], -101, 1.0)
+    sm = hardware_machine(rts, make_chips(1))
+    sm.cycle()
+    sm.cycle()
+    assert sm.current_state == sm.no_pressure
+    sm.recover()
+    assert sm.current_state == sm.ground
+    assert sm.recovery.counts["no_pressure"] == {"seen": 1, "pause": 1}
+
+
+def test_machine_pauses_on_interrupted_move(rts, robot, operator):
+    conn = rts.conn
+    send = conn.send
+
+    def drop_move(name, *args):
+        if name == MOVE[0] and MOVE[0] not in robot.counts:
+            robot.counts[MOVE[0]] = 0
+            conn.sock.close()
+            raise ConnectionResetError("link dropped")
+        return send(name, *args)
+    conn.send = drop_move
+
+    sm = hardware_machine(rts, make_chips(1))
+    sm.run_chip_cycle()
+    assert sm.chip_positions.status[0] == DONE
+    assert sm.metrics.chips_completed == 1
+    assert "no_server_connection" not in sm.recovery.counts
@@ -0,0 +1,62 @@
+from conftest import FAST_TIMINGS
+from RTS_CFG import RTS_CFG
+from RTS_MockServer import RTSMockServer
+from RTS_Trace import RECV, SEND, ReplayRobot, command_pairs, drive, load_trace, summarize
+
+MOVE = ("MoveChipFromTrayToSocket", 2, 21, 2, 1, 1)
+
+
+def record(server, path):
+    host, port = server.address
+    rts = RTS_CFG(timings=FAST_TIMINGS, ready_replies=("199",), trace_path=path)
+    rts.rts_init(port=port, host_ip=host)
+    rts.MotorOn()
+    rts.request(*MOVE)
+    rts.request("CoverStatus")
+    rts.stop_trace()
+    rts.conn.close()
+
+
+def test_record(tmp_path, server, robot):
+    robot.inject_error(MOVE[0], -106, 1.0)
+    path = str(tmp_path / "run.trace")
+    record(server, path)
+    events = load_trace(path)
+    kinds = [kind for _, kind, _ in events if kind in (SEND, RECV)]
+    assert kinds == [SEND, RECV] * 3
+    pairs = command_pairs(events)
+    assert [(name, args, reply) for _, name, args, _, reply in pairs] == [
+        ("MotorOn", [], "MotorOn"), (MOVE[0], ["2", "21", "2", "1", "1"], "-106"), ("CoverStatus", [], "199")]
+    assert summarize(events)[MOVE[0]]["count"] == 1
+
+
+def test_unanswered_command():
+    events = [(0.0, SEND, ["Quiet"]), (0.1, SEND, ["CoverStatus"]), (0.2, RECV, ["199"])]
+    assert command_pairs(events) == [(0.0, "Quiet", [], None, None), (0.1, "CoverStatus", [], 0.2, "199")]
+
+
+def test_replay_serves_the_recorded_replies(tmp_path, server, robot):
+    robot.inject_error(MOVE[0], -106, 1.0)
+    path = str(tmp_path / "run.trace")
+    record(server, path)
+
+    replay = ReplayRobot(load_trace(path), speed=100.0)
+    with RTSMockServer(robot=replay) as replay_server:
+        host, port = replay_server.address
+        rts = RTS_CFG(timings=FAST_TIMINGS)
+        rts.rts_init(port=port, host_ip=host)
+        # The move fails as recorded, although the fallback robot has no faults
+        assert rts.request(*MOVE) == "-106"
+        assert rts.request("JumpToCamera") == "JumpToCamera"
+        rts.conn.close()
+    assert (replay.matched, replay.unmatched) == (1, 1)
+
+
+def test_drive_matches_its_own_recording(tmp_path, server, robot):
+    path = str(tmp_path / "run.trace")
+    record(server, path)
+    events = load_trace(path)
+    with RTSMockServer(robot=ReplayRobot(events, speed=100.0)) as replay_server:
+        result = drive(events, *replay_server.address, speed=100.0, quiet=True)
+    assert result["commands"] == 3
+    assert result["mismatches"] == 0